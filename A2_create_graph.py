@@ -1,219 +1,341 @@
-from neo4j import GraphDatabase
-from dotenv import load_dotenv
-import pandas as pd
-import os
+import sys
+from typing import Optional
 
-load_dotenv()
+import author_metrics
+import config
+import connection
+import distance_oracle
+import citation_metrics
+import impact_factor
+import instrumentation
+import keywords
+import query_catalog
+import result_cache
+import schema
+import snapshot
+
+config.load_env()
+
+DELETE_ALL_NODES_QUERY = query_catalog.register("A2_create_graph.delete_all_nodes", "MATCH (n) DETACH DELETE n")
 
 def delete_all_nodes(session):
-    session.run("MATCH (n) DETACH DELETE n")
+    query_catalog.run(session, DELETE_ALL_NODES_QUERY)
+
+LOAD_RAW_PAPERS_QUERY = query_catalog.register("A2_create_graph.load_raw_papers", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS r 
+    FIELDTERMINATOR '|' 
+    CREATE (p:Papers) 
+    SET p = r
+""")
 
 def load_raw_papers(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS r 
-        FIELDTERMINATOR '|' 
-        CREATE (p:Papers) 
-        SET p = r
-    """)
+    query_catalog.run(session, LOAD_RAW_PAPERS_QUERY)
+
+CREATE_PAPERS_QUERY = query_catalog.register("A2_create_graph.create_papers", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    CREATE (p:Paper {
+        paperID: row.paperID,
+        title: row.title,
+        year: toInteger(row.year),
+        abstract: row.abstract,
+        pages: row.pages,
+        doi: row.doi
+    })
+""")
 
 def create_papers(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        CREATE (p:Paper {
-            paperID: row.paperID,
-            title: row.title,
-            year: toInteger(row.year),
-            abstract: row.abstract,
-            pages: row.pages,
-            doi: row.doi
-        })
-    """)
+    query_catalog.run(session, CREATE_PAPERS_QUERY)
+
+CREATE_AUTHORS_QUERY = query_catalog.register("A2_create_graph.create_authors", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row, split(row.authorIDs, ';') AS authorIDs, split(row.authorNames, ';') AS authorNames
+    UNWIND range(0, size(authorIDs) - 1) AS i
+    MERGE (a:Author {authorID: authorIDs[i]})
+    ON CREATE SET a.name = authorNames[i]
+""")
 
 def create_authors(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row, split(row.authorIDs, ';') AS authorIDs, split(row.authorNames, ';') AS authorNames
-        UNWIND range(0, size(authorIDs) - 1) AS i
-        MERGE (a:Author {authorID: authorIDs[i], name: authorNames[i]})
-    """)
+    query_catalog.run(session, CREATE_AUTHORS_QUERY)
+
+CREATE_FIELDS_QUERY = query_catalog.register("A2_create_graph.create_fields", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row, split(row.fields, ';') AS fields
+    UNWIND fields AS field
+    MERGE (f:Field {name: field})
+""")
 
 def create_fields(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row, split(row.fields, ';') AS fields
-        UNWIND fields AS field
-        MERGE (f:Field {name: field})
-    """)
+    query_catalog.run(session, CREATE_FIELDS_QUERY)
+
+CREATE_JOURNALS_QUERY = query_catalog.register("A2_create_graph.create_journals", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row
+    WHERE row.journal_name IS NOT NULL AND row.journal_name <> ''
+    MERGE (:Journal {name: row.journal_name})
+""")
 
 def create_journals(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row
-        WHERE row.journal_name IS NOT NULL AND row.journal_name <> ''
-        MERGE (:Journal {name: row.journal_name})
-    """)
+    query_catalog.run(session, CREATE_JOURNALS_QUERY)
+
+CREATE_VENUES_QUERY = query_catalog.register("A2_create_graph.create_venues", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row
+    WHERE row.publicationVenue_name IS NOT NULL AND row.publicationVenue_name <> ''
+    MERGE (:PublicationVenue {name: row.publicationVenue_name})
+""")
 
 def create_venues(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row
-        WHERE row.publicationVenue_name IS NOT NULL AND row.publicationVenue_name <> ''
-        MERGE (:PublicationVenue {name: row.publicationVenue_name})
-    """)
+    query_catalog.run(session, CREATE_VENUES_QUERY)
+
+CREATE_VOLUMES_QUERY = query_catalog.register("A2_create_graph.create_volumes", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row
+    WHERE row.volume_id IS NOT NULL AND row.volume_id <> ''
+      AND row.volume IS NOT NULL AND row.volume <> ''
+    MERGE (vo:Volume {volumeId: row.volume_id, volume: row.volume})
+""")
 
 def create_volumes(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row
-        WHERE row.volume_id IS NOT NULL AND row.volume_id <> ''
-          AND row.volume IS NOT NULL AND row.volume <> ''
-        MERGE (vo:Volume {volumeId: row.volume_id, volume: row.volume})
-    """)
+    query_catalog.run(session, CREATE_VOLUMES_QUERY)
+
+CREATE_EDITIONS_QUERY = query_catalog.register("A2_create_graph.create_editions", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row
+    WHERE row.edition_id IS NOT NULL AND row.edition_id <> ''
+      AND row.city_venue IS NOT NULL AND row.city_venue <> ''
+    MERGE (e:Edition {editionId: row.edition_id, city: row.city_venue})
+""")
 
 def create_editions(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row
-        WHERE row.edition_id IS NOT NULL AND row.edition_id <> ''
-          AND row.city_venue IS NOT NULL AND row.city_venue <> ''
-        MERGE (e:Edition {editionId: row.edition_id, city: row.city_venue})
-    """)
+    query_catalog.run(session, CREATE_EDITIONS_QUERY)
+
+CREATE_WRITTEN_BY_RELATIONSHIPS_QUERY = query_catalog.register("A2_create_graph.create_written_by_relationships", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row, split(row.authorIDs, ';') AS authorIDs
+    MATCH (p:Paper {paperID: row.paperID})
+    UNWIND authorIDs AS authorID
+    MATCH (a:Author {authorID: authorID})
+    CREATE (p)-[:WRITTEN_BY]->(a)
+""")
+
 def create_written_by_relationships(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row, split(row.authorIDs, ';') AS authorIDs
-        MATCH (p:Paper {paperID: row.paperID})
-        UNWIND authorIDs AS authorID
-        MATCH (a:Author {authorID: authorID})
-        CREATE (p)-[:WRITTEN_BY]->(a)
-    """)
+    query_catalog.run(session, CREATE_WRITTEN_BY_RELATIONSHIPS_QUERY)
+
+CREATE_IN_FIELD_RELATIONSHIPS_QUERY = query_catalog.register("A2_create_graph.create_in_field_relationships", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row, split(row.fields, ';') AS fields
+    MATCH (p:Paper {paperID: row.paperID})
+    UNWIND fields AS field
+    MATCH (f:Field {name: field})
+    CREATE (p)-[:IN_FIELD]->(f)
+""")
 
 def create_in_field_relationships(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row, split(row.fields, ';') AS fields
-        MATCH (p:Paper {paperID: row.paperID})
-        UNWIND fields AS field
-        MATCH (f:Field {name: field})
-        CREATE (p)-[:IN_FIELD]->(f)
-    """)
+    query_catalog.run(session, CREATE_IN_FIELD_RELATIONSHIPS_QUERY)
+
+CREATE_PUBLISHED_IN_VOLUME_QUERY = query_catalog.register("A2_create_graph.create_published_in_volume", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    MATCH (p:Paper {paperID: row.paperID})
+    MATCH (vo:Volume {volumeId: row.volume_id})
+    CREATE (p)-[:PUBLISHED_IN]->(vo)
+""")
 
 def create_published_in_volume(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        MATCH (p:Paper {paperID: row.paperID})
-        MATCH (vo:Volume {volumeId: row.volume_id})
-        CREATE (p)-[:PUBLISHED_IN]->(vo)
-    """)
+    query_catalog.run(session, CREATE_PUBLISHED_IN_VOLUME_QUERY)
+
+CREATE_PUBLISHED_IN_EDITION_QUERY = query_catalog.register("A2_create_graph.create_published_in_edition", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    MATCH (p:Paper {paperID: row.paperID})
+    MATCH (e:Edition {editionId: row.edition_id})
+    CREATE (p)-[:PUBLISHED_IN_VENUE]->(e)
+""")
 
 def create_published_in_edition(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        MATCH (p:Paper {paperID: row.paperID})
-        MATCH (e:Edition {editionId: row.edition_id})
-        CREATE (p)-[:PUBLISHED_IN_VENUE]->(e)
-    """)
+    query_catalog.run(session, CREATE_PUBLISHED_IN_EDITION_QUERY)
+
+CREATE_VOLUME_OF_RELATIONSHIP_QUERY = query_catalog.register("A2_create_graph.create_volume_of_relationship", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    MATCH (j:Journal {name: row.journal_name})
+    MATCH (vo:Volume {volumeId: row.volume_id})
+    CREATE (vo)-[:VOLUME_OF]->(j)
+""")
 
 def create_volume_of_relationship(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        MATCH (j:Journal {name: row.journal_name})
-        MATCH (vo:Volume {volumeId: row.volume_id})
-        CREATE (vo)-[:VOLUME_OF]->(j)
-    """)
+    query_catalog.run(session, CREATE_VOLUME_OF_RELATIONSHIP_QUERY)
+
+CREATE_EDITION_BELONGS_TO_VENUE_QUERY = query_catalog.register("A2_create_graph.create_edition_belongs_to_venue", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    MATCH (v:PublicationVenue {name: row.publicationVenue_name})
+    MATCH (e:Edition {editionId: row.edition_id})
+    CREATE (e)-[:BELONGS_TO]->(v)
+""")
 
 def create_edition_belongs_to_venue(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        MATCH (v:PublicationVenue {name: row.publicationVenue_name})
-        MATCH (e:Edition {editionId: row.edition_id})
-        CREATE (e)-[:BELONGS_TO]->(v)
-    """)
+    query_catalog.run(session, CREATE_EDITION_BELONGS_TO_VENUE_QUERY)
+
+CREATE_AFFILIATIONS_QUERY = query_catalog.register("A2_create_graph.create_affiliations", """
+    LOAD CSV WITH HEADERS FROM 'file:///authors_affiliations.csv' AS row
+    FIELDTERMINATOR '|'
+    MERGE (f:Affiliation {affiliation: row.affiliation})
+""")
 
 def create_affiliations(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///authors_affiliations.csv' AS row
-        FIELDTERMINATOR '|'
-        MERGE (f:Affiliation {affiliation: row.affiliation})
-    """)
+    query_catalog.run(session, CREATE_AFFILIATIONS_QUERY)
+
+LINK_AUTHORS_TO_AFFILIATIONS_QUERY = query_catalog.register("A2_create_graph.link_authors_to_affiliations", """
+    LOAD CSV WITH HEADERS FROM 'file:///authors_affiliations.csv' AS row
+    FIELDTERMINATOR '|'
+    MATCH (a:Author {authorID: row.authorID})
+    MATCH (f:Affiliation {affiliation: row.affiliation})
+    CREATE (a)-[:AFFILIATED_TO]->(f)
+""")
 
 def link_authors_to_affiliations(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///authors_affiliations.csv' AS row
-        FIELDTERMINATOR '|'
-        MATCH (a:Author {authorID: row.authorID})
-        MATCH (f:Affiliation {affiliation: row.affiliation})
-        CREATE (a)-[:AFFILIATED_TO]->(f)
-    """)
+    query_catalog.run(session, LINK_AUTHORS_TO_AFFILIATIONS_QUERY)
+
+CREATE_CITATIONS_QUERY = query_catalog.register("A2_create_graph.create_citations", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row, split(row.citedPaperID, ';') AS citedIDs
+    MATCH (p:Paper {paperID: row.paperID})
+    UNWIND citedIDs AS citedID
+    MATCH (c:Paper {paperID: citedID})
+    CREATE (p)-[:CITES]->(c)
+""")
 
 def create_citations(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row, split(row.citedPaperID, ';') AS citedIDs
-        MATCH (p:Paper {paperID: row.paperID})
-        UNWIND citedIDs AS citedID
-        MATCH (c:Paper {paperID: citedID})
-        CREATE (p)-[:CITES]->(c)
-    """)
+    query_catalog.run(session, CREATE_CITATIONS_QUERY)
+
+CREATE_REVIEWS_QUERY = query_catalog.register("A2_create_graph.create_reviews", """
+    LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
+    FIELDTERMINATOR '|'
+    WITH row, split(row.reviewerIDs, ';') AS reviewerIDs, split(row.reviewsApprovements, ';') AS reviewsApprovements, split(row.reviewsDesc, ';') AS reviewsDesc
+    MATCH (p:Paper {paperID: row.paperID})
+    UNWIND range(0, size(reviewerIDs) - 1) AS i
+    MATCH (a:Author {authorID: reviewerIDs[i]})
+    CREATE (p)-[:REVIEWED_BY {reviewApprovement: reviewsApprovements[i], reviewDesc: reviewsDesc[i]}]->(a)
+""")
 
 def create_reviews(session):
-    session.run("""
-        LOAD CSV WITH HEADERS FROM 'file:///papers_venues.csv' AS row
-        FIELDTERMINATOR '|'
-        WITH row, split(row.reviewerIDs, ';') AS reviewerIDs, split(row.reviewsApprovements, ';') AS reviewsApprovements, split(row.reviewsDesc, ';') AS reviewsDesc
-        MATCH (p:Paper {paperID: row.paperID})
-        UNWIND range(0, size(reviewerIDs) - 1) AS i
-        MATCH (a:Author {authorID: reviewerIDs[i]})
-        CREATE (p)-[:REVIEWED_BY {reviewApprovement: reviewsApprovements[i], reviewDesc: reviewsDesc[i]}]->(a)
-    """)
+    query_catalog.run(session, CREATE_REVIEWS_QUERY)
 
 
-def main():
-    URI = os.getenv('URI')
-    AUTH = (os.getenv('NEO4J_USER'), os.getenv('NEO4J_PASSWORD'))
+def write_snapshot(driver):
+    # Memory-mapped copy of the loaded graph for the analytics processes, see snapshot.py
+    if snapshot.SNAPSHOT_DIR:
+        with driver.session(database=connection.DATABASE) as session:
+            counts = snapshot.write_current_snapshot(session)
+        print(f'Snapshot written to {snapshot.SNAPSHOT_DIR}: {counts}')
+        if distance_oracle.DISTANCE_DIR:
+            oracle = distance_oracle.rebuild()
+            print(f'Distance index rebuilt for {oracle.n_authors} authors')
+
+
+# LOAD CSV passes in dependency order
+LOAD_STAGES = [
+    load_raw_papers,
+    create_papers,
+    create_authors,
+    create_fields,
+    create_journals,
+    create_venues,
+    create_volumes,
+    create_editions,
+    create_written_by_relationships,
+    create_in_field_relationships,
+    create_published_in_volume,
+    create_published_in_edition,
+    create_volume_of_relationship,
+    create_edition_belongs_to_venue,
+    create_affiliations,
+    link_authors_to_affiliations,
+    create_citations,
+    create_reviews,
+]
+
+
+def main(batched: bool = False, delta: bool = False, profile: bool = instrumentation.INSTRUMENT_PROFILE,
+         driver: Optional[connection.Connection] = None, rebuild_snapshot: bool = False):
+    if delta:
+        # Apply only the papers that changed since the last delta load, no DETACH DELETE
+        import delta_loader
+        with connection.connect(driver) as driver:
+            print("Connection successful!")
+            schema.bootstrap_schema(driver)
+            with driver.session(database=connection.DATABASE) as session:
+                query_catalog.warmup_at_start(session)
+            counts = delta_loader.run_delta_load(driver)
+            print(f'Delta load done for the database: {counts}')
+            # Re-exporting the whole graph would make a delta load O(graph) again
+            if rebuild_snapshot:
+                write_snapshot(driver)
+            elif snapshot.SNAPSHOT_DIR:
+                print(f'Snapshot {snapshot.SNAPSHOT_DIR} left at its previous graph version, rerun with --snapshot to rebuild it')
+        return
+
+    if batched:
+        # Stream the CSVs from Python in UNWIND batches instead of the LOAD CSV passes below
+        import batch_loader
+        with connection.connect(driver) as driver:
+            print("Connection successful!")
+            batch_loader.delete_all_nodes_batched(driver)
+            schema.bootstrap_schema(driver)
+            with driver.session(database=connection.DATABASE) as session:
+                query_catalog.warmup_at_start(session)
+            print('Creating and loading the nodes and relationships in batches...')
+            batch_loader.run_batched_load(driver)
+            with driver.session(database=connection.DATABASE) as session:
+                derived = batch_loader.refresh_derived(session)
+            batch_loader.print_report(derived, sum(stats["seconds"] for stats in derived.values()))
+            print('Creation and loading done for the database.')
+            write_snapshot(driver)
+        return
 
     print("Dont forget to add the CSV files to the graph database!")
+    instrument = instrumentation.Instrumentation(profile=profile)
 
-    with GraphDatabase.driver(URI, auth=AUTH) as driver:
+    with connection.connect(driver) as driver:
         print("Connection successful!")
-        with driver.session(database="neo4j") as session:
-            session.execute_write(delete_all_nodes)
+        with driver.session(database=connection.DATABASE) as session:
+            session.execute_write(instrument.wrap(delete_all_nodes, "load"))
+            # Constraints/indexes must be online before the MATCH-heavy stages below
+            schema.create_schema(session)
+            schema.await_indexes(session)
+            query_catalog.warmup_at_start(session)
             print('Creating and loading the nodes and relationships into the database...')
 
-            session.execute_write(load_raw_papers)
-            session.execute_write(create_papers)
-            session.execute_write(create_authors)
-            session.execute_write(create_fields)
-            session.execute_write(create_journals)
-            session.execute_write(create_venues)
-            session.execute_write(create_volumes)
-            session.execute_write(create_editions)
-            session.execute_write(create_written_by_relationships)
-            session.execute_write(create_in_field_relationships)
-            session.execute_write(create_published_in_volume)
-            session.execute_write(create_published_in_edition)
-            session.execute_write(create_volume_of_relationship)
-            session.execute_write(create_edition_belongs_to_venue)
-            session.execute_write(create_affiliations)
-            session.execute_write(link_authors_to_affiliations)
-            session.execute_write(create_citations)
-            session.execute_write(create_reviews)
+            for stage in LOAD_STAGES:
+                session.execute_write(instrument.wrap(stage, "load"))
+            with instrument.stage("load", "citation_stats") as record:
+                record["rows"] = citation_metrics.refresh_all_citation_stats(session)
+            with instrument.stage("load", "publication_counts") as record:
+                record["rows"] = impact_factor.refresh_publication_counts(session)
+            with instrument.stage("load", "h_index") as record:
+                record["rows"] = author_metrics.refresh_all_h_index(session)
+            with instrument.stage("load", "keywords") as record:
+                record["rows"] = keywords.load_keywords(session)
+            result_cache.bump_version(session)
 
             print('Creation and loading done for the database.')
+        write_snapshot(driver)
+        driver.print_metrics()
+    instrument.print_report()
+    instrument.flush()
 
 if __name__ == "__main__":
-     main()
\ No newline at end of file
+     main(batched="--batched" in sys.argv, delta="--delta" in sys.argv,
+          profile="--profile" in sys.argv or instrumentation.INSTRUMENT_PROFILE,
+          rebuild_snapshot="--snapshot" in sys.argv)
\ No newline at end of file
@@ -1,112 +1,283 @@
+import argparse
+import csv
+import json
 import os
-from neo4j import GraphDatabase
-from dotenv import load_dotenv
-from collections import defaultdict
-
-load_dotenv()
-
-def find_top_3_cited_papers(session):
-    result = session.run("""
-        MATCH (p:Paper)-[:PUBLISHED_IN_VENUE]->(e:Edition)-[:BELONGS_TO]->(v:PublicationVenue)
-        OPTIONAL MATCH (citingPaper:Paper)-[:CITES]->(p)
-        WITH v.name AS venueName, p, count(citingPaper) AS citationCount
-                         
-        ORDER BY citationCount DESC
-        WITH venueName, collect({paperID: p.paperID, title: p.title, citationCount: citationCount}) AS papers
-        RETURN venueName, papers[0..3] AS top3CitedPapers
-    """)
-    for record in result:
-        print(f"\nVenue: {record["venueName"]}")
-        for paper in record["top3CitedPapers"]:
-            print(f"Title: {paper["title"]}")
-            print(f"Paper ID: {paper["paperID"]}")
-            print(f"Citations: {paper["citationCount"]}")
-
-
-def conference_workshop_communities(session):
-    result = session.run("""
-        MATCH (p:Paper)-[:PUBLISHED_IN_VENUE]->(e:Edition)-[:BELONGS_TO]->(v:PublicationVenue)
-        MATCH (p)-[:WRITTEN_BY]->(a:Author)
-        WITH v.name AS venueName, 
-            a.name AS authorName, 
-            collect(DISTINCT e.editionId) AS editions
-                         
-        WHERE size(editions) >= 2
-        RETURN venueName, authorName, size(editions) AS numEditions
-    """)
-    for record in result:
-        print(f"\nVenue: {record['venueName']}")
-        print(f"Author: {record['authorName']}")
-        print(f"Number of editions: {record['numEditions']}")
-
-
-def impact_factor_journals(session):
-    result = session.run("""
-        MATCH (citing:Paper)-[:CITES]->(cited:Paper)
-            -[:PUBLISHED_IN]->(v:Volume)
-            -[:VOLUME_OF]->(j:Journal)
-        WITH j, citing.year AS currentYear, COUNT(*) AS totalCitations
-                         
-        MATCH (paper1:Paper)-[:PUBLISHED_IN]->(v1:Volume)-[:VOLUME_OF]->(j)
-        WHERE paper1.year = currentYear - 1
-        WITH j, currentYear, totalCitations, COUNT(paper1) AS pubCountYminus1   
-
-        MATCH (paper2:Paper)-[:PUBLISHED_IN]->(v2:Volume)-[:VOLUME_OF]->(j)
-        WHERE paper2.year = currentYear - 2
-        WITH j, 
-            currentYear, 
-            totalCitations, 
-            pubCountYminus1, 
-            COUNT(paper2) AS pubCountYminus2   
-                         
-        RETURN 
-        j.name AS journal, 
-        currentYear AS impactFactorYear,
-        CASE 
-            WHEN (pubCountYminus1 + pubCountYminus2) > 0 
-            THEN (1.0 * totalCitations / (pubCountYminus1 + pubCountYminus2))
-            ELSE 0
-        END AS impactFactor
-        ORDER BY journal, impactFactorYear;
-    """)
-    for record in result:
-        print(f"{record['journal']} ({record['impactFactorYear']}): Impact Factor = {record['impactFactor']}")
-
-
-def h_index_authors(session):
-    result = session.run("""
-        MATCH (p:Paper)-[:WRITTEN_BY]->(a:Author)
-        OPTIONAL MATCH (citing:Paper)-[:CITES]->(p)
-        RETURN a.name AS authorName, p.paperID AS paperID, COUNT(citing) AS citationCount
-    """)
-
-    author_citations = defaultdict(list)
-    for record in result:
-        author = record["authorName"]
-        citation_count = record["citationCount"]
-        author_citations[author].append(citation_count)
-
-    for author, citations in author_citations.items():
-        sorted_cites = sorted(citations, reverse=True)
-        h_index = 0
-        for i, c in enumerate(sorted_cites):
-            if c >= i + 1:
-                h_index += 1
+import shutil
+import sys
+import tempfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from neo4j import READ_ACCESS
+
+import config
+import connection
+import impact_factor
+import instrumentation
+import query_catalog
+
+config.load_env()
+
+# Records pulled from the server per round trip; results are never held in full
+FETCH_SIZE = int(os.getenv("FETCH_SIZE", "1000"))
+RESULTS_FORMAT = os.getenv("RESULTS_FORMAT", "print")
+RESULTS_DIR = os.getenv("RESULTS_DIR", "./results")
+# PrintSink output beyond this spills from memory to a temporary file until it is printed
+PRINT_SPOOL_BYTES = int(os.getenv("PRINT_SPOOL_BYTES", str(1 << 20)))
+
+TOP_CITED_PAPERS_QUERY = query_catalog.register("B_querying.top_cited_papers", """
+    MATCH (p:Paper)-[:PUBLISHED_IN_VENUE]->(e:Edition)-[:BELONGS_TO]->(v:PublicationVenue)
+    WITH v.name AS venueName, p, coalesce(p.citationCount, 0) AS citationCount
+
+    ORDER BY citationCount DESC
+    WITH venueName, collect({paperID: p.paperID, title: p.title, citationCount: citationCount}) AS papers
+    RETURN venueName, papers[0..$k] AS topCitedPapers
+""", k=int)
+
+VENUE_COMMUNITIES_QUERY = query_catalog.register("B_querying.venue_communities", """
+    MATCH (p:Paper)-[:PUBLISHED_IN_VENUE]->(e:Edition)-[:BELONGS_TO]->(v:PublicationVenue)
+    MATCH (p)-[:WRITTEN_BY]->(a:Author)
+    WITH v.name AS venueName,
+        a.name AS authorName,
+        collect(DISTINCT e.editionId) AS editions
+
+    WHERE size(editions) >= $minEditions
+    RETURN venueName, authorName, size(editions) AS numEditions
+""", minEditions=int)
+
+H_INDEX_AUTHORS_QUERY = query_catalog.register("B_querying.h_index_authors", """
+    MATCH (a:Author)
+    WHERE a.hIndex IS NOT NULL
+    RETURN a.authorID AS authorID, a.name AS authorName, a.hIndex AS hIndex
+    ORDER BY a.hIndex DESC
+""")
+
+# Each analytic takes a session or transaction and yields flat result rows
+
+
+def find_top_3_cited_papers(session, k: int = 3) -> Iterator[dict]:
+    for record in query_catalog.run(session, TOP_CITED_PAPERS_QUERY, k=k):
+        for rank, paper in enumerate(record["topCitedPapers"], start=1):
+            yield {"venueName": record["venueName"], "rank": rank, **paper}
+
+
+def conference_workshop_communities(session, min_editions: int = 2) -> Iterator[dict]:
+    for record in query_catalog.run(session, VENUE_COMMUNITIES_QUERY, minEditions=min_editions):
+        yield record.data()
+
+
+def impact_factor_journals(session) -> Iterator[dict]:
+    # Two streaming reads and NumPy, see impact_factor.impact_factors
+    yield from impact_factor.compute_impact_factors(session)
+
+
+def h_index_authors(session) -> Iterator[dict]:
+    # Author.hIndex is materialized per authorID by author_metrics at load time
+    for record in query_catalog.run(session, H_INDEX_AUTHORS_QUERY):
+        yield record.data()
+
+
+ANALYTICS: List[Callable[..., Iterator[dict]]] = [
+    find_top_3_cited_papers,
+    conference_workshop_communities,
+    impact_factor_journals,
+    h_index_authors,
+]
+
+def _print_top_3(row: dict) -> str:
+    header = f"\nVenue: {row['venueName']}\n" if row["rank"] == 1 else ""
+    return f"{header}Title: {row['title']}\nPaper ID: {row['paperID']}\nCitations: {row['citationCount']}"
+
+PRINT_FORMATS: Dict[str, Callable[[dict], str]] = {
+    "find_top_3_cited_papers": _print_top_3,
+    "conference_workshop_communities": lambda row: (
+        f"\nVenue: {row['venueName']}\nAuthor: {row['authorName']}\nNumber of editions: {row['numEditions']}"
+    ),
+    "impact_factor_journals": lambda row: (
+        f"{row['journal']} ({row['impactFactorYear']}): Impact Factor = {row['impactFactor']}"
+    ),
+    "h_index_authors": lambda row: f"{row['authorName']} ({row['authorID']}) has h-index {row['hIndex']}",
+}
+
+
+# --- Result sinks ---
+# write(name, rows) consumes the rows and returns how many it wrote. A retried read
+# transaction calls it again, so file sinks rewrite their output from the start and
+# PrintSink spools its output, printing it in flush() once the transaction has committed.
+
+class PrintSink:
+    def __init__(self, spool_bytes: int = PRINT_SPOOL_BYTES):
+        self.spool_bytes = spool_bytes
+        self._spool = None
+
+    def write(self, name: str, rows: Iterable[dict]) -> int:
+        fmt = PRINT_FORMATS.get(name, str)
+        if self._spool is not None:
+            self._spool.close()  # output of an attempt that was retried
+        self._spool = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes, mode="w+", encoding="utf-8")
+        count = 0
+        for row in rows:
+            self._spool.write(fmt(row) + "\n")
+            count += 1
+        return count
+
+    def flush(self):
+        if self._spool is not None:
+            self._spool.seek(0)
+            shutil.copyfileobj(self._spool, sys.stdout)
+            self._spool.close()
+            self._spool = None
+
+class JsonlSink:
+    def __init__(self, directory: str = RESULTS_DIR):
+        self.directory = directory
+
+    def write(self, name: str, rows: Iterable[dict]) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        count = 0
+        with open(os.path.join(self.directory, f"{name}.jsonl"), "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row, default=str) + "\n")
+                count += 1
+        return count
+
+class CsvSink:
+    def __init__(self, directory: str = RESULTS_DIR):
+        self.directory = directory
+
+    def write(self, name: str, rows: Iterable[dict]) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        count = 0
+        with open(os.path.join(self.directory, f"{name}.csv"), "w", newline="", encoding="utf-8") as file:
+            writer = None
+            for row in rows:
+                if writer is None:
+                    writer = csv.DictWriter(file, fieldnames=list(row), delimiter="|")
+                    writer.writeheader()
+                writer.writerow(row)
+                count += 1
+        return count
+
+class ParquetSink:
+    def __init__(self, directory: str = RESULTS_DIR, batch_size: int = FETCH_SIZE):
+        self.directory = directory
+        self.batch_size = batch_size
+
+    def write(self, name: str, rows: Iterable[dict]) -> int:
+        from pipeline import _pyarrow
+        pa = _pyarrow()
+        import pyarrow.parquet as pq
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{name}.parquet")
+        writer, batch, count = None, [], 0
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) == self.batch_size:
+                    writer = self._flush(pa, pq, path, writer, batch)
+                    count += len(batch)
+                    batch = []
+            if batch or writer is None:
+                writer = self._flush(pa, pq, path, writer, batch)
+                count += len(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
+    @staticmethod
+    def _flush(pa, pq, path, writer, batch):
+        # The schema is inferred from the first batch and enforced on the rest
+        table = pa.Table.from_pylist(batch, schema=writer.schema if writer else None)
+        writer = writer or pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+        return writer
+
+SINKS = {"print": PrintSink, "jsonl": JsonlSink, "csv": CsvSink, "parquet": ParquetSink}
+
+
+def _write_rows(tx, analytic, sink) -> int:
+    return sink.write(analytic.__name__, analytic(tx))
+
+def _collect_rows(tx, analytic) -> List[dict]:
+    return list(analytic(tx))
+
+def run_analytics(driver, sink=None, analytics: Optional[List[Callable]] = None,
+                  database: str = connection.DATABASE, fetch_size: int = FETCH_SIZE, cache=None,
+                  instrument=None) -> Dict[str, int]:
+    """
+    Stream every analytic into `sink` inside a read transaction, so a cluster routes it to
+    a follower. Returns the number of rows written per analytic.
+
+    With a result_cache.ResultCache, results are materialized once per graph version and
+    later calls are served from the cache without touching the server. An
+    instrumentation.Instrumentation records every query that reaches the server.
+    """
+    sink = sink or PrintSink()
+    counts = {}
+    write_rows, collect_rows = _write_rows, _collect_rows
+    with driver.session(database=database, default_access_mode=READ_ACCESS, fetch_size=fetch_size) as session:
+        for analytic in analytics or ANALYTICS:
+            if instrument is not None:
+                write_rows = instrument.wrap(_write_rows, "query", analytic.__name__)
+                collect_rows = instrument.wrap(_collect_rows, "query", analytic.__name__)
+            if cache is None:
+                counts[analytic.__name__] = session.execute_read(write_rows, analytic, sink)
             else:
-                break
-        print(f"{author} has h-index {h_index}")
+                rows = cache.get(session, analytic.__name__, None,
+                                 lambda: session.execute_read(collect_rows, analytic))
+                counts[analytic.__name__] = sink.write(analytic.__name__, rows)
+            if hasattr(sink, "flush"):
+                sink.flush()
+    return counts
+
+def iter_analytic(driver, analytic: Callable, database: str = connection.DATABASE,
+                  fetch_size: int = FETCH_SIZE) -> Iterator[dict]:
+    """
+    Lazily yield the rows of one analytic from an auto-commit read on a follower.
+    Unlike run_analytics it is not retried, since rows may already have been consumed.
+    """
+    with driver.session(database=database, default_access_mode=READ_ACCESS, fetch_size=fetch_size) as session:
+        yield from analytic(session)
+
+
+def main(argv: Optional[List[str]] = None, driver: Optional[connection.Connection] = None):
+    by_name = {analytic.__name__: analytic for analytic in ANALYTICS}
+    parser = argparse.ArgumentParser(description="Run the analytics queries.")
+    parser.add_argument("analytics", nargs="*", help=f"subset of {', '.join(by_name)} (default: all)")
+    parser.add_argument("--format", choices=list(SINKS), default=RESULTS_FORMAT)
+    parser.add_argument("--output", default=RESULTS_DIR, help="directory for file sinks")
+    parser.add_argument("--fetch-size", type=int, default=FETCH_SIZE)
+    parser.add_argument("--cache", action="store_true", help="serve results from the RESULT_CACHE_DIR disk cache")
+    parser.add_argument("--profile", action="store_true", default=instrumentation.INSTRUMENT_PROFILE,
+                        help="run every query under PROFILE and record db hits per operator")
+    args = parser.parse_args(argv)
+    # Not choices=: argparse rejects the empty default of nargs="*" against them
+    unknown = [name for name in args.analytics if name not in by_name]
+    if unknown:
+        parser.error(f"unknown analytics {unknown}, choose from {list(by_name)}")
 
-def main():
-    URI = os.getenv('URI')
-    AUTH = (os.getenv('NEO4J_USER'), os.getenv('NEO4J_PASSWORD'))
+    selected = [by_name[name] for name in args.analytics] if args.analytics else ANALYTICS
+    sink = PrintSink() if args.format == "print" else SINKS[args.format](args.output)
 
-    with GraphDatabase.driver(URI, auth=AUTH) as driver:
+    with connection.connect(driver) as driver:
         print("Connection successful!")
-        with driver.session(database="neo4j") as session:
-            session.execute_write(find_top_3_cited_papers)
-            session.execute_write(conference_workshop_communities)
-            session.execute_write(impact_factor_journals)
-            session.execute_write(h_index_authors)
+        with driver.session(database=connection.DATABASE) as session:
+            query_catalog.warmup_at_start(session)
+        cache = None
+        if args.cache:
+            import result_cache
+            cache = result_cache.ResultCache(directory=result_cache.RESULT_CACHE_DIR or "./.result_cache")
+        instrument = instrumentation.Instrumentation(profile=args.profile)
+        counts = run_analytics(driver, sink, selected, fetch_size=args.fetch_size, cache=cache, instrument=instrument)
+        if cache is not None:
+            print(f"Result cache: {cache.stats()}")
+        if args.format != "print":
+            for name, count in counts.items():
+                print(f"{name}: {count} rows written to {args.output}")
+        instrument.flush()
+        if args.profile:
+            instrument.print_report()
+            driver.print_metrics()
 
 if __name__ == "__main__":
-     main()
\ No newline at end of file
+     main()
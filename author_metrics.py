@@ -0,0 +1,124 @@
+import os
+import sys
+from typing import Iterable, List, Set
+
+import config
+import connection
+import query_catalog
+
+config.load_env()
+
+AUTHOR_BATCH_SIZE = int(os.getenv("AUTHOR_BATCH_SIZE", "5000"))
+
+# Reads Paper.citationCount (see citation_metrics). Counts sorted descending, so h = the last 1-based rank whose count still reaches it
+H_INDEX_QUERY = query_catalog.register("author_metrics.h_index", """
+    UNWIND $authorIDs AS authorID
+    MATCH (a:Author {authorID: authorID})
+    OPTIONAL MATCH (a)<-[:WRITTEN_BY]-(p:Paper)
+    WITH a, coalesce(p.citationCount, 0) AS citationCount
+    ORDER BY citationCount DESC
+    WITH a, collect(citationCount) AS counts
+    SET a.hIndex = reduce(h = 0, i IN range(0, size(counts) - 1) |
+        CASE WHEN counts[i] >= i + 1 THEN i + 1 ELSE h END)
+""", authorIDs=list)
+
+AUTHOR_PAGE_QUERY = query_catalog.register("author_metrics.author_page", """
+    MATCH (a:Author)
+    WHERE a.authorID > $after
+    RETURN a.authorID AS authorID
+    ORDER BY a.authorID
+    LIMIT $limit
+""", after=str, limit=int)
+
+# Authors whose h-index can change when the given papers gain or lose CITES/WRITTEN_BY edges
+AFFECTED_AUTHORS_QUERY = query_catalog.register("author_metrics.affected_authors", """
+    UNWIND $paperIDs AS paperID
+    MATCH (p:Paper {paperID: paperID})
+    OPTIONAL MATCH (p)-[:WRITTEN_BY]->(author:Author)
+    OPTIONAL MATCH (p)-[:CITES]->(:Paper)-[:WRITTEN_BY]->(citedAuthor:Author)
+    WITH collect(DISTINCT author.authorID) + collect(DISTINCT citedAuthor.authorID) AS ids
+    UNWIND ids AS authorID
+    RETURN DISTINCT authorID
+""", paperIDs=list)
+
+TOP_AUTHORS_QUERY = query_catalog.register("author_metrics.top_authors", """
+    MATCH (a:Author)
+    WHERE a.hIndex IS NOT NULL
+    RETURN a.authorID AS authorID, a.name AS authorName, a.hIndex AS hIndex
+    ORDER BY a.hIndex DESC
+    LIMIT $k
+""", k=int)
+
+
+def h_index(citation_counts: Iterable[int]) -> int:
+    """
+    Reference implementation: largest h such that h papers have at least h citations.
+    """
+    h = 0
+    for i, count in enumerate(sorted(citation_counts, reverse=True)):
+        if count < i + 1:
+            break
+        h = i + 1
+    return h
+
+def _set_h_index(tx, author_ids: List[str]):
+    query_catalog.run(tx, H_INDEX_QUERY, authorIDs=author_ids).consume()
+
+def _author_page(tx, after: str, limit: int) -> List[str]:
+    return [record["authorID"] for record in query_catalog.run(tx, AUTHOR_PAGE_QUERY, after=after, limit=limit)]
+
+def _affected_authors(tx, paper_ids: List[str]) -> List[str]:
+    return [record["authorID"] for record in query_catalog.run(tx, AFFECTED_AUTHORS_QUERY, paperIDs=paper_ids)]
+
+def affected_authors(session, paper_ids: Iterable[str], batch_size: int = AUTHOR_BATCH_SIZE) -> Set[str]:
+    """
+    Authors of `paper_ids` and of the papers they cite. Call it both before and after
+    rewiring those papers' edges to cover citations that were removed.
+    """
+    paper_ids = list(paper_ids)
+    authors = set()
+    for i in range(0, len(paper_ids), batch_size):
+        authors.update(session.execute_read(_affected_authors, paper_ids[i:i + batch_size]))
+    return authors
+
+def refresh_h_index(session, author_ids: Iterable[str], batch_size: int = AUTHOR_BATCH_SIZE) -> int:
+    """
+    Recompute and store Author.hIndex for just these authors.
+    """
+    author_ids = sorted(set(author_ids))
+    for i in range(0, len(author_ids), batch_size):
+        session.execute_write(_set_h_index, author_ids[i:i + batch_size])
+    return len(author_ids)
+
+def refresh_all_h_index(session, batch_size: int = AUTHOR_BATCH_SIZE) -> int:
+    """
+    Recompute every author's h-index, one committed batch of authors at a time
+    (keyset pagination over the authorID constraint index).
+    """
+    after, total = "", 0
+    while True:
+        author_ids = session.execute_read(_author_page, after, batch_size)
+        if not author_ids:
+            return total
+        session.execute_write(_set_h_index, author_ids)
+        total += len(author_ids)
+        after = author_ids[-1]
+
+def top_authors(session, k: int = 10) -> List[dict]:
+    return [record.data() for record in query_catalog.run(session, TOP_AUTHORS_QUERY, k=k)]
+
+
+def main():
+    with connection.Connection() as driver:
+        print("Connection successful!")
+        with driver.session(database=connection.DATABASE) as session:
+            if len(sys.argv) > 1:
+                count = refresh_h_index(session, sys.argv[1:])
+            else:
+                count = refresh_all_h_index(session)
+            print(f"Updated the h-index of {count} authors.")
+            for record in top_authors(session):
+                print(f"{record['authorName']} ({record['authorID']}) has h-index {record['hIndex']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+import csv
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import author_metrics
+import citation_metrics
+import config
+import connection
+import impact_factor
+import keywords
+import query_catalog
+import result_cache
+import schema
+
+config.load_env()
+
+CSV_DIR = os.getenv("CSV_DIR", "./csv")
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "10000"))
+LOAD_WORKERS = int(os.getenv("LOAD_WORKERS", "4"))
+LOAD_FORMAT = os.getenv("LOAD_FORMAT", "csv")
+DELETE_BATCH_SIZE = 10000
+
+
+class Stage(NamedTuple):
+    """
+    One load step: `extract` maps a CSV row to the parameter rows sent to `query`
+    through `UNWIND $rows`. `creates` is the label the stage produces (node stages)
+    and `requires` the labels that must be fully loaded before it may run.
+    """
+    name: str
+    source: str
+    query: query_catalog.Query
+    extract: Callable[[dict], Iterable[dict]]
+    creates: Optional[str] = None
+    requires: tuple = ()
+
+
+# --- Row helpers ---
+
+def _value(row: dict, key: str):
+    value = row.get(key)
+    return value if value not in ("", None) else None
+
+def _split(row: dict, key: str) -> List[str]:
+    value = row.get(key)
+    return [item for item in value.split(";") if item] if value else []
+
+def _to_int(value):
+    return int(float(value)) if value not in ("", None) else None
+
+def _unique(key_fn: Callable[[dict], Iterable[dict]], *key_fields) -> Callable[[dict], Iterable[dict]]:
+    """
+    Wrap an extractor so each distinct key is only emitted once per load.
+    This turns the per-row MERGEs of the LOAD CSV passes into one CREATE per entity.
+    """
+    seen = set()
+    def extract(row):
+        for item in key_fn(row):
+            key = tuple(item[field] for field in key_fields)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield item
+    return extract
+
+
+# --- Extractors ---
+
+def extract_paper(row):
+    yield {
+        "paperID": row["paperID"],
+        "title": _value(row, "title"),
+        "year": _to_int(row.get("year")),
+        "abstract": _value(row, "abstract"),
+        "pages": _value(row, "pages"),
+        "doi": _value(row, "doi"),
+    }
+
+def extract_raw_paper(row):
+    yield {key: value for key, value in row.items() if value not in ("", None)}
+
+def extract_authors(row):
+    author_ids = (row.get("authorIDs") or "").split(";")
+    author_names = (row.get("authorNames") or "").split(";")
+    for i, author_id in enumerate(author_ids):
+        if author_id:
+            yield {"authorID": author_id, "name": author_names[i] if i < len(author_names) else None}
+
+def extract_fields(row):
+    for field in _split(row, "fields"):
+        yield {"name": field}
+
+def extract_journal(row):
+    if _value(row, "journal_name"):
+        yield {"name": row["journal_name"]}
+
+def extract_venue(row):
+    if _value(row, "publicationVenue_name"):
+        yield {"name": row["publicationVenue_name"]}
+
+def extract_volume(row):
+    if _value(row, "volume_id") and _value(row, "volume"):
+        yield {"volumeId": row["volume_id"], "volume": row["volume"]}
+
+def extract_edition(row):
+    if _value(row, "edition_id") and _value(row, "city_venue"):
+        yield {"editionId": row["edition_id"], "city": row["city_venue"]}
+
+def extract_affiliation(row):
+    if _value(row, "affiliation"):
+        yield {"affiliation": row["affiliation"]}
+
+def extract_written_by(row):
+    for author_id in _split(row, "authorIDs"):
+        yield {"paperID": row["paperID"], "authorID": author_id}
+
+def extract_in_field(row):
+    for field in _split(row, "fields"):
+        yield {"paperID": row["paperID"], "field": field}
+
+def extract_published_in(row):
+    if _value(row, "volume_id"):
+        yield {"paperID": row["paperID"], "volumeId": row["volume_id"]}
+
+def extract_published_in_venue(row):
+    if _value(row, "edition_id"):
+        yield {"paperID": row["paperID"], "editionId": row["edition_id"]}
+
+def extract_volume_of(row):
+    if _value(row, "volume_id") and _value(row, "journal_name"):
+        yield {"volumeId": row["volume_id"], "journal": row["journal_name"]}
+
+def extract_belongs_to(row):
+    if _value(row, "edition_id") and _value(row, "publicationVenue_name"):
+        yield {"editionId": row["edition_id"], "venue": row["publicationVenue_name"]}
+
+def extract_affiliated_to(row):
+    if _value(row, "authorID") and _value(row, "affiliation"):
+        yield {"authorID": row["authorID"], "affiliation": row["affiliation"]}
+
+def extract_citations(row):
+    for cited_id in _split(row, "citedPaperID"):
+        yield {"paperID": row["paperID"], "citedID": cited_id}
+
+def extract_reviews(row):
+    reviewer_ids = (row.get("reviewerIDs") or "").split(";")
+    approvements = (row.get("reviewsApprovements") or "").split(";")
+    descs = (row.get("reviewsDesc") or "").split(";")
+    for i, reviewer_id in enumerate(reviewer_ids):
+        if reviewer_id:
+            yield {
+                "paperID": row["paperID"],
+                "authorID": reviewer_id,
+                "approvement": approvements[i] if i < len(approvements) else None,
+                "desc": descs[i] if i < len(descs) else None,
+            }
+
+
+# --- Stages ---
+
+PAPERS_CSV = "papers_venues.csv"
+AFFILIATIONS_CSV = "authors_affiliations.csv"
+
+def _stage(name: str, source: str, cypher: str, extract, **kwargs) -> Stage:
+    # Registering again on every build is a no-op, the text never changes
+    query = query_catalog.register(f"batch_loader.{name}", cypher, rows=list)
+    return Stage(name, source, query, extract, **kwargs)
+
+def build_stages() -> List[Stage]:
+    """
+    Build a fresh set of stages (the node extractors keep per-load dedup state).
+    """
+    return [
+        _stage("raw_papers", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (p:Papers)
+            SET p = row
+        """, extract_raw_paper, creates="Papers"),
+        _stage("papers", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (p:Paper {
+                paperID: row.paperID,
+                title: row.title,
+                year: row.year,
+                abstract: row.abstract,
+                pages: row.pages,
+                doi: row.doi
+            })
+        """, _unique(extract_paper, "paperID"), creates="Paper"),
+        _stage("authors", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (:Author {authorID: row.authorID, name: row.name})
+        """, _unique(extract_authors, "authorID"), creates="Author"),
+        _stage("fields", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (:Field {name: row.name})
+        """, _unique(extract_fields, "name"), creates="Field"),
+        _stage("journals", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (:Journal {name: row.name})
+        """, _unique(extract_journal, "name"), creates="Journal"),
+        _stage("venues", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (:PublicationVenue {name: row.name})
+        """, _unique(extract_venue, "name"), creates="PublicationVenue"),
+        _stage("volumes", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (:Volume {volumeId: row.volumeId, volume: row.volume})
+        """, _unique(extract_volume, "volumeId"), creates="Volume"),
+        _stage("editions", PAPERS_CSV, """
+            UNWIND $rows AS row
+            CREATE (:Edition {editionId: row.editionId, city: row.city})
+        """, _unique(extract_edition, "editionId"), creates="Edition"),
+        _stage("affiliations", AFFILIATIONS_CSV, """
+            UNWIND $rows AS row
+            CREATE (:Affiliation {affiliation: row.affiliation})
+        """, _unique(extract_affiliation, "affiliation"), creates="Affiliation"),
+        _stage("written_by", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (p:Paper {paperID: row.paperID})
+            MATCH (a:Author {authorID: row.authorID})
+            CREATE (p)-[:WRITTEN_BY]->(a)
+        """, extract_written_by, requires=("Paper", "Author")),
+        _stage("in_field", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (p:Paper {paperID: row.paperID})
+            MATCH (f:Field {name: row.field})
+            CREATE (p)-[:IN_FIELD]->(f)
+        """, extract_in_field, requires=("Paper", "Field")),
+        _stage("published_in", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (p:Paper {paperID: row.paperID})
+            MATCH (vo:Volume {volumeId: row.volumeId})
+            CREATE (p)-[:PUBLISHED_IN]->(vo)
+        """, extract_published_in, requires=("Paper", "Volume")),
+        _stage("published_in_venue", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (p:Paper {paperID: row.paperID})
+            MATCH (e:Edition {editionId: row.editionId})
+            CREATE (p)-[:PUBLISHED_IN_VENUE]->(e)
+        """, extract_published_in_venue, requires=("Paper", "Edition")),
+        _stage("volume_of", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (vo:Volume {volumeId: row.volumeId})
+            MATCH (j:Journal {name: row.journal})
+            CREATE (vo)-[:VOLUME_OF]->(j)
+        """, _unique(extract_volume_of, "volumeId", "journal"), requires=("Volume", "Journal")),
+        _stage("belongs_to", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (e:Edition {editionId: row.editionId})
+            MATCH (v:PublicationVenue {name: row.venue})
+            CREATE (e)-[:BELONGS_TO]->(v)
+        """, _unique(extract_belongs_to, "editionId", "venue"), requires=("Edition", "PublicationVenue")),
+        _stage("affiliated_to", AFFILIATIONS_CSV, """
+            UNWIND $rows AS row
+            MATCH (a:Author {authorID: row.authorID})
+            MATCH (f:Affiliation {affiliation: row.affiliation})
+            CREATE (a)-[:AFFILIATED_TO]->(f)
+        """, extract_affiliated_to, requires=("Author", "Affiliation")),
+        _stage("citations", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (p:Paper {paperID: row.paperID})
+            MATCH (c:Paper {paperID: row.citedID})
+            CREATE (p)-[:CITES]->(c)
+        """, extract_citations, requires=("Paper",)),
+        _stage("reviews", PAPERS_CSV, """
+            UNWIND $rows AS row
+            MATCH (p:Paper {paperID: row.paperID})
+            MATCH (a:Author {authorID: row.authorID})
+            CREATE (p)-[:REVIEWED_BY {reviewApprovement: row.approvement, reviewDesc: row.desc}]->(a)
+        """, extract_reviews, requires=("Paper", "Author")),
+    ]
+
+# Register the stage queries on import so the catalog (and its warmup) is complete
+build_stages()
+
+
+# --- Loader ---
+
+def read_csv_rows(path: str) -> Iterable[dict]:
+    if LOAD_FORMAT == "parquet":
+        # Columnar intermediate written by pipeline.py, rows rendered like the CSV
+        import pipeline
+        yield from pipeline.iter_rows(os.path.splitext(path)[0] + ".parquet")
+        return
+    with open(path, mode="r", newline="", encoding="utf-8") as file:
+        yield from csv.DictReader(file, delimiter="|")
+
+DELETE_BATCH_QUERY = query_catalog.register("batch_loader.delete_batch", """
+    MATCH (n)
+    WITH n LIMIT $limit
+    DETACH DELETE n
+    RETURN count(*) AS deleted
+""", limit=int)
+
+def delete_all_nodes_batched(driver, database: str = connection.DATABASE, batch_size: int = DELETE_BATCH_SIZE):
+    """
+    Equivalent of `MATCH (n) DETACH DELETE n`, committed in bounded batches.
+    """
+    def delete_batch(tx):
+        return query_catalog.run(tx, DELETE_BATCH_QUERY, limit=batch_size).single()["deleted"]
+
+    with driver.session(database=database) as session:
+        while session.execute_write(delete_batch) > 0:
+            pass
+
+def _write_batch(tx, query: query_catalog.Query, rows: List[dict]):
+    query_catalog.run(tx, query, rows=rows).consume()
+
+def _run_stage(driver, database, stage, batches, label_done, slots, stats, errors):
+    for label in stage.requires:
+        label_done[label].wait()
+    failed = [label for label in stage.requires if label in errors]
+    if failed:
+        errors.setdefault(stage.creates or stage.name, f"skipped, {failed} failed to load")
+
+    rows = []
+    try:
+        with driver.session(database=database) as session:
+            while True:
+                rows = batches.get()
+                if rows is None:
+                    break
+                if stage.name in errors or (stage.creates and stage.creates in errors):
+                    continue  # keep draining so the reader never blocks on a dead stage
+                start = time.perf_counter()
+                try:
+                    with slots:
+                        session.execute_write(_write_batch, stage.query, rows)
+                except Exception as e:
+                    errors[stage.creates or stage.name] = e
+                    print(f"Stage {stage.name} failed: {e}")
+                    continue
+                stats[stage.name]["rows"] += len(rows)
+                stats[stage.name]["seconds"] += time.perf_counter() - start
+    except Exception as e:
+        # No session: record it and drain, the reader must still reach its sentinel
+        errors[stage.creates or stage.name] = e
+        print(f"Stage {stage.name} failed: {e}")
+        while rows is not None:
+            rows = batches.get()
+    finally:
+        if stage.creates:
+            label_done[stage.creates].set()
+
+def _read_into(stages: List[Stage], queues: Dict[str, queue.Queue], csv_dir: str, batch_size: int):
+    """
+    Stream each source of `stages` once into their queues. The end-of-stream sentinels are
+    queued even when reading fails, so the stage threads finish and the error surfaces.
+    """
+    try:
+        for source in sorted({stage.source for stage in stages}, key=lambda s: s != PAPERS_CSV):
+            source_stages = [stage for stage in stages if stage.source == source]
+            buffers = {stage.name: [] for stage in source_stages}
+            for row in read_csv_rows(os.path.join(csv_dir, source)):
+                for stage in source_stages:
+                    buffer = buffers[stage.name]
+                    buffer.extend(stage.extract(row))
+                    if len(buffer) >= batch_size:
+                        queues[stage.name].put(buffer[:batch_size])
+                        del buffer[:batch_size]
+            for stage in source_stages:
+                if buffers[stage.name]:
+                    queues[stage.name].put(buffers[stage.name])
+    finally:
+        for stage in stages:
+            queues[stage.name].put(None)
+
+def _run_pass(driver, database, stages, csv_dir, batch_size, workers, label_done, slots, stats, errors):
+    # Bounded queues: the reader waits for the slowest stage instead of buffering the file
+    queues = {stage.name: queue.Queue(maxsize=2 * workers) for stage in stages}
+    with ThreadPoolExecutor(max_workers=max(len(stages), 1)) as pool:
+        futures = [
+            pool.submit(_run_stage, driver, database, stage, queues[stage.name], label_done, slots, stats, errors)
+            for stage in stages
+        ]
+        # A reader error propagates once the pool has joined the drained stage threads
+        _read_into(stages, queues, csv_dir, batch_size)
+        for future in futures:
+            future.result()
+
+def run_batched_load(driver, csv_dir: str = CSV_DIR, batch_size: int = BATCH_SIZE,
+                     workers: int = LOAD_WORKERS, database: str = connection.DATABASE,
+                     stages: Optional[List[Stage]] = None) -> Dict[str, dict]:
+    """
+    Stream the CSVs in two passes and push their rows through every stage in
+    `UNWIND $rows` batches: node stages run concurrently in the first pass, relationship
+    stages in the second, once every label they MATCH on is loaded. Each pass re-reads
+    the files, so client memory stays bounded by the queues whatever the graph size.
+    At most `workers` write transactions are in flight at any time.
+    Returns the per-stage row counts and timings. The derived properties are not touched:
+    callers run refresh_derived once the load has committed.
+    """
+    stages = stages if stages is not None else build_stages()
+    stats = {stage.name: {"rows": 0, "seconds": 0.0} for stage in stages}
+    errors = {}
+    label_done = defaultdict(threading.Event)
+    slots = threading.BoundedSemaphore(workers)
+
+    started = time.perf_counter()
+    for pass_stages in ([stage for stage in stages if not stage.requires],
+                        [stage for stage in stages if stage.requires]):
+        if pass_stages:
+            _run_pass(driver, database, pass_stages, csv_dir, batch_size, workers, label_done, slots, stats, errors)
+    if errors:
+        print_report(stats, time.perf_counter() - started)
+        raise RuntimeError(f"Batched load failed: {errors}")
+
+    print_report(stats, time.perf_counter() - started)
+    return stats
+
+def refresh_derived(session) -> Dict[str, dict]:
+    """
+    Materialize the properties the analytics read (citation stats, publication counts,
+    h-index, keywords) and bump the graph version. Run after every full load.
+    """
+    stats = {}
+    for name, refresh in (("citation_stats", citation_metrics.refresh_all_citation_stats),
+                          ("publication_counts", impact_factor.refresh_publication_counts),
+                          ("h_index", author_metrics.refresh_all_h_index),
+                          ("keywords", keywords.load_keywords)):
+        start = time.perf_counter()
+        stats[name] = {"rows": refresh(session), "seconds": time.perf_counter() - start}
+    result_cache.bump_version(session)
+    return stats
+
+def print_report(stats: Dict[str, dict], total: float):
+    print(f"{'stage':<20}{'rows':>12}{'seconds':>10}{'rows/sec':>12}")
+    for name, stage_stats in stats.items():
+        seconds = stage_stats["seconds"]
+        rate = stage_stats["rows"] / seconds if seconds > 0 else 0.0
+        print(f"{name:<20}{stage_stats['rows']:>12}{seconds:>10.2f}{rate:>12.0f}")
+    print(f"Total wall time: {total:.2f}s")
+
+
+def main():
+    with connection.Connection() as driver:
+        print("Connection successful!")
+        delete_all_nodes_batched(driver)
+        schema.bootstrap_schema(driver)
+        print(f'Loading {CSV_DIR} in batches of {BATCH_SIZE} rows with {LOAD_WORKERS} workers...')
+        run_batched_load(driver)
+        start = time.perf_counter()
+        with driver.session(database=connection.DATABASE) as session:
+            stats = refresh_derived(session)
+        print_report(stats, time.perf_counter() - start)
+        print('Creation and loading done for the database.')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import batch_loader
+import B_querying
+import config
+import connection
+import schema
+import synthetic_graph
+
+config.load_env()
+
+BENCH_DIR = os.getenv("BENCH_DIR", "./bench")
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+ANALYTICS = B_querying.ANALYTICS
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    values = np.asarray(latencies)
+    return {
+        "runs": len(latencies),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "mean": float(values.mean()),
+    }
+
+def dataset_dir(n_papers: int) -> str:
+    path = os.path.join(BENCH_DIR, "data", str(n_papers))
+    if not os.path.exists(os.path.join(path, "papers_venues.csv")):
+        print(f"Generating {n_papers} papers into {path}...")
+        synthetic_graph.generate_dataset(n_papers, path)
+    return path
+
+def bench_load(driver, csv_dir: str) -> Dict[str, dict]:
+    batch_loader.delete_all_nodes_batched(driver)
+    schema.bootstrap_schema(driver)
+    stats = batch_loader.run_batched_load(driver, csv_dir=csv_dir)
+    # The analytics read citationCount, hIndex and publication counts, so time them on a refreshed graph
+    with driver.session(database=connection.DATABASE) as session:
+        stats.update(batch_loader.refresh_derived(session))
+    return {
+        stage: {**stage_stats, "rows_per_sec": stage_stats["rows"] / stage_stats["seconds"] if stage_stats["seconds"] else 0.0}
+        for stage, stage_stats in stats.items()
+    }
+
+def _drain(tx, query) -> int:
+    return sum(1 for _ in query(tx))
+
+def bench_queries(driver, repeats: int) -> Dict[str, dict]:
+    results = {}
+    with driver.session(database=connection.DATABASE) as session:
+        for query in ANALYTICS:
+            latencies = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                session.execute_read(_drain, query)
+                latencies.append(time.perf_counter() - start)
+            results[query.__name__] = latency_stats(latencies)
+    return results
+
+def run_benchmark(driver, sizes: List[str], repeats: int) -> dict:
+    report = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeats": repeats, "sizes": {}}
+    for size in sizes:
+        n_papers = SIZES[size]
+        csv_dir = dataset_dir(n_papers)
+        start = time.perf_counter()
+        load = bench_load(driver, csv_dir)
+        load_seconds = time.perf_counter() - start
+        report["sizes"][size] = {
+            "papers": n_papers,
+            "load_seconds": load_seconds,
+            "load": load,
+            "queries": bench_queries(driver, repeats),
+            "peak_rss_mb": peak_rss_mb(),  # process-wide high-water mark up to this size
+        }
+        print(f"{size}: loaded in {load_seconds:.1f}s, peak RSS {report['sizes'][size]['peak_rss_mb']:.0f} MiB")
+    return report
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Regressions against `baseline`: stage throughput dropping, or query p95 latency
+    growing, by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    for size, current in report["sizes"].items():
+        previous = baseline.get("sizes", {}).get(size)
+        if previous is None:
+            continue
+        for stage, stats in current["load"].items():
+            before = previous["load"].get(stage, {}).get("rows_per_sec")
+            if before and stats["rows_per_sec"] < before * (1 - tolerance):
+                regressions.append(f"{size} load.{stage}: {stats['rows_per_sec']:.0f} rows/s (baseline {before:.0f})")
+        for query, stats in current["queries"].items():
+            before = previous["queries"].get(query, {}).get("p95")
+            if before and stats["p95"] > before * (1 + tolerance):
+                regressions.append(f"{size} {query}: p95 {stats['p95']:.3f}s (baseline {before:.3f}s)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None, driver: Optional[connection.Connection] = None):
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and analytics on synthetic graphs.")
+    parser.add_argument("--sizes", default="10k", help=f"comma-separated subset of {','.join(SIZES)}")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    with connection.connect(driver) as driver:
+        report = run_benchmark(driver, args.sizes.split(","), args.repeats)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved as baseline {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
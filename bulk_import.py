@@ -0,0 +1,220 @@
+import csv
+import os
+import sys
+import time
+from itertools import zip_longest
+from typing import Dict, Iterable, List
+
+import config
+
+config.load_env()
+
+CSV_DIR = os.getenv("CSV_DIR", "./csv")
+IMPORT_DIR = os.getenv("IMPORT_DIR", "./import")
+
+# File name -> neo4j-admin header. `:ID(Group)` keeps each label in its own id space,
+# so e.g. a Field and a Journal with the same name do not collide.
+NODE_FILES: Dict[str, List[str]] = {
+    "Paper": ["paperID:ID(Paper)", "title", "year:int", "abstract", "pages", "doi"],
+    "Author": ["authorID:ID(Author)", "name"],
+    "Field": ["name:ID(Field)"],
+    "Journal": ["name:ID(Journal)"],
+    "Volume": ["volumeId:ID(Volume)", "volume"],
+    "Edition": ["editionId:ID(Edition)", "city"],
+    "PublicationVenue": ["name:ID(PublicationVenue)"],
+    "Affiliation": ["affiliation:ID(Affiliation)"],
+}
+
+RELATIONSHIP_FILES: Dict[str, List[str]] = {
+    "WRITTEN_BY": [":START_ID(Paper)", ":END_ID(Author)"],
+    "IN_FIELD": [":START_ID(Paper)", ":END_ID(Field)"],
+    "PUBLISHED_IN": [":START_ID(Paper)", ":END_ID(Volume)"],
+    "PUBLISHED_IN_VENUE": [":START_ID(Paper)", ":END_ID(Edition)"],
+    "VOLUME_OF": [":START_ID(Volume)", ":END_ID(Journal)"],
+    "BELONGS_TO": [":START_ID(Edition)", ":END_ID(PublicationVenue)"],
+    "AFFILIATED_TO": [":START_ID(Author)", ":END_ID(Affiliation)"],
+    "CITES": [":START_ID(Paper)", ":END_ID(Paper)"],
+    "REVIEWED_BY": [":START_ID(Paper)", ":END_ID(Author)", "reviewApprovement", "reviewDesc"],
+}
+
+
+def iter_split(value: str, sep: str = ";", keep_empty: bool = False) -> Iterable[str]:
+    """
+    Lazily yield the non-empty items of a packed column without building the full list.
+    Parallel columns (authorIDs/authorNames, the review columns) pass keep_empty so their
+    items stay aligned by position, like str.split.
+    """
+    if not value:
+        return
+    start = 0
+    while True:
+        end = value.find(sep, start)
+        item = value[start:] if end == -1 else value[start:end]
+        if item or keep_empty:
+            yield item
+        if end == -1:
+            return
+        start = end + 1
+
+def _value(row: dict, key: str) -> str:
+    return row.get(key) or ""
+
+def _int(value: str) -> str:
+    return str(int(float(value))) if value else ""
+
+
+class ImportWriter:
+    """
+    One csv.writer per node/relationship file, plus the key sets used for deduplication.
+    Memory grows with the number of distinct entities, never with the number of rows.
+    """
+    def __init__(self, import_dir: str):
+        os.makedirs(import_dir, exist_ok=True)
+        self.paths = {}
+        self._files = {}
+        self._writers = {}
+        self._seen = {}
+        self.counts = {}
+        for name, header in {**NODE_FILES, **RELATIONSHIP_FILES}.items():
+            path = os.path.join(import_dir, f"{name.lower()}.csv")
+            file = open(path, mode="w", newline="", encoding="utf-8")
+            self.paths[name] = path
+            self._files[name] = file
+            self._writers[name] = csv.writer(file)
+            self._writers[name].writerow(header)
+            self._seen[name] = set()
+            self.counts[name] = 0
+
+    def write(self, name: str, *values):
+        self._writers[name].writerow(values)
+        self.counts[name] += 1
+
+    def has(self, name: str, key) -> bool:
+        return key in self._seen[name]
+
+    def write_once(self, name: str, key, *values):
+        if key in self._seen[name]:
+            return
+        self._seen[name].add(key)
+        self.write(name, *values)
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+
+
+def normalize_paper_row(writer: ImportWriter, row: dict):
+    paper_id = row["paperID"]
+    if writer.has("Paper", paper_id):
+        return  # duplicate row: its edges were already emitted
+    writer.write_once("Paper", paper_id, paper_id, _value(row, "title"), _int(_value(row, "year")),
+                      _value(row, "abstract"), _value(row, "pages"), _value(row, "doi"))
+
+    authors = zip_longest(iter_split(_value(row, "authorIDs"), keep_empty=True),
+                          iter_split(_value(row, "authorNames"), keep_empty=True), fillvalue="")
+    row_authors = set()
+    for author_id, name in authors:
+        if not author_id or author_id in row_authors:
+            continue
+        row_authors.add(author_id)
+        writer.write_once("Author", author_id, author_id, name)
+        writer.write("WRITTEN_BY", paper_id, author_id)
+
+    for field in dict.fromkeys(iter_split(_value(row, "fields"))):
+        writer.write_once("Field", field, field)
+        writer.write("IN_FIELD", paper_id, field)
+
+    journal, volume_id, volume = _value(row, "journal_name"), _value(row, "volume_id"), _value(row, "volume")
+    if journal:
+        writer.write_once("Journal", journal, journal)
+    if volume_id:
+        writer.write_once("Volume", volume_id, volume_id, volume)
+        writer.write("PUBLISHED_IN", paper_id, volume_id)
+        if journal:
+            writer.write_once("VOLUME_OF", (volume_id, journal), volume_id, journal)
+
+    venue, edition_id = _value(row, "publicationVenue_name"), _value(row, "edition_id")
+    if venue:
+        writer.write_once("PublicationVenue", venue, venue)
+    if edition_id:
+        writer.write_once("Edition", edition_id, edition_id, _value(row, "city_venue"))
+        writer.write("PUBLISHED_IN_VENUE", paper_id, edition_id)
+        if venue:
+            writer.write_once("BELONGS_TO", (edition_id, venue), edition_id, venue)
+
+    for cited_id in dict.fromkeys(iter_split(_value(row, "citedPaperID"))):
+        writer.write("CITES", paper_id, cited_id)
+
+    approvements = iter_split(_value(row, "reviewsApprovements"), keep_empty=True)
+    descs = iter_split(_value(row, "reviewsDesc"), keep_empty=True)
+    for reviewer_id in iter_split(_value(row, "reviewerIDs"), keep_empty=True):
+        approvement, desc = next(approvements, ""), next(descs, "")
+        if reviewer_id:
+            writer.write("REVIEWED_BY", paper_id, reviewer_id, approvement, desc)
+
+def normalize_affiliation_row(writer: ImportWriter, row: dict):
+    author_id, affiliation = _value(row, "authorID"), _value(row, "affiliation")
+    if not (author_id and affiliation):
+        return
+    writer.write_once("Affiliation", affiliation, affiliation)
+    writer.write_once("AFFILIATED_TO", (author_id, affiliation), author_id, affiliation)
+
+def normalize(csv_dir: str = CSV_DIR, import_dir: str = IMPORT_DIR) -> ImportWriter:
+    """
+    Read papers_venues.csv and authors_affiliations.csv once each and write the
+    deduplicated neo4j-admin node and relationship files into `import_dir`.
+    """
+    writer = ImportWriter(import_dir)
+    try:
+        with open(os.path.join(csv_dir, "papers_venues.csv"), newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file, delimiter="|"):
+                normalize_paper_row(writer, row)
+        with open(os.path.join(csv_dir, "authors_affiliations.csv"), newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file, delimiter="|"):
+                normalize_affiliation_row(writer, row)
+    finally:
+        writer.close()
+    return writer
+
+def import_command(writer: ImportWriter, database: str = "neo4j") -> str:
+    """
+    neo4j-admin invocation for the generated files. CITES may point at papers outside
+    the dataset, which LOAD CSV silently skipped, hence --skip-bad-relationships.
+    """
+    args = ["neo4j-admin", "database", "import", "full", database, "--overwrite-destination=true",
+            "--multiline-fields=true", "--skip-bad-relationships=true"]
+    args += [f"--nodes={label}={writer.paths[label]}" for label in NODE_FILES]
+    args += [f"--relationships={rel_type}={writer.paths[rel_type]}" for rel_type in RELATIONSHIP_FILES]
+    return " ".join(args)
+
+
+def refresh(driver=None):
+    """
+    Post-import step, once Neo4j runs again: create the schema, then materialize the
+    properties the analytics read, exactly as after a batched load.
+    """
+    import batch_loader
+    import connection
+    import schema
+    start = time.perf_counter()
+    with connection.connect(driver) as driver:
+        schema.bootstrap_schema(driver)
+        with driver.session(database=connection.DATABASE) as session:
+            stats = batch_loader.refresh_derived(session)
+    batch_loader.print_report(stats, time.perf_counter() - start)
+
+
+def main():
+    if "--refresh" in sys.argv:
+        refresh()
+        return
+    writer = normalize()
+    for name, count in writer.counts.items():
+        print(f"{name}: {count} rows")
+    print("Import with (Neo4j must be stopped):")
+    print(import_command(writer))
+    print("Then start Neo4j and run `python bulk_import.py --refresh` to create the indexes and materialize "
+          "citation stats, publication counts, h-index and keywords.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+from typing import Dict, Iterable, List, Set
+
+import config
+import connection
+import query_catalog
+
+config.load_env()
+
+PAPER_BATCH_SIZE = int(os.getenv("PAPER_BATCH_SIZE", "5000"))
+
+# Neo4j properties cannot hold maps, so the per-citing-year histogram is stored as two
+# parallel arrays sorted by year: citationYears[i] -> citationYearCounts[i]
+CITATION_STATS_QUERY = query_catalog.register("citation_metrics.citation_stats", """
+    UNWIND $paperIDs AS paperID
+    MATCH (p:Paper {paperID: paperID})
+    OPTIONAL MATCH (citing:Paper)-[:CITES]->(p)
+    WITH p, citing.year AS year, count(citing) AS citations
+    ORDER BY year
+    WITH p, sum(citations) AS total,
+        collect(CASE WHEN year IS NOT NULL AND citations > 0 THEN [year, citations] END) AS buckets
+    SET p.citationCount = total,
+        p.citationYears = [bucket IN buckets | bucket[0]],
+        p.citationYearCounts = [bucket IN buckets | bucket[1]]
+""", paperIDs=list)
+
+PAPER_PAGE_QUERY = query_catalog.register("citation_metrics.paper_page", """
+    MATCH (p:Paper)
+    WHERE p.paperID > $after
+    RETURN p.paperID AS paperID
+    ORDER BY p.paperID
+    LIMIT $limit
+""", after=str, limit=int)
+
+CITED_PAPERS_QUERY = query_catalog.register("citation_metrics.cited_papers", """
+    UNWIND $paperIDs AS paperID
+    MATCH (:Paper {paperID: paperID})-[:CITES]->(cited:Paper)
+    RETURN DISTINCT cited.paperID AS paperID
+""", paperIDs=list)
+
+
+def citation_histogram(years: Iterable[int]) -> Dict[int, int]:
+    """
+    Reference implementation: citing year -> number of citations received that year.
+    """
+    histogram: Dict[int, int] = {}
+    for year in years:
+        histogram[year] = histogram.get(year, 0) + 1
+    return dict(sorted(histogram.items()))
+
+def _set_citation_stats(tx, paper_ids: List[str]):
+    query_catalog.run(tx, CITATION_STATS_QUERY, paperIDs=paper_ids).consume()
+
+def _paper_page(tx, after: str, limit: int) -> List[str]:
+    return [record["paperID"] for record in query_catalog.run(tx, PAPER_PAGE_QUERY, after=after, limit=limit)]
+
+def _cited_papers(tx, paper_ids: List[str]) -> List[str]:
+    return [record["paperID"] for record in query_catalog.run(tx, CITED_PAPERS_QUERY, paperIDs=paper_ids)]
+
+def cited_papers(session, paper_ids: Iterable[str], batch_size: int = PAPER_BATCH_SIZE) -> Set[str]:
+    """
+    Papers cited by `paper_ids`. Call it before and after rewiring their CITES edges to
+    find every paper whose counts moved.
+    """
+    paper_ids = list(paper_ids)
+    cited = set()
+    for i in range(0, len(paper_ids), batch_size):
+        cited.update(session.execute_read(_cited_papers, paper_ids[i:i + batch_size]))
+    return cited
+
+def refresh_citation_stats(session, paper_ids: Iterable[str], batch_size: int = PAPER_BATCH_SIZE) -> int:
+    """
+    Recompute citationCount and the per-year histogram for just these papers.
+    """
+    paper_ids = sorted(set(paper_ids))
+    for i in range(0, len(paper_ids), batch_size):
+        session.execute_write(_set_citation_stats, paper_ids[i:i + batch_size])
+    return len(paper_ids)
+
+def refresh_all_citation_stats(session, batch_size: int = PAPER_BATCH_SIZE) -> int:
+    """
+    Recompute the citation properties of every paper, one committed batch at a time
+    (keyset pagination over the paperID constraint index).
+    """
+    after, total = "", 0
+    while True:
+        paper_ids = session.execute_read(_paper_page, after, batch_size)
+        if not paper_ids:
+            return total
+        session.execute_write(_set_citation_stats, paper_ids)
+        total += len(paper_ids)
+        after = paper_ids[-1]
+
+
+def main():
+    with connection.Connection() as driver:
+        print("Connection successful!")
+        with driver.session(database=connection.DATABASE) as session:
+            count = refresh_all_citation_stats(session)
+            print(f"Updated the citation counts of {count} papers.")
+
+if __name__ == "__main__":
+    main()
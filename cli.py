@@ -0,0 +1,122 @@
+import argparse
+import shlex
+import sys
+import time
+from typing import List, Optional
+
+import config
+
+config.load_env()
+
+# Steps that talk to Neo4j; a pipeline opens one pooled driver for all of them
+DATABASE_STEPS = {"load", "script", "query", "bench"}
+STEPS = ["pull", "generate", "load", "script", "query", "bench"]
+
+
+def pull(args, driver=None):
+    import A2_api_pull
+    A2_api_pull.main(harvest=args.harvest)
+
+def generate(args, driver=None):
+    import synthetic_graph
+    synthetic_graph.generate_dataset(args.papers, args.out, seed=args.seed)
+    print(f"Wrote {args.papers} papers to {args.out}")
+
+def load(args, driver=None):
+    import A2_create_graph
+    A2_create_graph.main(batched=args.batched, delta=args.delta, profile=args.profile, driver=driver,
+                         rebuild_snapshot=args.snapshot)
+
+def script(args, driver=None):
+    import create_graph
+    create_graph.main(resume=args.resume, driver=driver)
+
+def query(args, driver=None):
+    import B_querying
+    B_querying.main(args.query_args, driver=driver)
+
+def bench(args, driver=None):
+    import benchmark
+    benchmark.main(args.bench_args, driver=driver)
+
+HANDLERS = {"pull": pull, "generate": generate, "load": load, "script": script, "query": query, "bench": bench}
+
+
+def pipeline(args):
+    """
+    Run several steps in one process. Modules are imported as their step starts and every
+    database step shares one Connection, so the pool, its bookmarks and the query catalog
+    warmup carry over instead of being rebuilt per script.
+    """
+    steps = [step.strip() for step in args.steps.split(",") if step.strip()]
+    unknown = [step for step in steps if step not in HANDLERS]
+    if unknown:
+        raise SystemExit(f"Unknown steps {unknown}, expected a subset of {STEPS}")
+    args.query_args = shlex.split(args.query_args)
+    args.bench_args = shlex.split(args.bench_args)
+
+    driver = None
+    if DATABASE_STEPS.intersection(steps):
+        import connection
+        driver = connection.Connection()
+    try:
+        for step in steps:
+            start = time.perf_counter()
+            HANDLERS[step](args, driver)
+            print(f"[{step}] done in {time.perf_counter() - start:.2f}s")
+    finally:
+        if driver is not None:
+            driver.print_metrics()
+            driver.close()
+
+
+def _add_pull(parser):
+    parser.add_argument("--harvest", action="store_true", help="page through the API with the resumable harvester")
+
+def _add_generate(parser):
+    parser.add_argument("--papers", type=int, default=10_000, help="synthetic papers to generate")
+    parser.add_argument("--out", default="./csv", help="directory for the generated CSVs (CSV_DIR for --batched)")
+    parser.add_argument("--seed", type=int, default=42)
+
+def _add_load(parser):
+    parser.add_argument("--batched", action="store_true", help="stream the CSVs in UNWIND batches")
+    parser.add_argument("--delta", action="store_true", help="apply only the papers that changed")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="with --delta, also rebuild the snapshot and distance index")
+    parser.add_argument("--profile", action="store_true", default=None, help="PROFILE every load stage")
+
+def _add_script(parser):
+    parser.add_argument("--resume", action="store_true", help="skip statements that already succeeded")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Pull, generate, load, query and benchmark the graph.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    _add_pull(commands.add_parser("pull", help="fetch papers from Semantic Scholar into ./csv"))
+    _add_generate(commands.add_parser("generate", help="write a synthetic dataset"))
+    _add_load(commands.add_parser("load", help="load the CSVs into Neo4j (A2_create_graph)"))
+    _add_script(commands.add_parser("script", help="run the Cypher script (create_graph)"))
+    query_parser = commands.add_parser("query", help="run the analytics (B_querying)")
+    query_parser.add_argument("query_args", nargs=argparse.REMAINDER, help="arguments for B_querying")
+    bench_parser = commands.add_parser("bench", help="benchmark synthetic graphs (benchmark)")
+    bench_parser.add_argument("bench_args", nargs=argparse.REMAINDER, help="arguments for benchmark")
+
+    pipeline_parser = commands.add_parser("pipeline", help="run several steps with one shared driver")
+    pipeline_parser.add_argument("--steps", default="pull,load,query", help=f"comma-separated subset of {','.join(STEPS)}")
+    for add in (_add_pull, _add_generate, _add_load, _add_script):
+        add(pipeline_parser)
+    pipeline_parser.add_argument("--query-args", default="", help="arguments for the query step, e.g. '--format csv'")
+    pipeline_parser.add_argument("--bench-args", default="", help="arguments for the bench step")
+    return parser
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "profile", False) is None:
+        import instrumentation
+        args.profile = instrumentation.INSTRUMENT_PROFILE
+    if args.command == "pipeline":
+        pipeline(args)
+    else:
+        HANDLERS[args.command](args)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,30 @@
+import functools
+import json
+import os
+from typing import Any, List
+
+from dotenv import load_dotenv
+
+
+@functools.lru_cache(maxsize=None)
+def load_env() -> bool:
+    """
+    Read .env into os.environ once per process. Every module calls this at import, so a
+    command that imports many of them (cli.py pipelines) parses the file only once.
+    """
+    return load_dotenv()
+
+@functools.lru_cache(maxsize=None)
+def json_setting(name: str) -> Any:
+    """
+    A JSON value from the environment, parsed on first use only. None when unset.
+    """
+    load_env()
+    value = os.getenv(name)
+    return json.loads(value) if value else None
+
+def json_list(name: str) -> List[Any]:
+    """
+    A JSON list from the environment (e.g. JOURNAL_NAMES), empty when unset.
+    """
+    return json_setting(name) or []
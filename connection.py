@@ -0,0 +1,202 @@
+import contextlib
+import functools
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from neo4j import GraphDatabase
+from neo4j.exceptions import DriverError, Neo4jError
+
+import config
+
+config.load_env()
+
+URI = os.getenv("URI")
+AUTH = (os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"))
+DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+
+POOL_SIZE = int(os.getenv("NEO4J_POOL_SIZE", "50"))
+ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+# Pooled connections idle for longer than this are pinged before they are handed out
+LIVENESS_TIMEOUT = float(os.getenv("NEO4J_LIVENESS_TIMEOUT", "30"))
+MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+# How long execute_read / execute_write keep retrying transient errors (deadlocks, leader
+# switches, lost connections), with the driver's exponential backoff and jitter
+RETRY_TIME = float(os.getenv("NEO4J_RETRY_TIME", "30"))
+# retry() for auto-commit work outside managed transactions
+RETRY_ATTEMPTS = int(os.getenv("NEO4J_RETRY_ATTEMPTS", "5"))
+RETRY_DELAY = float(os.getenv("NEO4J_RETRY_DELAY", "0.5"))
+# Pool gauges for node_exporter's textfile collector, written on close; empty disables
+POOL_PROM = os.getenv("NEO4J_POOL_PROM", "./metrics/neo4j_pool.prom")
+METRIC_PREFIX = "neo4j_lab_pool"
+
+
+def retry(work: Callable, *args, attempts: int = RETRY_ATTEMPTS, delay: float = RETRY_DELAY, **kwargs):
+    """
+    Call `work` again, with exponential backoff and jitter, while it raises a retryable
+    error. Only for idempotent auto-commit work such as schema statements; managed
+    transactions are already retried by the driver.
+    """
+    for attempt in range(attempts):
+        try:
+            return work(*args, **kwargs)
+        except (Neo4jError, DriverError) as error:
+            if not error.is_retryable() or attempt == attempts - 1:
+                raise
+            time.sleep(delay * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+class _Session:
+    """
+    Session proxy that counts the transaction functions it runs and their retries.
+    """
+    def __init__(self, connection: "Connection", session):
+        self._connection = connection
+        self._session = session
+        self._closed = False
+
+    def execute_read(self, fn: Callable, *args, **kwargs):
+        return self._session.execute_read(self._connection._counted(fn), *args, **kwargs)
+
+    def execute_write(self, fn: Callable, *args, **kwargs):
+        return self._session.execute_write(self._connection._counted(fn), *args, **kwargs)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._session.close()
+            self._connection._released()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class Connection:
+    """
+    The pooled driver every entry point shares. Sessions default to NEO4J_DATABASE and
+    share one bookmark manager, so a session opened after a load (analytics, snapshot,
+    recommender) sees every transaction the load committed, without a global wait. Anything
+    else is delegated to the neo4j driver.
+    """
+    def __init__(self, uri: str = URI, auth: Tuple[str, str] = AUTH, database: str = DATABASE, **config):
+        settings = {
+            "max_connection_pool_size": POOL_SIZE,
+            "connection_acquisition_timeout": ACQUISITION_TIMEOUT,
+            "liveness_check_timeout": LIVENESS_TIMEOUT,
+            "max_connection_lifetime": MAX_CONNECTION_LIFETIME,
+            "max_transaction_retry_time": RETRY_TIME,
+            **config,
+        }
+        self.driver = GraphDatabase.driver(uri, auth=auth, **settings)
+        self.database = database
+        self.pool_size = settings["max_connection_pool_size"]
+        self.bookmarks = GraphDatabase.bookmark_manager()
+        self.counters = {"sessions": 0, "active_sessions": 0, "peak_sessions": 0,
+                         "transactions": 0, "retries": 0, "peak_in_use": 0}
+        self._lock = threading.Lock()
+
+    def session(self, **config) -> _Session:
+        config.setdefault("database", self.database)
+        config.setdefault("bookmark_manager", self.bookmarks)
+        session = _Session(self, self.driver.session(**config))
+        with self._lock:
+            self.counters["sessions"] += 1
+            self.counters["active_sessions"] += 1
+            self.counters["peak_sessions"] = max(self.counters["peak_sessions"], self.counters["active_sessions"])
+        return session
+
+    def _released(self):
+        with self._lock:
+            self.counters["active_sessions"] -= 1
+
+    def _counted(self, fn: Callable) -> Callable:
+        first = [True]
+
+        @functools.wraps(fn)
+        def counted(tx, *args, **kwargs):
+            # The connection is checked out now, so this is when the pool is busiest
+            _, in_use = self.pool_usage()
+            with self._lock:
+                self.counters["transactions" if first[0] else "retries"] += 1
+                self.counters["peak_in_use"] = max(self.counters["peak_in_use"], in_use)
+            first[0] = False
+            return fn(tx, *args, **kwargs)
+        return counted
+
+    def pool_usage(self) -> Tuple[int, int]:
+        """
+        (open connections, connections in use) over every server address. The driver has no
+        public pool API, so this reads its pool and reports (0, 0) if that ever changes.
+        """
+        pool = getattr(self.driver, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None or not hasattr(pool, "in_use_connection_count"):
+            return 0, 0
+        addresses = list(connections)
+        return (sum(len(connections.get(address, ())) for address in addresses),
+                sum(pool.in_use_connection_count(address) for address in addresses))
+
+    def metrics(self) -> Dict[str, float]:
+        opened, in_use = self.pool_usage()
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "pool_size": self.pool_size,
+            "connections": opened,
+            "in_use": in_use,
+            "utilization": in_use / self.pool_size,
+            "peak_utilization": counters["peak_in_use"] / self.pool_size,
+        }
+
+    def prometheus(self) -> str:
+        lines = []
+        for name, value in self.metrics().items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            lines.append(f"{METRIC_PREFIX}_{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: str = POOL_PROM):
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+        os.replace(path + ".tmp", path)
+
+    def print_metrics(self):
+        metrics = self.metrics()
+        print(f"Connection pool: {metrics['sessions']} sessions, {metrics['transactions']} transactions, "
+              f"{metrics['retries']} retries, peak {metrics['peak_in_use']}/{metrics['pool_size']} connections in use")
+
+    def close(self):
+        self.write_metrics()
+        self.driver.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getattr__(self, name):
+        if name == "driver":
+            raise AttributeError(name)
+        return getattr(self.driver, name)
+
+
+def connect(driver: Optional[Connection] = None):
+    """
+    Context manager for an entry point's driver: `driver` itself when the caller already
+    holds one (cli.py pipelines reuse a single pool across steps), otherwise a new
+    Connection that is closed on exit.
+    """
+    return contextlib.nullcontext(driver) if driver is not None else Connection()
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import author_metrics
+import batch_loader
+import citation_metrics
+import config
+import connection
+import impact_factor
+import keywords
+import query_catalog
+import result_cache
+import review_migration
+import schema
+
+config.load_env()
+
+CSV_DIR = os.getenv("CSV_DIR", "./csv")
+MANIFEST_PATH = os.getenv("MANIFEST_PATH", "./csv/.load_manifest.json")
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "10000"))
+
+# Outgoing paper edges that are derived from a single CSV row and rewired when it changes
+PAPER_EDGES = "WRITTEN_BY|CITES|REVIEWED_BY|IN_FIELD|PUBLISHED_IN|PUBLISHED_IN_VENUE"
+
+NODE_UPSERTS = [
+    (batch_loader.extract_paper, query_catalog.register("delta_loader.upsert_nodes.paper", """
+        UNWIND $rows AS row
+        MERGE (p:Paper {paperID: row.paperID})
+        SET p.title = row.title, p.year = row.year, p.abstract = row.abstract,
+            p.pages = row.pages, p.doi = row.doi
+    """, rows=list)),
+    (batch_loader.extract_authors, query_catalog.register("delta_loader.upsert_nodes.authors", """
+        UNWIND $rows AS row
+        MERGE (a:Author {authorID: row.authorID})
+        SET a.name = row.name
+    """, rows=list)),
+    (batch_loader.extract_fields, query_catalog.register("delta_loader.upsert_nodes.fields", """
+        UNWIND $rows AS row
+        MERGE (:Field {name: row.name})
+    """, rows=list)),
+    (batch_loader.extract_journal, query_catalog.register("delta_loader.upsert_nodes.journal", """
+        UNWIND $rows AS row
+        MERGE (:Journal {name: row.name})
+    """, rows=list)),
+    (batch_loader.extract_venue, query_catalog.register("delta_loader.upsert_nodes.venue", """
+        UNWIND $rows AS row
+        MERGE (:PublicationVenue {name: row.name})
+    """, rows=list)),
+    (batch_loader.extract_volume, query_catalog.register("delta_loader.upsert_nodes.volume", """
+        UNWIND $rows AS row
+        MERGE (vo:Volume {volumeId: row.volumeId})
+        SET vo.volume = row.volume
+    """, rows=list)),
+    (batch_loader.extract_edition, query_catalog.register("delta_loader.upsert_nodes.edition", """
+        UNWIND $rows AS row
+        MERGE (e:Edition {editionId: row.editionId})
+        SET e.city = row.city
+    """, rows=list)),
+]
+
+EDGE_UPSERTS = [
+    (batch_loader.extract_written_by, query_catalog.register("delta_loader.upsert_edges.written_by", """
+        UNWIND $rows AS row
+        MATCH (p:Paper {paperID: row.paperID})
+        MATCH (a:Author {authorID: row.authorID})
+        MERGE (p)-[:WRITTEN_BY]->(a)
+    """, rows=list)),
+    (batch_loader.extract_in_field, query_catalog.register("delta_loader.upsert_edges.in_field", """
+        UNWIND $rows AS row
+        MATCH (p:Paper {paperID: row.paperID})
+        MATCH (f:Field {name: row.field})
+        MERGE (p)-[:IN_FIELD]->(f)
+    """, rows=list)),
+    (batch_loader.extract_published_in, query_catalog.register("delta_loader.upsert_edges.published_in", """
+        UNWIND $rows AS row
+        MATCH (p:Paper {paperID: row.paperID})
+        MATCH (vo:Volume {volumeId: row.volumeId})
+        MERGE (p)-[:PUBLISHED_IN]->(vo)
+    """, rows=list)),
+    (batch_loader.extract_published_in_venue, query_catalog.register("delta_loader.upsert_edges.published_in_venue", """
+        UNWIND $rows AS row
+        MATCH (p:Paper {paperID: row.paperID})
+        MATCH (e:Edition {editionId: row.editionId})
+        MERGE (p)-[:PUBLISHED_IN_VENUE]->(e)
+    """, rows=list)),
+    (batch_loader.extract_volume_of, query_catalog.register("delta_loader.upsert_edges.volume_of", """
+        UNWIND $rows AS row
+        MATCH (vo:Volume {volumeId: row.volumeId})
+        MATCH (j:Journal {name: row.journal})
+        MERGE (vo)-[:VOLUME_OF]->(j)
+    """, rows=list)),
+    (batch_loader.extract_belongs_to, query_catalog.register("delta_loader.upsert_edges.belongs_to", """
+        UNWIND $rows AS row
+        MATCH (e:Edition {editionId: row.editionId})
+        MATCH (v:PublicationVenue {name: row.venue})
+        MERGE (e)-[:BELONGS_TO]->(v)
+    """, rows=list)),
+    (batch_loader.extract_citations, query_catalog.register("delta_loader.upsert_edges.citations", """
+        UNWIND $rows AS row
+        MATCH (p:Paper {paperID: row.paperID})
+        MATCH (c:Paper {paperID: row.citedID})
+        MERGE (p)-[:CITES]->(c)
+    """, rows=list)),
+    (batch_loader.extract_reviews, query_catalog.register("delta_loader.upsert_edges.reviews", """
+        UNWIND $rows AS row
+        MATCH (p:Paper {paperID: row.paperID})
+        MATCH (a:Author {authorID: row.authorID})
+        MERGE (p)-[r:REVIEWED_BY]->(a)
+        SET r.reviewApprovement = row.approvement, r.reviewDesc = row.desc
+    """, rows=list)),
+]
+
+CITES_UPSERT = EDGE_UPSERTS[6][1]
+
+UNLINK_PAPERS = query_catalog.register("delta_loader.unlink_papers", f"""
+    UNWIND $ids AS id
+    MATCH (p:Paper {{paperID: id}})-[r:{PAPER_EDGES}]->()
+    DELETE r
+""", ids=list)
+
+DELETE_PAPERS = query_catalog.register("delta_loader.delete_papers", """
+    UNWIND $ids AS id
+    MATCH (p:Paper {paperID: id})
+    DETACH DELETE p
+""", ids=list)
+
+# One row per author with its full affiliation list: edges to anything else are removed,
+# so an empty list unlinks an author that left the affiliations CSV
+UPSERT_AFFILIATIONS = query_catalog.register("delta_loader.upsert_affiliations", """
+    UNWIND $rows AS row
+    MATCH (a:Author {authorID: row.authorID})
+    OPTIONAL MATCH (a)-[old:AFFILIATED_TO]->(other:Affiliation)
+    WHERE NOT other.affiliation IN row.affiliations
+    DELETE old
+    WITH DISTINCT a, row
+    UNWIND row.affiliations AS affiliation
+    MERGE (f:Affiliation {affiliation: affiliation})
+    MERGE (a)-[:AFFILIATED_TO]->(f)
+""", rows=list)
+
+
+def row_hash(row: dict) -> str:
+    payload = "\x1f".join(f"{key}={row[key] or ''}" for key in sorted(row))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Dict[str, str]]:
+    if not os.path.exists(path):
+        return {"papers": {}, "affiliations": {}}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def save_manifest(manifest: Dict[str, Dict[str, str]], path: str = MANIFEST_PATH):
+    # Write-then-rename so a crash never leaves a truncated manifest behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, path)
+
+def _batches(items: List, batch_size: int) -> Iterable[List]:
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+def _write_batch(tx, query: query_catalog.Query, **params):
+    query_catalog.run(tx, query, **params).consume()
+
+def _write(session, query: query_catalog.Query, batch_size: int, **params):
+    key, items = next(iter(params.items()))
+    for batch in _batches(items, batch_size):
+        session.execute_write(_write_batch, query, **{key: batch})
+
+def _extract_all(extract, rows: List[dict]) -> List[dict]:
+    unique = {}
+    for row in rows:
+        for item in extract(row):
+            unique[tuple(sorted(item.items(), key=lambda kv: kv[0]))] = item
+    return list(unique.values())
+
+
+def diff_papers(path: str, known: Dict[str, str]):
+    """
+    Stream the papers CSV once and split it against the manifest hashes.
+    Returns (changed rows, current hashes, ids that left the source).
+    """
+    changed, current = [], {}
+    for row in batch_loader.read_csv_rows(path):
+        digest = row_hash(row)
+        current[row["paperID"]] = digest
+        if known.get(row["paperID"]) != digest:
+            changed.append(row)
+    removed = [paper_id for paper_id in known if paper_id not in current]
+    return changed, current, removed
+
+def diff_affiliations(path: str, known: Dict[str, str]):
+    """
+    Group the affiliations CSV per author and compare each author's whole set against
+    the manifest, so an author listed on several rows is replaced as one unit.
+    Returns (rows for UPSERT_AFFILIATIONS, current hashes).
+    """
+    grouped: Dict[str, List[dict]] = {}
+    for row in batch_loader.read_csv_rows(path):
+        grouped.setdefault(row["authorID"], []).append(row)
+    changed, current = [], {}
+    for author_id, rows in grouped.items():
+        digest = hashlib.sha1("".join(sorted(row_hash(row) for row in rows)).encode("utf-8")).hexdigest()
+        current[author_id] = digest
+        if known.get(author_id) != digest:
+            affiliations = _extract_all(batch_loader.extract_affiliated_to, rows)
+            changed.append({"authorID": author_id,
+                            "affiliations": [item["affiliation"] for item in affiliations]})
+    changed.extend({"authorID": author_id, "affiliations": []}
+                   for author_id in known if author_id not in current)
+    return changed, current
+
+def citations_to(path: str, paper_ids: Set[str], skip: Set[str]) -> List[dict]:
+    """
+    CITES edges from unchanged rows to newly added papers, which were dropped when those
+    rows were first loaded because the cited paper did not exist yet.
+    """
+    edges = []
+    for row in batch_loader.read_csv_rows(path):
+        if row["paperID"] in skip:
+            continue
+        edges.extend(edge for edge in batch_loader.extract_citations(row) if edge["citedID"] in paper_ids)
+    return edges
+
+def run_delta_load(driver, csv_dir: str = CSV_DIR, manifest_path: str = MANIFEST_PATH,
+                   batch_size: int = BATCH_SIZE, database: str = connection.DATABASE,
+                   touched: Optional[Set[str]] = None, recommender=None) -> Dict[str, int]:
+    """
+    Apply only what changed in the CSVs since the last delta load: upsert new and changed
+    papers, rewire their outgoing edges, and delete papers that left the source. Authors
+    whose affiliations changed get their full set replaced; those that left are unlinked.
+
+    `touched`, if given, receives every paper ID whose row or citation counts changed.
+    A recommender.Recommender built earlier in this process is refreshed over those IDs
+    and its communities written back; one in another process catches up through
+    refresh_if_stale.
+    """
+    manifest = load_manifest(manifest_path)
+    papers_path = os.path.join(csv_dir, batch_loader.PAPERS_CSV)
+    affiliations_path = os.path.join(csv_dir, batch_loader.AFFILIATIONS_CSV)
+
+    changed, current, removed = diff_papers(papers_path, manifest["papers"])
+    changed_ids = [row["paperID"] for row in changed]
+    added_ids = {paper_id for paper_id in changed_ids if paper_id not in manifest["papers"]}
+
+    changed_affiliations, current_affiliations = diff_affiliations(affiliations_path, manifest["affiliations"])
+
+    with driver.session(database=database) as session:
+        # Papers and authors reachable through the edges about to be removed
+        stale_papers = citation_metrics.cited_papers(session, changed_ids + removed)
+        stale_authors = author_metrics.affected_authors(session, changed_ids + removed)
+        stale_journals = impact_factor.paper_journals(session, changed_ids + removed)
+        _write(session, DELETE_PAPERS, batch_size, ids=removed)
+        # All nodes first, so edges between two changed papers never miss an endpoint
+        for extract, query in NODE_UPSERTS:
+            _write(session, query, batch_size, rows=_extract_all(extract, changed))
+        _write(session, UNLINK_PAPERS, batch_size, ids=changed_ids)
+        for extract, query in EDGE_UPSERTS:
+            _write(session, query, batch_size, rows=_extract_all(extract, changed))
+        if added_ids:
+            _write(session, CITES_UPSERT, batch_size, rows=citations_to(papers_path, added_ids, set(changed_ids)))
+        _write(session, UPSERT_AFFILIATIONS, batch_size, rows=changed_affiliations)
+        reviews = review_migration.refresh_reviews(session, changed_ids, removed)
+        keyword_papers = keywords.refresh_keywords(session, changed_ids, removed)
+        counted_papers = stale_papers | set(changed_ids) | citation_metrics.cited_papers(session, changed_ids)
+        citation_papers = citation_metrics.refresh_citation_stats(session, counted_papers)
+        if touched is not None:
+            touched.update(counted_papers, removed)
+        journals = impact_factor.refresh_publication_counts(
+            session, stale_journals | impact_factor.paper_journals(session, changed_ids))
+        h_index_authors = author_metrics.refresh_h_index(
+            session, stale_authors | author_metrics.affected_authors(session, changed_ids))
+        result_cache.bump_version(session)
+        if recommender is not None:
+            recommender.refresh(session, counted_papers | set(removed))
+            recommender.write(session)
+
+    save_manifest({"papers": current, "affiliations": current_affiliations}, manifest_path)
+    return {
+        "added": len(added_ids),
+        "updated": len(changed_ids) - len(added_ids),
+        "removed": len(removed),
+        "affiliations": len(changed_affiliations),
+        "citation_papers": citation_papers,
+        "journals": journals,
+        "h_index_authors": h_index_authors,
+        "reviews": reviews,
+        "keyword_papers": keyword_papers,
+    }
+
+
+def main():
+    with connection.Connection() as driver:
+        print("Connection successful!")
+        schema.bootstrap_schema(driver)
+        start = time.perf_counter()
+        counts = run_delta_load(driver)
+        print(f"Delta load done in {time.perf_counter() - start:.2f}s: {counts}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+import config
+import connection
+import graph_analytics
+import query_catalog
+import snapshot
+
+config.load_env()
+
+DISTANCE_DIR = os.getenv("DISTANCE_DIR", "./distance_index")
+DISTANCE_LANDMARKS = int(os.getenv("DISTANCE_LANDMARKS", "16"))
+DISTANCE_WORKERS = int(os.getenv("DISTANCE_WORKERS", "4"))
+
+UNREACHABLE = -1
+
+AUTHOR_BY_NAME_QUERY = query_catalog.register("distance_oracle.author_by_name", """
+    MATCH (a:Author {name: $name})
+    RETURN a.authorID AS authorID
+""", name=str)
+
+
+def coauthor_csr(paper_offsets: np.ndarray, paper_authors: np.ndarray, n_authors: int):
+    """
+    Exact co-author adjacency from the paper -> author CSR: every pair of authors of the
+    same paper, deduplicated and without self pairs.
+    """
+    degree = np.diff(paper_offsets)
+    slots = np.repeat(np.arange(len(degree)), degree)  # paper of every (paper, author) slot
+    _, partners = graph_analytics._neighbours(paper_offsets, paper_authors, slots)
+    authors = np.repeat(paper_authors, degree[slots])
+    keep = authors != partners
+    return snapshot.csr(authors[keep], partners[keep], n_authors)
+
+def bfs(offsets: np.ndarray, targets: np.ndarray, source: int, max_depth: Optional[int] = None) -> np.ndarray:
+    """
+    Hop distances from `source`, UNREACHABLE beyond `max_depth` or outside its component.
+    Expands one whole level at a time like graph_analytics._dependencies.
+    """
+    distance = np.full(len(offsets) - 1, UNREACHABLE, dtype=np.int32)
+    distance[source] = 0
+    frontier, depth = np.array([source]), 0
+    while frontier.size and (max_depth is None or depth < max_depth):
+        _, reached = graph_analytics._neighbours(offsets, targets, frontier)
+        frontier = np.unique(reached[distance[reached] == UNREACHABLE])
+        depth += 1
+        distance[frontier] = depth
+    return distance
+
+def _landmark_distances(landmark: int) -> np.ndarray:
+    distance = bfs(graph_analytics._STATE["offsets"], graph_analytics._STATE["targets"], landmark)
+    return np.minimum(distance, np.iinfo(np.int16).max).astype(np.int16)
+
+
+class DistanceOracle:
+    """
+    Co-author distances between authors. Hop distances from a few high-degree landmark
+    authors bound every query (|d(l, a) - d(l, b)| <= d(a, b) <= d(l, a) + d(l, b)); when
+    the bounds do not meet, a bidirectional BFS over the co-author CSR finds the exact
+    distance and stops as soon as it cannot beat the upper bound.
+    """
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, targets: np.ndarray,
+                 landmarks: np.ndarray, landmark_distances: np.ndarray, version: Optional[str] = None):
+        self.ids = ids
+        self.offsets = offsets
+        self.targets = targets
+        self.landmarks = landmarks
+        self.landmark_distances = landmark_distances  # landmarks x authors, int16
+        self.version = version
+
+    @property
+    def n_authors(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, snap: snapshot.Snapshot, n_landmarks: int = DISTANCE_LANDMARKS,
+              workers: int = DISTANCE_WORKERS) -> "DistanceOracle":
+        ids = snap.array("authors.ids")
+        offsets, targets = coauthor_csr(snap.array("written_by.offsets"), snap.array("written_by.targets"), len(ids))
+        # Highest co-author degree first: hubs sit on many shortest paths, so their bounds are tight
+        landmarks = np.argsort(-np.diff(offsets), kind="stable")[:min(n_landmarks, len(ids))]
+        if workers > 1 and len(landmarks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=graph_analytics._init_worker,
+                                     initargs=(offsets, targets)) as pool:
+                rows = list(pool.map(_landmark_distances, landmarks.tolist()))
+        else:
+            graph_analytics._init_worker(offsets, targets)
+            rows = [_landmark_distances(landmark) for landmark in landmarks.tolist()]
+        distances = np.vstack(rows) if rows else np.empty((0, len(ids)), dtype=np.int16)
+        return cls(np.asarray(ids), offsets, targets, landmarks, distances, snap.version)
+
+    def save(self, path: str = DISTANCE_DIR):
+        snapshot.save_arrays(path, {
+            "authors.ids": self.ids, "coauthors.offsets": self.offsets, "coauthors.targets": self.targets,
+            "landmarks": self.landmarks, "landmarks.distance": self.landmark_distances,
+        }, {"graphVersion": self.version, "counts": {"authors": self.n_authors, "coauthors": len(self.targets),
+                                                     "landmarks": len(self.landmarks)}})
+
+    @classmethod
+    def open(cls, path: str = DISTANCE_DIR) -> "DistanceOracle":
+        arrays = snapshot.Snapshot(path)
+        return cls(arrays.array("authors.ids"), arrays.array("coauthors.offsets"), arrays.array("coauthors.targets"),
+                   arrays.array("landmarks"), arrays.array("landmarks.distance"), arrays.version)
+
+    def index(self, author_id: str) -> int:
+        index = int(snapshot.lookup(self.ids, [author_id])[0])
+        if index < 0:
+            raise KeyError(f"Unknown author {author_id}")
+        return index
+
+    def bounds(self, a: int, b: int) -> Tuple[Optional[int], Optional[int]]:
+        """
+        (lower, upper) landmark bounds on the distance between author indices a and b,
+        (None, None) when a landmark proves they are in different components.
+        """
+        da = self.landmark_distances[:, a].astype(np.int64)
+        db = self.landmark_distances[:, b].astype(np.int64)
+        if np.any((da == UNREACHABLE) != (db == UNREACHABLE)):
+            return None, None
+        both = (da != UNREACHABLE) & (db != UNREACHABLE)
+        if not both.any():
+            return 0, None
+        return int(np.abs(da[both] - db[both]).max()), int((da[both] + db[both]).min())
+
+    def _bidirectional(self, a: int, b: int, upper: Optional[int]) -> Optional[int]:
+        distances = (np.full(self.n_authors, UNREACHABLE, dtype=np.int32),
+                     np.full(self.n_authors, UNREACHABLE, dtype=np.int32))
+        distances[0][a], distances[1][b] = 0, 0
+        frontiers, depths = [np.array([a]), np.array([b])], [0, 0]
+        while frontiers[0].size and frontiers[1].size:
+            if upper is not None and depths[0] + depths[1] + 1 >= upper:
+                return upper  # one more level cannot find anything shorter
+            side = 0 if frontiers[0].size <= frontiers[1].size else 1
+            own, other = distances[side], distances[1 - side]
+            _, reached = graph_analytics._neighbours(self.offsets, self.targets, frontiers[side])
+            frontier = np.unique(reached[own[reached] == UNREACHABLE])
+            depths[side] += 1
+            own[frontier] = depths[side]
+            met = frontier[other[frontier] != UNREACHABLE]
+            if met.size:
+                return depths[side] + int(other[met].min())
+            frontiers[side] = frontier
+        return None
+
+    def distance(self, author_a: str, author_b: str) -> Optional[int]:
+        """
+        Co-author distance between two authorIDs, None when they are not connected.
+        """
+        a, b = self.index(author_a), self.index(author_b)
+        if a == b:
+            return 0
+        lower, upper = self.bounds(a, b)
+        if lower is None:
+            return None
+        if lower == upper:
+            return upper
+        return self._bidirectional(a, b, upper)
+
+    def within(self, author_id: str, k: int) -> Dict[str, int]:
+        """
+        Every author within k co-author hops of `author_id`, with their distance.
+        """
+        distance = bfs(self.offsets, self.targets, self.index(author_id), max_depth=k)
+        reached = np.flatnonzero(distance > 0)
+        reached = reached[np.argsort(distance[reached], kind="stable")]
+        return {self.ids[i].decode("utf-8"): int(distance[i]) for i in reached.tolist()}
+
+
+def rebuild(snapshot_path: str = snapshot.SNAPSHOT_DIR, path: str = DISTANCE_DIR,
+            n_landmarks: int = DISTANCE_LANDMARKS, workers: int = DISTANCE_WORKERS) -> DistanceOracle:
+    """
+    Rebuild the oracle from the latest snapshot, as A2_create_graph does after each load.
+    """
+    oracle = DistanceOracle.build(snapshot.Snapshot(snapshot_path), n_landmarks, workers)
+    oracle.save(path)
+    return oracle
+
+def resolve_author(session, oracle: DistanceOracle, author: str) -> str:
+    # Accept an authorID or an author name such as "F. Viégas"
+    if snapshot.lookup(oracle.ids, [author])[0] >= 0 or session is None:
+        return author
+    record = query_catalog.run(session, AUTHOR_BY_NAME_QUERY, name=author).single()
+    if record is None:
+        raise KeyError(f"Unknown author {author}")
+    return record["authorID"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-author distance queries over a landmark index.")
+    parser.add_argument("authors", nargs="*", help="one author for --within, two for their distance")
+    parser.add_argument("--within", type=int, metavar="K", help="list the authors within K hops")
+    parser.add_argument("--build", action="store_true", help="rebuild the index from SNAPSHOT_DIR first")
+    parser.add_argument("--landmarks", type=int, default=DISTANCE_LANDMARKS)
+    parser.add_argument("--workers", type=int, default=DISTANCE_WORKERS)
+    args = parser.parse_args()
+
+    if args.build:
+        start = time.perf_counter()
+        oracle = rebuild(n_landmarks=args.landmarks, workers=args.workers)
+        print(f"Built distance index for {oracle.n_authors} authors with {len(oracle.landmarks)} landmarks "
+              f"in {time.perf_counter() - start:.2f}s")
+    else:
+        oracle = DistanceOracle.open()
+    if not args.authors:
+        return
+
+    with connection.Connection() as driver, driver.session(database=connection.DATABASE) as session:
+        authors = [resolve_author(session, oracle, author) for author in args.authors]
+    start = time.perf_counter()
+    if args.within is not None:
+        reached = oracle.within(authors[0], args.within)
+        elapsed = time.perf_counter() - start
+        for author_id, distance in reached.items():
+            print(f"{author_id}: {distance}")
+        print(f"{len(reached)} authors within {args.within} hops of {args.authors[0]} ({elapsed * 1000:.1f} ms)")
+    else:
+        distance = oracle.distance(authors[0], authors[1])
+        elapsed = time.perf_counter() - start
+        print(f"Distance between {args.authors[0]} and {args.authors[1]}: "
+              f"{'not connected' if distance is None else distance} ({elapsed * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
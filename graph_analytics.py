@@ -0,0 +1,312 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+import batch_loader
+import config
+import connection
+import query_catalog
+
+config.load_env()
+
+GRAPH_WORKERS = int(os.getenv("GRAPH_WORKERS", "1"))
+SCORE_BATCH_SIZE = int(os.getenv("SCORE_BATCH_SIZE", "10000"))
+
+NODE_KEYS = {"Paper": "paperID", "Author": "authorID"}
+
+PAPER_IDS_QUERY = query_catalog.register("graph_analytics.paper_ids", """
+    MATCH (p:Paper)
+    RETURN p.paperID AS id
+""")
+AUTHOR_IDS_QUERY = query_catalog.register("graph_analytics.author_ids", """
+    MATCH (a:Author)
+    RETURN a.authorID AS id
+""")
+CITES_EDGES_QUERY = query_catalog.register("graph_analytics.cites_edges", """
+    MATCH (p:Paper)-[:CITES]->(c:Paper)
+    RETURN p.paperID AS source, c.paperID AS target
+""")
+WRITTEN_BY_EDGES_QUERY = query_catalog.register("graph_analytics.written_by_edges", """
+    MATCH (p:Paper)-[:WRITTEN_BY]->(a:Author)
+    RETURN p.paperID AS source, a.authorID AS target
+""")
+
+# One statement per label; the property name travels in the row map, since property keys
+# cannot be parameters and one query per score property would churn the plan cache
+WRITE_SCORES_QUERIES = {
+    label: query_catalog.register(f"graph_analytics.write_scores.{label}", f"""
+        UNWIND $rows AS row
+        MATCH (n:{label} {{{key}: row.id}})
+        SET n += row.scores
+    """, rows=list)
+    for label, key in NODE_KEYS.items()
+}
+
+# Arrays shared with the worker processes, set once per process by _init_worker
+_STATE = {}
+
+
+class Projection(NamedTuple):
+    """
+    A graph in CSR form: node i has out-neighbours targets[offsets[i]:offsets[i + 1]].
+    ids/labels map node indices back to the graph.
+    """
+    ids: np.ndarray
+    labels: np.ndarray
+    offsets: np.ndarray
+    targets: np.ndarray
+    undirected: bool
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.ids)
+
+
+def build_projection(ids: np.ndarray, labels: np.ndarray, sources: np.ndarray, targets: np.ndarray,
+                     undirected: bool = False) -> Projection:
+    """
+    CSR over `ids` from edge index arrays; parallel edges and self-loops are dropped.
+    """
+    n = len(ids)
+    if undirected:
+        sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+    keep = sources != targets
+    pairs = np.unique(sources[keep].astype(np.int64) * n + targets[keep])
+    sources, targets = pairs // n, pairs % n  # np.unique sorts by source, then target
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=n))])
+    return Projection(ids, labels, offsets, targets.astype(np.int64), undirected)
+
+def _index(ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Positions of `values` in the sorted `ids`, -1 where missing.
+    """
+    positions = np.minimum(np.searchsorted(ids, values), max(len(ids) - 1, 0))
+    found = ids[positions] == values if len(ids) else np.zeros(len(values), dtype=bool)
+    return np.where(found, positions, -1)
+
+def _projection(graph: str, paper_ids, author_ids, cites, written_by) -> Projection:
+    papers = np.unique(np.asarray(paper_ids, dtype=str))
+    if graph == "cites":
+        sources = _index(papers, np.asarray(cites[0], dtype=str))
+        targets = _index(papers, np.asarray(cites[1], dtype=str))
+        valid = (sources >= 0) & (targets >= 0)  # like MATCH, edges to unknown papers are dropped
+        return build_projection(papers, np.full(len(papers), "Paper"), sources[valid], targets[valid])
+    # Undirected paper-author bipartite graph; authors are numbered after the papers
+    authors = np.unique(np.asarray(author_ids, dtype=str))
+    ids = np.concatenate([papers, authors])
+    labels = np.concatenate([np.full(len(papers), "Paper"), np.full(len(authors), "Author")])
+    sources = _index(papers, np.asarray(written_by[0], dtype=str))
+    targets = _index(authors, np.asarray(written_by[1], dtype=str))
+    valid = (sources >= 0) & (targets >= 0)
+    return build_projection(ids, labels, sources[valid], targets[valid] + len(papers), undirected=True)
+
+def projection_from_csv(csv_dir: str = batch_loader.CSV_DIR, graph: str = "cites") -> Projection:
+    """
+    Build the projection straight from papers_venues.csv, without a database.
+    """
+    paper_ids, author_ids, cites, written_by = [], set(), ([], []), ([], [])
+    for row in batch_loader.read_csv_rows(os.path.join(csv_dir, batch_loader.PAPERS_CSV)):
+        paper_ids.append(row["paperID"])
+        for edge in batch_loader.extract_citations(row):
+            cites[0].append(edge["paperID"])
+            cites[1].append(edge["citedID"])
+        for edge in batch_loader.extract_written_by(row):
+            written_by[0].append(edge["paperID"])
+            written_by[1].append(edge["authorID"])
+            author_ids.add(edge["authorID"])
+    return _projection(graph, paper_ids, sorted(author_ids), cites, written_by)
+
+def _column(tx, query: query_catalog.Query, *keys):
+    columns = tuple([] for _ in keys)
+    for record in query_catalog.run(tx, query):
+        for column, key in zip(columns, keys):
+            column.append(record[key])
+    return columns if len(keys) > 1 else columns[0]
+
+def projection_from_graph(session, graph: str = "cites") -> Projection:
+    paper_ids = session.execute_read(_column, PAPER_IDS_QUERY, "id")
+    if graph == "cites":
+        cites = session.execute_read(_column, CITES_EDGES_QUERY, "source", "target")
+        return _projection(graph, paper_ids, [], cites, ([], []))
+    author_ids = session.execute_read(_column, AUTHOR_IDS_QUERY, "id")
+    written_by = session.execute_read(_column, WRITTEN_BY_EDGES_QUERY, "source", "target")
+    return _projection(graph, paper_ids, author_ids, ([], []), written_by)
+
+
+# --- PageRank ---
+
+def pagerank(projection: Projection, damping: float = 0.85, tol: float = 1e-8, max_iter: int = 100) -> np.ndarray:
+    """
+    Power iteration; the rank of dangling nodes is spread uniformly. Scores sum to 1.
+    """
+    n = projection.n_nodes
+    out_degree = np.diff(projection.offsets)
+    sources = np.repeat(np.arange(n), out_degree)
+    weights = 1.0 / out_degree[sources]
+    dangling = out_degree == 0
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        spread = np.bincount(projection.targets, weights=rank[sources] * weights, minlength=n)
+        updated = (1 - damping) / n + damping * (spread + rank[dangling].sum() / n)
+        converged = np.abs(updated - rank).sum() < tol
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+# --- Betweenness (Brandes) ---
+
+def _neighbours(offsets: np.ndarray, targets: np.ndarray, frontier: np.ndarray):
+    starts = offsets[frontier]
+    counts = offsets[frontier + 1] - starts
+    sources = np.repeat(frontier, counts)
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return sources, targets[positions]
+
+def _dependencies(offsets: np.ndarray, targets: np.ndarray, source: int) -> np.ndarray:
+    """
+    Brandes' single-source dependencies, with the BFS expanded one whole level at a time.
+    """
+    n = len(offsets) - 1
+    distance = np.full(n, -1, dtype=np.int64)
+    sigma = np.zeros(n)
+    distance[source], sigma[source] = 0, 1.0
+    frontier, depth, levels = np.array([source]), 0, []
+    while frontier.size:
+        sources, reached = _neighbours(offsets, targets, frontier)
+        unseen = reached[distance[reached] < 0]
+        distance[unseen] = depth + 1
+        on_path = distance[reached] == depth + 1
+        sources, reached = sources[on_path], reached[on_path]
+        np.add.at(sigma, reached, sigma[sources])
+        levels.append((sources, reached))
+        frontier = np.unique(unseen)
+        depth += 1
+    delta = np.zeros(n)
+    for sources, reached in reversed(levels):
+        np.add.at(delta, sources, sigma[sources] / sigma[reached] * (1 + delta[reached]))
+    delta[source] = 0
+    return delta
+
+def _betweenness_batch(sources: np.ndarray) -> np.ndarray:
+    offsets, targets = _STATE["offsets"], _STATE["targets"]
+    scores = np.zeros(len(offsets) - 1)
+    for source in sources.tolist():
+        scores += _dependencies(offsets, targets, source)
+    return scores
+
+def _shareable(array: np.ndarray):
+    # A memory-mapped snapshot array is sent as its path and mapped again by the worker,
+    # so every process shares the same page-cache pages instead of a pickled copy
+    if isinstance(array, np.memmap) and str(array.filename).endswith(".npy"):
+        mapped = np.load(array.filename, mmap_mode="r")
+        if mapped.offset == array.offset and mapped.shape == array.shape:
+            return str(array.filename)
+    return array
+
+def _init_worker(offsets, targets):
+    _STATE["offsets"] = np.load(offsets, mmap_mode="r") if isinstance(offsets, str) else offsets
+    _STATE["targets"] = np.load(targets, mmap_mode="r") if isinstance(targets, str) else targets
+
+def betweenness(projection: Projection, samples: Optional[int] = None, seed: int = 42,
+                workers: int = GRAPH_WORKERS, batch_size: int = 64) -> np.ndarray:
+    """
+    Exact Brandes betweenness, or the sampled approximation from `samples` random sources
+    scaled by n / samples. Source batches are spread over a process pool.
+    """
+    n = projection.n_nodes
+    if samples and samples < n:
+        sources = np.random.default_rng(seed).choice(n, size=samples, replace=False)
+        scale = n / samples
+    else:
+        sources, scale = np.arange(n), 1.0
+    batches = np.array_split(sources, max(1, math.ceil(len(sources) / batch_size)))
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(_shareable(projection.offsets), _shareable(projection.targets))) as pool:
+            scores = sum(pool.map(_betweenness_batch, batches))
+    else:
+        _init_worker(projection.offsets, projection.targets)
+        scores = sum(_betweenness_batch(batch) for batch in batches)
+    if projection.undirected:
+        scores = scores / 2  # every shortest path was counted from both of its ends
+    return np.asarray(scores, dtype=np.float64) * scale
+
+
+# --- Write-back ---
+
+def _write_scores(tx, query: query_catalog.Query, rows: List[dict]):
+    query_catalog.run(tx, query, rows=rows).consume()
+
+def write_scores(session, projection: Projection, scores: np.ndarray, prop: str,
+                 batch_size: int = SCORE_BATCH_SIZE) -> int:
+    """
+    Store `scores` as property `prop` on the projected nodes in batched UNWIND writes.
+    """
+    written = 0
+    for label, query in WRITE_SCORES_QUERIES.items():
+        selected = np.flatnonzero(projection.labels == label)
+        for start in range(0, len(selected), batch_size):
+            chunk = selected[start:start + batch_size]
+            rows = [{"id": node_id, "scores": {prop: score}}
+                    for node_id, score in zip(projection.ids[chunk].tolist(), scores[chunk].tolist())]
+            session.execute_write(_write_scores, query, rows)
+            written += len(rows)
+    return written
+
+def top_nodes(projection: Projection, scores: np.ndarray, k: int = 10) -> List[tuple]:
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [(projection.labels[i], projection.ids[i], float(scores[i])) for i in order.tolist()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Betweenness and PageRank over a CSR projection, without GDS.")
+    parser.add_argument("--source", choices=["graph", "csv", "snapshot"], default="graph",
+                        help="snapshot maps the arrays written by snapshot.py from SNAPSHOT_DIR")
+    parser.add_argument("--graph", choices=["cites", "authorship"], default="cites",
+                        help="CITES between papers, or the undirected WRITTEN_BY paper-author graph")
+    parser.add_argument("--algorithm", choices=["betweenness", "pagerank", "both"], default="both")
+    parser.add_argument("--samples", type=int, default=0, help="sampled betweenness sources (0 = exact)")
+    parser.add_argument("--workers", type=int, default=GRAPH_WORKERS)
+    parser.add_argument("--no-write", action="store_true", help="only print the top nodes")
+    args = parser.parse_args()
+
+    suffix = "" if args.graph == "cites" else "Authorship"
+
+    with connection.Connection() as driver, driver.session(database=connection.DATABASE) as session:
+        start = time.perf_counter()
+        if args.source == "csv":
+            projection = projection_from_csv(graph=args.graph)
+        elif args.source == "snapshot":
+            import snapshot
+            projection = snapshot.Snapshot().projection(args.graph)
+        else:
+            projection = projection_from_graph(session, args.graph)
+        print(f"Projected {projection.n_nodes} nodes and {len(projection.targets)} edges "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        scores: Dict[str, np.ndarray] = {}
+        if args.algorithm in ("betweenness", "both"):
+            start = time.perf_counter()
+            scores[f"betweenness{suffix}"] = betweenness(projection, args.samples or None, workers=args.workers)
+            print(f"Betweenness in {time.perf_counter() - start:.2f}s")
+        if args.algorithm in ("pagerank", "both"):
+            start = time.perf_counter()
+            scores[f"pageRank{suffix}"] = pagerank(projection)
+            print(f"PageRank in {time.perf_counter() - start:.2f}s")
+
+        for prop, values in scores.items():
+            print(f"\nHighest {prop}:")
+            for label, node_id, score in top_nodes(projection, values):
+                print(f"{label} {node_id}: {score:.6f}")
+            if not args.no_write:
+                print(f"Wrote {prop} to {write_scores(session, projection, values, prop)} nodes")
+
+if __name__ == "__main__":
+    main()
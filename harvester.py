@@ -0,0 +1,211 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+import http_cache
+
+config.load_env()
+
+SEMANTIC_SCHOLAR_BASE_URL = os.getenv('SEMANTIC_SCHOLAR_BASE_URL')
+SEMANTIC_SCHOLAR_API_KEY = os.getenv('SEMANTIC_SCHOLAR_API_KEY')
+HARVEST_PATH = os.getenv('HARVEST_PATH', './csv/harvest.jsonl')
+HARVEST_WORKERS = int(os.getenv('HARVEST_WORKERS', '4'))
+REQUESTS_PER_SECOND = float(os.getenv('REQUESTS_PER_SECOND', '1'))
+MAX_RETRIES = int(os.getenv('MAX_RETRIES', '8'))
+BACKOFF_BASE = float(os.getenv('BACKOFF_BASE', '1'))
+BACKOFF_CAP = float(os.getenv('BACKOFF_CAP', '60'))
+
+DEFAULT_FIELDS = "title,journal,externalIds,year,s2FieldsOfStudy,abstract,authors"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every worker thread: at most `rate` requests per second,
+    with bursts of up to `burst` requests.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size: int = HARVEST_WORKERS, api_key: Optional[str] = SEMANTIC_SCHOLAR_API_KEY) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if api_key:
+        session.headers["x-api-key"] = api_key
+    return session
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Exponential backoff with full jitter, never shorter than a server-sent Retry-After.
+    """
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+def fetch_page(session: requests.Session, limiter: RateLimiter, url: str, params: dict,
+               max_retries: int = MAX_RETRIES, cache: Optional[http_cache.ResponseCache] = None) -> dict:
+    """
+    GET one page, retrying 429/5xx responses and connection errors with backoff.
+    With a `cache`, pages already fetched are served from disk without using rate budget.
+    """
+    if cache is not None:
+        return cache.get(url, params, lambda: fetch_page(session, limiter, url, params, max_retries))
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            response = session.get(url, params=params, timeout=60)
+        except requests.ConnectionError as e:
+            if attempt == max_retries:
+                raise
+            print(f"Connection error ({e}), retrying...")
+            time.sleep(backoff_delay(attempt))
+            continue
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            response.raise_for_status()
+        delay = backoff_delay(attempt, response.headers.get("Retry-After"))
+        print(f"HTTP {response.status_code} for {params.get('query')!r}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+    raise RuntimeError("unreachable")
+
+
+# --- Checkpoint ---
+
+class Checkpoint:
+    """
+    Append-only JSONL log with one line per fetched page:
+    {"query": ..., "page": n, "fetched": <papers so far>, "token": <continuation token or null>, "data": [...]}.
+    The last line of a query holds the token to resume from; a null token means done.
+    """
+    def __init__(self, path: str = HARVEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def repair(self):
+        """
+        Drop a torn final line left by a crash mid-write; that page is simply refetched.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as file:
+            content = file.read()
+            end = content.rfind(b"\n") + 1
+            if end != len(content):
+                file.truncate(end)
+
+    def read(self) -> Iterable[dict]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+
+    def progress(self) -> Dict[str, dict]:
+        state = {}
+        for entry in self.read():
+            state[entry["query"]] = {"page": entry["page"], "fetched": entry["fetched"], "token": entry["token"]}
+        return state
+
+    def append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def papers(self, queries: Optional[List[str]] = None) -> Iterable[dict]:
+        for entry in self.read():
+            if queries is None or entry["query"] in queries:
+                yield from entry["data"]
+
+
+def harvest_query(session, limiter, checkpoint: Checkpoint, base_url: str, query: str,
+                  params: dict, resume: Optional[dict] = None, max_papers: Optional[int] = None,
+                  cache: Optional[http_cache.ResponseCache] = None) -> int:
+    """
+    Follow the continuation tokens of one bulk search until exhausted (or `max_papers`).
+    Returns the number of papers fetched for the query, including earlier runs.
+    """
+    url = f"{base_url}/paper/search/bulk"
+    page = resume["page"] + 1 if resume else 0
+    token = resume["token"] if resume else None
+    fetched = resume["fetched"] if resume else 0
+    if resume and token is None:
+        return fetched
+    while True:
+        page_params = {**params, "query": query}
+        if token:
+            page_params["token"] = token
+        data = fetch_page(session, limiter, url, page_params, cache=cache)
+        papers = data.get("data", [])
+        token = data.get("token")
+        fetched += len(papers)
+        if max_papers is not None and fetched >= max_papers:
+            token = None
+        checkpoint.append({"query": query, "page": page, "fetched": fetched, "token": token, "data": papers})
+        if not token:
+            return fetched
+        page += 1
+
+def harvest(queries: List[str], params: Optional[dict] = None, base_url: str = SEMANTIC_SCHOLAR_BASE_URL,
+            checkpoint_path: str = HARVEST_PATH, workers: int = HARVEST_WORKERS,
+            requests_per_second: float = REQUESTS_PER_SECOND, max_papers: Optional[int] = None,
+            cache: Optional[http_cache.ResponseCache] = None) -> Checkpoint:
+    """
+    Harvest every query concurrently, resuming each from its last checkpointed token.
+    """
+    params = params or {"fields": DEFAULT_FIELDS}
+    checkpoint = Checkpoint(checkpoint_path)
+    checkpoint.repair()
+    progress = checkpoint.progress()
+    limiter = RateLimiter(requests_per_second)
+    with make_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            query: pool.submit(harvest_query, session, limiter, checkpoint, base_url, query,
+                               params, progress.get(query), max_papers, cache)
+            for query in queries
+        }
+        for query, future in futures.items():
+            print(f"{query!r}: {future.result()} papers fetched")
+    return checkpoint
+
+
+def main():
+    queries = sys.argv[1:] or ["machine learning"]
+    checkpoint = harvest(queries, {"fields": DEFAULT_FIELDS, "sort": "citationCount:desc"})
+    print(f"Total papers in {checkpoint.path}: {sum(1 for _ in checkpoint.papers())}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+import config
+
+config.load_env()
+
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "./.http_cache")
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", str(7 * 24 * 3600)))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+HTTP_CACHE_MODE = os.getenv("HTTP_CACHE_MODE", "normal")
+
+MODES = ("normal", "offline", "refresh")
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a response is not cached (or has expired)."""
+
+
+def cache_key(endpoint: str, params: Optional[dict] = None) -> str:
+    """
+    Content address of a request: the endpoint plus its params with keys sorted and
+    values stringified, so {"limit": 10} and {"limit": "10"} share an entry.
+    """
+    normalized = sorted((str(key), str(value)) for key, value in (params or {}).items() if value is not None)
+    payload = json.dumps([endpoint.rstrip("/"), normalized], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent gzip-compressed JSON response cache with a TTL and an LRU size cap.
+
+    Modes: "normal" serves fresh entries and fetches misses, "offline" never fetches
+    (misses raise CacheMiss, expired entries are still served) and "refresh" always
+    fetches and overwrites. Concurrent lookups of the same key are coalesced into one fetch.
+    """
+    def __init__(self, directory: str = HTTP_CACHE_DIR, ttl: float = HTTP_CACHE_TTL,
+                 max_bytes: int = HTTP_CACHE_MAX_BYTES, mode: str = HTTP_CACHE_MODE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {MODES}")
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(os.path.getsize(path) for path in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json.gz")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json.gz"):
+                    yield os.path.join(root, name)
+
+    def _read(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                entry = json.load(file)
+            os.utime(path)  # mtime doubles as the LRU access time
+        except (OSError, json.JSONDecodeError):
+            # Missing, corrupt, or evicted by another thread or process since the read
+            return None
+        return entry
+
+    def _write(self, key: str, endpoint: str, params: Optional[dict], body):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+            json.dump({"endpoint": endpoint, "params": params, "stored_at": time.time(), "body": body}, file)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size += os.path.getsize(path) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Delete least recently used entries until the cache is under 90% of its cap.
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                continue  # already evicted elsewhere
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def get(self, endpoint: str, params: Optional[dict], fetch: Callable[[], object]):
+        """
+        Return the cached body for (endpoint, params) or call `fetch()` and store its result.
+        `fetch` returns a JSON-serializable body, or None for responses that must not be cached.
+        """
+        key = cache_key(endpoint, params)
+        if self.mode != "refresh":
+            entry = self._read(key)
+            if entry is not None and (self.mode == "offline" or time.time() - entry["stored_at"] < self.ttl):
+                with self._lock:
+                    self.hits += 1
+                return entry["body"]
+        if self.mode == "offline":
+            with self._lock:
+                self.misses += 1
+            raise CacheMiss(f"{endpoint} {params} is not cached")
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                # Coalesced onto another thread's fetch of the same key
+                self.hits += 1
+        if not leader:
+            return future.result()
+
+        try:
+            body = fetch()
+            if body is not None:
+                self._write(key, endpoint, params, body)
+            future.set_result(body)
+            return body
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def clear(self):
+        for path in list(self._entries()):
+            os.remove(path)
+        with self._lock:
+            self._size = 0
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_cache() -> ResponseCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
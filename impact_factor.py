@@ -0,0 +1,155 @@
+import os
+from typing import Iterable, List, Set
+
+import numpy as np
+
+import config
+import connection
+import query_catalog
+
+config.load_env()
+
+JOURNAL_BATCH_SIZE = int(os.getenv("JOURNAL_BATCH_SIZE", "500"))
+
+# Citations received per (journal, citing year), from the Paper citation histograms
+CITATIONS_QUERY = query_catalog.register("impact_factor.citations", """
+    MATCH (cited:Paper)-[:PUBLISHED_IN]->(:Volume)-[:VOLUME_OF]->(j:Journal)
+    WHERE cited.citationCount > 0
+    UNWIND range(0, size(cited.citationYears) - 1) AS i
+    RETURN j.name AS journal, cited.citationYears[i] AS year, sum(cited.citationYearCounts[i]) AS count
+""")
+
+# Papers per (journal, publication year): the stored summary, or counted live as a fallback
+STORED_PUBLICATIONS_QUERY = query_catalog.register("impact_factor.stored_publications", """
+    MATCH (j:Journal)
+    WHERE size(j.publicationYears) > 0
+    UNWIND range(0, size(j.publicationYears) - 1) AS i
+    RETURN j.name AS journal, j.publicationYears[i] AS year, j.publicationCounts[i] AS count
+""")
+
+LIVE_PUBLICATIONS_QUERY = query_catalog.register("impact_factor.live_publications", """
+    MATCH (p:Paper)-[:PUBLISHED_IN]->(:Volume)-[:VOLUME_OF]->(j:Journal)
+    WHERE p.year IS NOT NULL
+    RETURN j.name AS journal, p.year AS year, count(p) AS count
+""")
+
+MISSING_SUMMARY_QUERY = query_catalog.register("impact_factor.missing_summary", """
+    MATCH (j:Journal)
+    WHERE j.publicationYears IS NULL
+    RETURN count(j) AS missing
+""")
+
+# Same parallel-array layout as the Paper citation histogram
+PUBLICATION_COUNTS_QUERY = query_catalog.register("impact_factor.publication_counts", """
+    UNWIND $names AS name
+    MATCH (j:Journal {name: name})
+    OPTIONAL MATCH (p:Paper)-[:PUBLISHED_IN]->(:Volume)-[:VOLUME_OF]->(j)
+    WITH j, p.year AS year, count(p) AS publications
+    ORDER BY year
+    WITH j, collect(CASE WHEN year IS NOT NULL AND publications > 0 THEN [year, publications] END) AS buckets
+    SET j.publicationYears = [bucket IN buckets | bucket[0]],
+        j.publicationCounts = [bucket IN buckets | bucket[1]]
+""", names=list)
+
+JOURNAL_NAMES_QUERY = query_catalog.register("impact_factor.journal_names", """
+    MATCH (j:Journal)
+    RETURN j.name AS name
+""")
+
+PAPER_JOURNALS_QUERY = query_catalog.register("impact_factor.paper_journals", """
+    UNWIND $paperIDs AS paperID
+    MATCH (:Paper {paperID: paperID})-[:PUBLISHED_IN]->(:Volume)-[:VOLUME_OF]->(j:Journal)
+    RETURN DISTINCT j.name AS name
+""", paperIDs=list)
+
+
+def _stream(session, query: query_catalog.Query):
+    journals, years, counts = [], [], []
+    for record in query_catalog.run(session, query):
+        journals.append(record["journal"])
+        years.append(record["year"])
+        counts.append(record["count"])
+    return journals, np.asarray(years, dtype=np.int64), np.asarray(counts, dtype=np.float64)
+
+def impact_factors(citations, publications) -> List[dict]:
+    """
+    Impact factor of every (journal, year) with citations: citations received in year Y
+    divided by the papers the journal published in Y-1 and Y-2 (0 when it published none).
+
+    Both inputs are (journals, years, counts) columns. Counts are scattered into dense
+    journal x year matrices, so every journal and year is computed with a few array ops.
+    """
+    cite_journals, cite_years, cite_counts = citations
+    pub_journals, pub_years, pub_counts = publications
+    if not cite_journals:
+        return []
+    names, codes = np.unique(np.asarray(cite_journals + pub_journals, dtype=str), return_inverse=True)
+    names = names.tolist()
+    cite_codes, pub_codes = codes[:len(cite_journals)], codes[len(cite_journals):]
+    first_year = int(min(cite_years.min(), pub_years.min() if pub_years.size else cite_years.min()))
+    last_year = int(max(cite_years.max(), pub_years.max() if pub_years.size else cite_years.max()))
+    shape = (len(names), last_year - first_year + 1)
+
+    cited = np.zeros(shape)
+    np.add.at(cited, (cite_codes, cite_years - first_year), cite_counts)
+    published = np.zeros(shape)
+    np.add.at(published, (pub_codes, pub_years - first_year), pub_counts)
+
+    previous = np.zeros(shape)
+    previous[:, 1:] += published[:, :-1]
+    previous[:, 2:] += published[:, :-2]
+    factors = np.divide(cited, previous, out=np.zeros(shape), where=previous > 0)
+
+    # Row-major nonzero keeps the journal, year ordering of the original query
+    journal_idx, year_idx = np.nonzero(cited)
+    return [
+        {"journal": names[j], "impactFactorYear": first_year + y, "impactFactor": float(factors[j, y])}
+        for j, y in zip(journal_idx.tolist(), year_idx.tolist())
+    ]
+
+def compute_impact_factors(session) -> List[dict]:
+    """
+    Two streaming reads plus NumPy; uses the stored Journal publication counts when every
+    journal has them, so it also runs inside read transactions.
+    """
+    missing = query_catalog.run(session, MISSING_SUMMARY_QUERY).single()["missing"]
+    publications_query = LIVE_PUBLICATIONS_QUERY if missing else STORED_PUBLICATIONS_QUERY
+    return impact_factors(_stream(session, CITATIONS_QUERY), _stream(session, publications_query))
+
+def _set_publication_counts(tx, names: List[str]):
+    query_catalog.run(tx, PUBLICATION_COUNTS_QUERY, names=names).consume()
+
+def _journal_names(tx) -> List[str]:
+    return [record["name"] for record in query_catalog.run(tx, JOURNAL_NAMES_QUERY)]
+
+def _paper_journals(tx, paper_ids: List[str]) -> List[str]:
+    return [record["name"] for record in query_catalog.run(tx, PAPER_JOURNALS_QUERY, paperIDs=paper_ids)]
+
+def paper_journals(session, paper_ids: Iterable[str], batch_size: int = 5000) -> Set[str]:
+    paper_ids = list(paper_ids)
+    names = set()
+    for i in range(0, len(paper_ids), batch_size):
+        names.update(session.execute_read(_paper_journals, paper_ids[i:i + batch_size]))
+    return names
+
+def refresh_publication_counts(session, names: Iterable[str] = None, batch_size: int = JOURNAL_BATCH_SIZE) -> int:
+    """
+    Store per-year publication counts on the given journals (all journals by default).
+    """
+    names = sorted(set(names)) if names is not None else session.execute_read(_journal_names)
+    for i in range(0, len(names), batch_size):
+        session.execute_write(_set_publication_counts, names[i:i + batch_size])
+    return len(names)
+
+
+def main():
+    with connection.Connection() as driver:
+        print("Connection successful!")
+        with driver.session(database=connection.DATABASE) as session:
+            count = refresh_publication_counts(session)
+            print(f"Stored the publication counts of {count} journals.")
+            for row in session.execute_read(compute_impact_factors):
+                print(f"{row['journal']} ({row['impactFactorYear']}): Impact Factor = {row['impactFactor']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import functools
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import config
+
+config.load_env()
+
+# Empty disables the output; the textfile is meant for node_exporter's textfile collector
+INSTRUMENT_JSONL = os.getenv("INSTRUMENT_JSONL", "./metrics/stages.jsonl")
+INSTRUMENT_PROM = os.getenv("INSTRUMENT_PROM", "./metrics/neo4j_lab.prom")
+INSTRUMENT_PROFILE = os.getenv("INSTRUMENT_PROFILE", "0") == "1"
+
+COUNTERS = [
+    "nodes_created", "nodes_deleted", "relationships_created", "relationships_deleted",
+    "properties_set", "labels_added", "labels_removed", "indexes_added", "constraints_added",
+]
+METRIC_PREFIX = "neo4j_lab_stage"
+
+
+def rss_mb() -> float:
+    """
+    Current resident set size of this process, the peak where /proc is unavailable.
+    """
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def profile_operators(plan: Optional[dict]) -> List[dict]:
+    """
+    Flatten a PROFILE plan tree into one {operator, dbHits, rows} entry per operator.
+    """
+    operators, stack = [], [plan] if plan else []
+    while stack:
+        node = stack.pop()
+        operators.append({
+            "operator": node.get("operatorType"),
+            "dbHits": node.get("dbHits", 0),
+            "rows": node.get("rows", 0),
+            "details": node.get("args", {}).get("Details"),
+        })
+        stack.extend(reversed(node.get("children", [])))
+    return operators
+
+
+class _CountingResult:
+    """
+    Result proxy that counts the records the stage iterates over.
+    """
+    def __init__(self, result):
+        self._result = result
+        self.rows = 0
+
+    def __iter__(self):
+        for record in self._result:
+            self.rows += 1
+            yield record
+
+    def single(self, *args, **kwargs):
+        record = self._result.single(*args, **kwargs)
+        self.rows += record is not None
+        return record
+
+    def __getattr__(self, name):
+        return getattr(self._result, name)
+
+class _InstrumentedTransaction:
+    """
+    Transaction (or session) proxy that keeps every result it hands out, optionally
+    running each statement under PROFILE.
+    """
+    def __init__(self, tx, profile: bool):
+        self._tx = tx
+        self._profile = profile
+        self.results: List[_CountingResult] = []
+
+    def run(self, query: str, parameters: Optional[dict] = None, **kwargs):
+        if self._profile and not query.lstrip().upper().startswith(("PROFILE", "EXPLAIN")):
+            query = "PROFILE " + query
+        result = _CountingResult(self._tx.run(query, parameters, **kwargs))
+        self.results.append(result)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._tx, name)
+
+
+class Instrumentation:
+    """
+    Per-stage wall time, rows, server counters, result_available_after /
+    result_consumed_after and client RSS, appended to JSON-lines and rendered as a
+    Prometheus textfile. With `profile`, every statement runs under PROFILE and the db hits
+    of each operator are stored too.
+    """
+    def __init__(self, jsonl_path: str = INSTRUMENT_JSONL, prom_path: str = INSTRUMENT_PROM,
+                 profile: bool = INSTRUMENT_PROFILE):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.profile = profile
+        self.run_id = time.strftime("%Y%m%dT%H%M%S")
+        self.records: List[dict] = []
+
+    def wrap(self, fn: Callable, kind: str, name: Optional[str] = None) -> Callable:
+        """
+        Instrumented version of a transaction function `fn(tx, *args)`, for execute_read /
+        execute_write. Attempts that raise (and are retried) are not recorded.
+        """
+        @functools.wraps(fn)
+        def instrumented(tx, *args, **kwargs):
+            proxy = _InstrumentedTransaction(tx, self.profile)
+            rss_before, start = rss_mb(), time.perf_counter()
+            value = fn(proxy, *args, **kwargs)
+            # consume() inside the transaction, while the results are still attached
+            summaries = [result.consume() for result in proxy.results]
+            record = self._record(kind, name or fn.__name__, time.perf_counter() - start, rss_before)
+            # Stages that return a count (e.g. rows written to a sink) report it as their rows
+            counted = isinstance(value, int) and not isinstance(value, bool)
+            record["rows"] = value if counted else sum(result.rows for result in proxy.results)
+            record["statements"] = len(summaries)
+            for counter in COUNTERS:
+                record["counters"][counter] = sum(getattr(summary.counters, counter, 0) for summary in summaries)
+            record["result_available_after_ms"] = sum(summary.result_available_after or 0 for summary in summaries)
+            record["result_consumed_after_ms"] = sum(summary.result_consumed_after or 0 for summary in summaries)
+            if self.profile:
+                record["operators"] = [operator for summary in summaries
+                                       for operator in profile_operators(summary.profile)]
+                record["db_hits"] = sum(operator["dbHits"] for operator in record["operators"])
+            return value
+        return instrumented
+
+    @contextmanager
+    def stage(self, kind: str, name: str):
+        """
+        Time a step that manages its own transactions; set record["rows"] inside the block.
+        """
+        rss_before, start = rss_mb(), time.perf_counter()
+        record = {"rows": 0}
+        yield record
+        rows = record["rows"]
+        self._record(kind, name, time.perf_counter() - start, rss_before)["rows"] = rows
+
+    def _record(self, kind: str, name: str, seconds: float, rss_before: float) -> dict:
+        rss = rss_mb()
+        record = {"run": self.run_id, "timestamp": time.time(), "kind": kind, "stage": name,
+                  "seconds": seconds, "rows": 0, "counters": {}, "rss_mb": rss, "rss_delta_mb": rss - rss_before}
+        self.records.append(record)
+        return record
+
+    def flush(self):
+        """
+        Append this run's records to the JSON-lines file and rewrite the Prometheus textfile.
+        """
+        if self.jsonl_path and self.records:
+            os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+            with open(self.jsonl_path, "a", encoding="utf-8") as file:
+                for record in self.records:
+                    file.write(json.dumps(record, default=str) + "\n")
+        if self.prom_path:
+            os.makedirs(os.path.dirname(self.prom_path) or ".", exist_ok=True)
+            # node_exporter may read at any moment, so write aside and rename
+            with open(self.prom_path + ".tmp", "w", encoding="utf-8") as file:
+                file.write(self.prometheus())
+            os.replace(self.prom_path + ".tmp", self.prom_path)
+
+    def _merged(self) -> List[dict]:
+        # A stage that ran several times (batches, repeated analytics) becomes one series
+        merged: Dict[tuple, dict] = {}
+        for record in self.records:
+            key = (record["kind"], record["stage"])
+            if key not in merged:
+                merged[key] = {**record, "counters": dict(record["counters"]),
+                               "operators": list(record.get("operators", []))}
+                continue
+            total = merged[key]
+            for metric in ("seconds", "rows", "result_available_after_ms", "result_consumed_after_ms", "db_hits"):
+                if metric in record:
+                    total[metric] = total.get(metric, 0) + record[metric]
+            for counter, value in record["counters"].items():
+                total["counters"][counter] = total["counters"].get(counter, 0) + value
+            total["operators"].extend(record.get("operators", []))
+            total["rss_mb"] = record["rss_mb"]
+        return list(merged.values())
+
+    def prometheus(self) -> str:
+        metrics: Dict[str, List[str]] = {}
+        help_text = {
+            "seconds": "Wall time of the stage in seconds.",
+            "rows": "Rows processed by the stage.",
+            "rss_mb": "Client resident set size after the stage in MiB.",
+            "result_available_after_ms": "Server time until the first record was available.",
+            "result_consumed_after_ms": "Server time until all records were consumed.",
+            "counter": "Update counters reported by the server.",
+            "db_hits": "PROFILE db hits of the stage.",
+            "operator_db_hits": "PROFILE db hits per operator type.",
+        }
+
+        def add(metric: str, labels: Dict[str, str], value):
+            label_text = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+            metrics.setdefault(metric, []).append(f"{METRIC_PREFIX}_{metric}{{{label_text}}} {float(value)}")
+
+        for record in self._merged():
+            labels = {"kind": record["kind"], "stage": record["stage"]}
+            for metric in ("seconds", "rows", "rss_mb", "result_available_after_ms",
+                           "result_consumed_after_ms", "db_hits"):
+                if metric in record:
+                    add(metric, labels, record[metric])
+            for counter, value in record["counters"].items():
+                add("counter", {**labels, "counter": counter}, value)
+            hits: Dict[str, int] = {}
+            for operator in record.get("operators", []):
+                hits[operator["operator"]] = hits.get(operator["operator"], 0) + operator["dbHits"]
+            for operator, value in hits.items():
+                add("operator_db_hits", {**labels, "operator": operator}, value)
+
+        lines = []
+        for metric, samples in metrics.items():
+            lines.append(f"# HELP {METRIC_PREFIX}_{metric} {help_text[metric]}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def print_report(self):
+        print(f"{'Stage':<40}{'Seconds':>10}{'Rows':>12}{'Created':>12}{'DB hits':>12}{'RSS MiB':>10}")
+        for record in self._merged():
+            created = record["counters"].get("nodes_created", 0) + record["counters"].get("relationships_created", 0)
+            print(f"{record['stage']:<40}{record['seconds']:>10.2f}{record['rows']:>12}{created:>12}"
+                  f"{record.get('db_hits', '-'):>12}{record['rss_mb']:>10.0f}")
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
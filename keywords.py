@@ -0,0 +1,353 @@
+import argparse
+import functools
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+import config
+import connection
+import query_catalog
+import snapshot
+
+config.load_env()
+
+KEYWORD_DIR = os.getenv("KEYWORD_DIR", "./keyword_index")
+KEYWORD_WORKERS = int(os.getenv("KEYWORD_WORKERS", "4"))
+KEYWORD_MAX_NGRAM = int(os.getenv("KEYWORD_MAX_NGRAM", "3"))
+KEYWORD_MIN_PAPERS = int(os.getenv("KEYWORD_MIN_PAPERS", "2"))
+# Phrases in a larger share of the papers ("data", "proposed approach") carry no topic
+KEYWORD_MAX_SHARE = float(os.getenv("KEYWORD_MAX_SHARE", "0.2"))
+KEYWORD_BATCH_SIZE = int(os.getenv("KEYWORD_BATCH_SIZE", "2000"))
+CHUNK_SIZE = 500  # papers per worker task
+
+# Stopwords (and punctuation, digits and single letters) end a candidate phrase, so no
+# keyphrase starts, ends or runs across one
+STOPWORDS = frozenset("""
+    a about above after again against all also although among an and any are as at be
+    because been before being below between both but by can could did do does doing done
+    during each either et etc few for from further had has have having here how however i
+    if in into is it its itself more most much must no nor not of off on once only or
+    other our out over own per same should since so some such than that the their them
+    then there these they this those through thus to too under until up upon very via was
+    we well were what when where whether which while who whom why will with within without
+    would yet
+    al approach approaches based new novel paper papers present presented presents propose
+    proposed proposes result results show shown shows study use used uses using
+""".split())
+PIECE_PATTERN = re.compile(r"[a-z][a-z0-9]*(?:-[a-z0-9]+)*|\S")
+
+PAPERS_QUERY = query_catalog.register("keywords.papers", """
+    MATCH (p:Paper)
+    RETURN p.paperID AS paperID, p.title AS title, p.abstract AS abstract
+""")
+PAPERS_BY_ID_QUERY = query_catalog.register("keywords.papers_by_id", """
+    UNWIND $paperIDs AS paperID
+    MATCH (p:Paper {paperID: paperID})
+    RETURN p.paperID AS paperID, p.title AS title, p.abstract AS abstract
+""", paperIDs=list)
+
+UPSERT_KEYWORDS_QUERY = query_catalog.register("keywords.upsert_keywords", """
+    UNWIND $rows AS row
+    MERGE (k:Keyword {name: row.name})
+    SET k.paperCount = row.papers
+""", rows=list)
+
+# Replaces the keywords of each paper; community HAS_KEYWORD edges start at
+# ResearchCommunity and are left alone
+LINK_PAPERS_QUERY = query_catalog.register("keywords.link_papers", """
+    UNWIND $rows AS row
+    MATCH (p:Paper {paperID: row.paperID})
+    OPTIONAL MATCH (p)-[old:HAS_KEYWORD]->(:Keyword)
+    DELETE old
+    WITH DISTINCT p, row
+    UNWIND row.keywords AS name
+    MATCH (k:Keyword {name: name})
+    CREATE (p)-[:HAS_KEYWORD]->(k)
+""", rows=list)
+
+PRUNE_KEYWORDS_QUERY = query_catalog.register("keywords.prune_keywords", """
+    MATCH (k:Keyword)
+    WHERE NOT ()-[:HAS_KEYWORD]->(k)
+    DELETE k
+""")
+
+
+# --- Extraction ---
+
+def normalize(text: Optional[str]) -> str:
+    # Fold accents and case so "Modèle" and "modele" are one term; no stemming, so the
+    # keywords stay readable and match the recommender's community keywords as written
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in text if not unicodedata.combining(char)).lower()
+
+def candidate_runs(text: Optional[str]) -> List[List[str]]:
+    """
+    The maximal runs of content words in `text`.
+    """
+    runs, run = [], []
+    for piece in PIECE_PATTERN.findall(normalize(text)):
+        if len(piece) > 1 and piece not in STOPWORDS:
+            run.append(piece)
+        elif run:
+            runs.append(run)
+            run = []
+    if run:
+        runs.append(run)
+    return runs
+
+def keyphrases(text: Optional[str], max_n: int = KEYWORD_MAX_NGRAM) -> Set[str]:
+    """
+    Every 1..max_n-gram inside a content-word run, e.g. "graph", "graph databases".
+    """
+    phrases = set()
+    for run in candidate_runs(text):
+        for n in range(1, min(max_n, len(run)) + 1):
+            phrases.update(" ".join(run[i:i + n]) for i in range(len(run) - n + 1))
+    return phrases
+
+def _extract_chunk(chunk: List[Tuple[str, Optional[str], Optional[str]]], max_n: int) -> List[Tuple[str, List[str]]]:
+    # The full stop keeps phrases from running from the title into the abstract
+    return [(paper_id, sorted(keyphrases(f"{title or ''}. {abstract or ''}", max_n)))
+            for paper_id, title, abstract in chunk]
+
+def extract_all(papers: List[Tuple[str, Optional[str], Optional[str]]], workers: int = KEYWORD_WORKERS,
+                max_n: int = KEYWORD_MAX_NGRAM) -> List[Tuple[str, List[str]]]:
+    """
+    (paperID, keyphrases) for every (paperID, title, abstract), tokenized across a process pool.
+    """
+    chunks = [papers[i:i + CHUNK_SIZE] for i in range(0, len(papers), CHUNK_SIZE)]
+    extract = functools.partial(_extract_chunk, max_n=max_n)
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(extract, chunks))
+    else:
+        results = [extract(chunk) for chunk in chunks]
+    return [paper for result in results for paper in result]
+
+def community_keywords() -> Set[str]:
+    # Kept whatever their frequency, so every community can link to its Keyword nodes
+    import recommender
+    return {keyword.lower() for keywords in recommender.configured_communities().values() for keyword in keywords}
+
+
+# --- Inverted index ---
+
+class KeywordIndex:
+    """
+    Keyword -> paper inverted index in CSR form. `terms` and `paper_ids` are sorted UTF-8
+    dictionaries (see snapshot.encode_ids), and the papers of terms[i] are the sorted rows
+    postings[offsets[i]:offsets[i + 1]], so "papers on any/all of these keywords" is a
+    union/intersection of posting lists.
+    """
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, postings: np.ndarray, paper_ids: np.ndarray):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.paper_ids = paper_ids
+
+    @property
+    def n_terms(self) -> int:
+        return len(self.terms)
+
+    @classmethod
+    def from_pairs(cls, terms: np.ndarray, codes: np.ndarray, rows: np.ndarray, paper_ids: np.ndarray) -> "KeywordIndex":
+        offsets, postings = snapshot.csr(np.asarray(codes, dtype=np.int64), np.asarray(rows, dtype=np.int64), len(terms))
+        return cls(terms, offsets, postings, paper_ids)
+
+    @classmethod
+    def build(cls, extracted: List[Tuple[str, List[str]]], min_papers: int = KEYWORD_MIN_PAPERS,
+              max_share: float = KEYWORD_MAX_SHARE, keep: Iterable[str] = ()) -> "KeywordIndex":
+        """
+        Index the output of extract_all, keeping the phrases found in at least `min_papers`
+        papers and at most `max_share` of them (plus every phrase in `keep`).
+        """
+        paper_ids = snapshot.encode_ids([paper_id for paper_id, _ in extracted])
+        vocabulary: Dict[str, int] = {}
+        codes, papers = [], []
+        for paper_id, phrases in extracted:
+            codes.extend(vocabulary.setdefault(phrase, len(vocabulary)) for phrase in phrases)
+            papers.extend([paper_id] * len(phrases))
+        names = list(vocabulary)
+        codes = np.asarray(codes, dtype=np.int64)
+        counts = np.bincount(codes, minlength=len(names))
+        kept = (counts >= min_papers) & (counts <= max(max_share * len(paper_ids), min_papers))
+        kept |= np.isin(np.asarray(names, dtype=object), list(keep))
+
+        terms = snapshot.encode_ids([name for name, keep_name in zip(names, kept) if keep_name])
+        remap = np.full(len(names), -1, dtype=np.int64)
+        remap[kept] = snapshot.lookup(terms, [name for name, keep_name in zip(names, kept) if keep_name])
+        codes = remap[codes] if len(codes) else codes
+        valid = codes >= 0
+        rows = snapshot.lookup(paper_ids, [paper for paper, ok in zip(papers, valid) if ok])
+        return cls.from_pairs(terms, codes[valid], rows, paper_ids)
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        # (term code, paper row) of every posting
+        return np.repeat(np.arange(self.n_terms), np.diff(self.offsets)), np.asarray(self.postings, dtype=np.int64)
+
+    def papers(self, term: str) -> np.ndarray:
+        code = int(snapshot.lookup(self.terms, [term])[0])
+        if code < 0:
+            return np.empty(0, dtype=self.postings.dtype)
+        return self.postings[self.offsets[code]:self.offsets[code + 1]]
+
+    def any_of(self, terms: Iterable[str]) -> np.ndarray:
+        lists = [self.papers(term) for term in terms]
+        return np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=self.postings.dtype)
+
+    def all_of(self, terms: Iterable[str]) -> np.ndarray:
+        """
+        Rows of the papers with every one of `terms`, intersecting the shortest lists first.
+        """
+        lists = sorted((self.papers(term) for term in terms), key=len)
+        if not lists:
+            return np.empty(0, dtype=self.postings.dtype)
+        matched = lists[0]
+        for postings in lists[1:]:
+            matched = np.intersect1d(matched, postings, assume_unique=True)
+        return matched
+
+    def paper_id(self, row: int) -> str:
+        return self.paper_ids[row].decode("utf-8")
+
+    def keyword_rows(self, codes: Optional[Iterable[int]] = None) -> Iterator[dict]:
+        counts = np.diff(self.offsets)
+        for code in (range(self.n_terms) if codes is None else codes):
+            yield {"name": self.terms[code].decode("utf-8"), "papers": int(counts[code])}
+
+    def paper_rows(self) -> Iterator[dict]:
+        """
+        {paperID, keywords} for every indexed paper, also those left without keywords.
+        """
+        codes, rows = self.pairs()
+        offsets, paper_terms = snapshot.csr(rows, codes, len(self.paper_ids))
+        for row in range(len(self.paper_ids)):
+            yield {"paperID": self.paper_id(row),
+                   "keywords": [self.terms[code].decode("utf-8") for code in paper_terms[offsets[row]:offsets[row + 1]]]}
+
+    def replace_papers(self, extracted: List[Tuple[str, List[str]]], removed_ids: Iterable[str]) -> "KeywordIndex":
+        """
+        A new index with the postings of `extracted` papers replaced and `removed_ids` gone.
+        The vocabulary is fixed: phrases not already indexed are ignored until the next
+        full extraction.
+        """
+        dropped = snapshot.encode_ids([paper_id for paper_id, _ in extracted] + list(removed_ids))
+        codes, rows = self.pairs()
+        kept = ~np.isin(self.paper_ids[rows], dropped) if len(rows) else np.zeros(0, dtype=bool)
+        remaining = self.paper_ids[~np.isin(self.paper_ids, snapshot.encode_ids(list(removed_ids)))]
+        paper_ids = np.union1d(remaining, snapshot.encode_ids([paper_id for paper_id, _ in extracted]))
+
+        new_codes, new_rows = [codes[kept]], [snapshot.lookup(paper_ids, self.paper_ids[rows[kept]])]
+        for paper_id, phrases in extracted:
+            found = snapshot.lookup(self.terms, phrases)
+            found = found[found >= 0]
+            new_codes.append(found)
+            new_rows.append(np.full(len(found), snapshot.lookup(paper_ids, [paper_id])[0], dtype=np.int64))
+        return KeywordIndex.from_pairs(self.terms, np.concatenate(new_codes), np.concatenate(new_rows), paper_ids)
+
+    def save(self, path: str = KEYWORD_DIR):
+        snapshot.save_arrays(path, {
+            "keywords.terms": self.terms, "keywords.offsets": self.offsets,
+            "keywords.postings": self.postings, "papers.ids": self.paper_ids,
+        }, {"counts": {"keywords": self.n_terms, "papers": len(self.paper_ids), "postings": len(self.postings)}})
+
+    @classmethod
+    def open(cls, path: str = KEYWORD_DIR) -> "KeywordIndex":
+        arrays = snapshot.Snapshot(path)
+        return cls(arrays.array("keywords.terms"), arrays.array("keywords.offsets"),
+                   arrays.array("keywords.postings"), arrays.array("papers.ids"))
+
+
+# --- Loading ---
+
+def _paper_texts(tx, query: query_catalog.Query, **params) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    return [(record["paperID"], record["title"], record["abstract"]) for record in query_catalog.run(tx, query, **params)]
+
+def _write_rows(tx, query: query_catalog.Query, rows: List[dict]):
+    query_catalog.run(tx, query, rows=rows).consume()
+
+def _write(session, query: query_catalog.Query, rows: List[dict], batch_size: int):
+    for i in range(0, len(rows), batch_size):
+        session.execute_write(_write_rows, query, rows[i:i + batch_size])
+
+def _prune(tx):
+    query_catalog.run(tx, PRUNE_KEYWORDS_QUERY).consume()
+
+def load_keywords(session, path: str = KEYWORD_DIR, workers: int = KEYWORD_WORKERS,
+                  max_n: int = KEYWORD_MAX_NGRAM, batch_size: int = KEYWORD_BATCH_SIZE) -> int:
+    """
+    Extract keyphrases from every paper's title and abstract, write Keyword {name,
+    paperCount} nodes and HAS_KEYWORD edges in batches, and save the inverted index to
+    `path` for refresh_keywords. Returns the number of keywords.
+    """
+    papers = session.execute_read(_paper_texts, PAPERS_QUERY)
+    index = KeywordIndex.build(extract_all(papers, workers, max_n), keep=community_keywords())
+    _write(session, UPSERT_KEYWORDS_QUERY, list(index.keyword_rows()), batch_size)
+    _write(session, LINK_PAPERS_QUERY, list(index.paper_rows()), batch_size)
+    session.execute_write(_prune)
+    if path:
+        index.save(path)
+    return index.n_terms
+
+def refresh_keywords(session, changed_ids: List[str], removed_ids: List[str], path: str = KEYWORD_DIR,
+                     max_n: int = KEYWORD_MAX_NGRAM, batch_size: int = KEYWORD_BATCH_SIZE) -> int:
+    """
+    After a delta load: re-extract the changed papers against the saved vocabulary, relink
+    them and update paperCount of the keywords they gained or lost. A no-op until
+    load_keywords has saved an index. Returns the papers relinked.
+    """
+    if not path or not os.path.exists(os.path.join(path, "manifest.json")):
+        return 0
+    index = KeywordIndex.open(path)
+    papers = session.execute_read(_paper_texts, PAPERS_BY_ID_QUERY, paperIDs=sorted(set(changed_ids)))
+    # Deltas are small; a pool would cost more to start than it saves
+    extracted = []
+    for paper_id, phrases in extract_all(papers, workers=1, max_n=max_n):
+        found = snapshot.lookup(index.terms, phrases)
+        extracted.append((paper_id, [phrase for phrase, code in zip(phrases, found) if code >= 0]))
+    updated = index.replace_papers(extracted, removed_ids)
+
+    codes, rows = index.pairs()
+    stale = snapshot.lookup(index.paper_ids, [paper_id for paper_id, _ in extracted] + list(removed_ids))
+    touched = set(codes[np.isin(rows, stale[stale >= 0])].tolist())
+    touched.update(snapshot.lookup(index.terms, [phrase for _, phrases in extracted for phrase in phrases]).tolist())
+    _write(session, UPSERT_KEYWORDS_QUERY, list(updated.keyword_rows(sorted(touched))), batch_size)
+    _write(session, LINK_PAPERS_QUERY, [{"paperID": paper_id, "keywords": phrases} for paper_id, phrases in extracted],
+           batch_size)
+    updated.save(path)
+    return len(extracted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword extraction and keyword -> paper index.")
+    parser.add_argument("keywords", nargs="*", help="list the papers with any (or --all) of these keywords")
+    parser.add_argument("--all", action="store_true", help="papers must have every keyword")
+    parser.add_argument("--build", action="store_true", help="extract and load the keywords first")
+    parser.add_argument("--workers", type=int, default=KEYWORD_WORKERS)
+    args = parser.parse_args()
+
+    if args.build:
+        with connection.Connection() as driver, driver.session(database=connection.DATABASE) as session:
+            print("Connection successful!")
+            start = time.perf_counter()
+            keywords = load_keywords(session, workers=args.workers)
+            print(f"Loaded {keywords} keywords in {time.perf_counter() - start:.2f}s")
+    if not args.keywords:
+        return
+
+    index = KeywordIndex.open()
+    keywords = [normalize(keyword) for keyword in args.keywords]
+    start = time.perf_counter()
+    rows = index.all_of(keywords) if args.all else index.any_of(keywords)
+    elapsed = time.perf_counter() - start
+    for row in rows.tolist():
+        print(index.paper_id(row))
+    print(f"{len(rows)} papers with {'all' if args.all else 'any'} of {keywords} ({elapsed * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+MAX_CITATIONS = 20
+REVIEWERS_PER_PAPER = 3
+MAX_ROUNDS = 1000
+
+# Arrays shared with the worker processes, set once per process by _init_worker
+_STATE = {}
+
+
+def _split_ids(value) -> List[str]:
+    # pandas parses a lone numeric ID as a number and a blank cell as NaN
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return []
+    value = str(value)
+    return value.split(";") if value else []
+
+def encode_authors(author_ids: Iterable) -> Dict[str, np.ndarray]:
+    """
+    Turn the semicolon-packed authorIDs column into integer codes in CSR form:
+    paper i wrote codes[offsets[i]:offsets[i + 1]] and unique_ids maps codes back to IDs.
+    """
+    lists = [_split_ids(value) for value in author_ids]
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    flat = np.array(list(chain.from_iterable(lists)), dtype=str)
+    unique_ids, codes = np.unique(flat, return_inverse=True)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    paper_of_code = np.repeat(np.arange(len(lists), dtype=np.int64), lengths)
+    # paper * n_authors + code identifies an authorship, so a co-author test is one isin()
+    pair_keys = np.unique(paper_of_code * len(unique_ids) + codes)
+    coauthor_counts = np.bincount(pair_keys // max(len(unique_ids), 1), minlength=len(lists))
+    return {
+        "unique_ids": unique_ids,
+        "codes": codes.astype(np.int64),
+        "offsets": offsets,
+        "pair_keys": pair_keys,
+        "coauthor_counts": coauthor_counts,
+    }
+
+def _duplicates(rows: np.ndarray, values: np.ndarray, base: int) -> np.ndarray:
+    """
+    Positions whose value already appears earlier in the same row.
+    """
+    keys = rows * base + values
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    return order[1:][sorted_keys[1:] == sorted_keys[:-1]]
+
+def _row_positions(rows: np.ndarray, selected: np.ndarray) -> np.ndarray:
+    """
+    All positions of the `selected` rows in the sorted `rows` array, so a redraw round
+    only re-checks the rows it touched.
+    """
+    selected = np.unique(selected)
+    starts = np.searchsorted(rows, selected, side="left")
+    lengths = np.searchsorted(rows, selected, side="right") - starts
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+def _contains(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    idx = np.minimum(np.searchsorted(sorted_keys, keys), max(sorted_keys.size - 1, 0))
+    return sorted_keys[idx] == keys if sorted_keys.size else np.zeros(keys.size, dtype=bool)
+
+def draw_citations(rng: np.random.Generator, start: int, end: int, n_papers: int,
+                   max_citations: int = MAX_CITATIONS):
+    """
+    0..max_citations distinct cited papers for each paper in [start, end). Targets are drawn
+    as a non-zero offset modulo n_papers, so a paper can never cite itself.
+    """
+    counts = np.minimum(rng.integers(0, max_citations + 1, end - start), max(n_papers - 1, 0))
+    rows = np.repeat(np.arange(start, end, dtype=np.int64), counts)
+    if n_papers < 2:
+        return counts, rows
+    targets = (rows + rng.integers(1, n_papers, rows.size)) % n_papers
+    bad = _duplicates(rows, targets, n_papers)
+    while bad.size:
+        targets[bad] = (rows[bad] + rng.integers(1, n_papers, bad.size)) % n_papers
+        positions = _row_positions(rows, rows[bad])
+        bad = positions[_duplicates(rows[positions], targets[positions], n_papers)]
+    return counts, targets
+
+def draw_reviewers(rng: np.random.Generator, start: int, end: int, authors: Dict[str, np.ndarray],
+                   k: int = REVIEWERS_PER_PAPER):
+    """
+    Up to k distinct reviewers per paper in [start, end), drawn from all authorships (so
+    prolific authors review more) and rejected when they co-wrote the paper.
+    """
+    n_authors = len(authors["unique_ids"])
+    available = n_authors - authors["coauthor_counts"][start:end]
+    counts = np.minimum(k, available)
+    rows = np.repeat(np.arange(start, end, dtype=np.int64), counts)
+    pool = authors["codes"]
+    reviewers = pool[rng.integers(0, pool.size, rows.size)] if pool.size else rows
+    positions = np.arange(rows.size)
+    for _ in range(MAX_ROUNDS):
+        sub_rows, sub_reviewers = rows[positions], reviewers[positions]
+        coauthor = _contains(authors["pair_keys"], sub_rows * n_authors + sub_reviewers)
+        bad = positions[np.union1d(np.flatnonzero(coauthor), _duplicates(sub_rows, sub_reviewers, n_authors))]
+        if bad.size == 0:
+            return counts, reviewers
+        reviewers[bad] = pool[rng.integers(0, pool.size, bad.size)]
+        positions = _row_positions(rows, rows[bad])
+    # Pathological rows (almost every author co-wrote the paper): drop unresolved draws
+    keep = np.ones(rows.size, dtype=bool)
+    keep[bad] = False
+    return np.bincount(rows[keep] - start, minlength=end - start), reviewers[keep]
+
+def _join(ids: np.ndarray, counts: np.ndarray, values: np.ndarray) -> List[str]:
+    if counts.size == 0:
+        return []
+    picked = ids[values].tolist()
+    bounds = np.concatenate([[0], np.cumsum(counts)]).tolist()
+    return [";".join(picked[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+def _generate_chunk(args):
+    seed_seq, start, end, p_approve = args
+    paper_ids, authors = _STATE["paper_ids"], _STATE["authors"]
+    rng = np.random.default_rng(seed_seq)
+    citation_counts, cited = draw_citations(rng, start, end, len(paper_ids))
+    review_counts, reviewers = draw_reviewers(rng, start, end, authors)
+    approved = rng.random((end - start, REVIEWERS_PER_PAPER)) < p_approve
+    approvements = np.where(approved, "True", "False").tolist()
+    return (
+        _join(paper_ids, citation_counts, cited),
+        _join(authors["unique_ids"], review_counts, reviewers),
+        [";".join(row) for row in approvements],
+    )
+
+def _init_worker(paper_ids, authors):
+    _STATE["paper_ids"] = paper_ids
+    _STATE["authors"] = authors
+
+def generate_links(paper_ids: Iterable, author_ids: Iterable, p_approve: float, seed: int = 42,
+                   chunk_size: int = 100_000, workers: int = 1) -> Dict[str, List[str]]:
+    """
+    Synthetic citedPaperID, reviewerIDs and reviewsApprovements columns for every paper.
+
+    Papers are processed in chunks of `chunk_size`, each with its own child generator of
+    `seed`, so the output only depends on (seed, chunk_size) and not on `workers`.
+    """
+    paper_ids = np.asarray(list(paper_ids), dtype=str)
+    authors = encode_authors(author_ids)
+    n_chunks = max(1, math.ceil(len(paper_ids) / chunk_size))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tasks = [
+        (seeds[i], i * chunk_size, min(len(paper_ids), (i + 1) * chunk_size), p_approve)
+        for i in range(n_chunks)
+    ]
+    if workers > 1 and n_chunks > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(paper_ids, authors)) as pool:
+            results = list(pool.map(_generate_chunk, tasks))
+    else:
+        _init_worker(paper_ids, authors)
+        results = [_generate_chunk(task) for task in tasks]
+    return {
+        "citedPaperID": [value for result in results for value in result[0]],
+        "reviewerIDs": [value for result in results for value in result[1]],
+        "reviewsApprovements": [value for result in results for value in result[2]],
+    }
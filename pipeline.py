@@ -0,0 +1,271 @@
+import argparse
+import csv
+import os
+import zlib
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+import config
+import harvester
+import http_cache
+
+config.load_env()
+
+CHUNK_SIZE = int(os.getenv("PIPELINE_CHUNK_SIZE", "5000"))
+RESERVOIR_SIZE = int(os.getenv("PIPELINE_RESERVOIR_SIZE", "100000"))
+PARQUET_PATH = os.getenv("PARQUET_PATH", "./csv/papers_venues.parquet")
+AFFILIATIONS_PARQUET_PATH = os.getenv("AFFILIATIONS_PARQUET_PATH", "./csv/authors_affiliations.parquet")
+
+SCALAR_COLUMNS = [
+    "paperID", "doi", "journal_name", "volume", "volume_id", "pages", "abstract",
+    "publicationVenue_name", "edition_id", "city_venue", "title", "year",
+]
+LIST_COLUMNS = [
+    "authorIDs", "authorNames", "fields", "citedPaperID", "reviewerIDs",
+    "reviewsApprovements", "reviewsDesc",
+]
+CSV_COLUMNS = SCALAR_COLUMNS + LIST_COLUMNS
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The columnar pipeline needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def papers_schema():
+    pa = _pyarrow()
+    string_list = pa.list_(pa.string())
+    return pa.schema([
+        ("paperID", pa.string()), ("doi", pa.string()), ("journal_name", pa.string()),
+        ("volume", pa.int32()), ("volume_id", pa.string()), ("pages", pa.string()),
+        ("abstract", pa.string()), ("publicationVenue_name", pa.string()), ("edition_id", pa.string()),
+        ("city_venue", pa.string()), ("title", pa.string()), ("year", pa.int32()),
+        ("authorIDs", string_list), ("authorNames", string_list), ("fields", string_list),
+        ("citedPaperID", string_list), ("reviewerIDs", string_list),
+        ("reviewsApprovements", pa.list_(pa.bool_())), ("reviewsDesc", string_list),
+    ])
+
+
+class Reservoir:
+    """
+    Fixed-size uniform sample of a stream (Algorithm R). Synthetic citations and reviewers
+    are drawn from it, so enrichment memory does not grow with the dataset.
+    """
+    def __init__(self, capacity: int, rng: np.random.Generator):
+        self.capacity = capacity
+        self.items: List[str] = []
+        self.seen = 0
+        self._rng = rng
+
+    def add(self, item: str):
+        self.seen += 1
+        if len(self.items) < self.capacity:
+            self.items.append(item)
+        else:
+            slot = self._rng.integers(0, self.seen)
+            if slot < self.capacity:
+                self.items[slot] = item
+
+    def sample(self, k: int, exclude: Iterable[str] = ()) -> List[str]:
+        """
+        Up to k distinct items not in `exclude`. Gives up after a bounded number of draws,
+        since the reservoir may hold repeats and fewer than k eligible items.
+        """
+        excluded = set(exclude)
+        picked = {}
+        if not self.items:
+            return []
+        for index in self._rng.integers(0, len(self.items), 20 * k + 20):
+            if len(picked) == k:
+                break
+            item = self.items[index]
+            if item not in excluded:
+                picked[item] = None
+        return list(picked)
+
+
+# --- Stages ---
+
+def iter_api_papers(query: str, params: dict, base_url: str = harvester.SEMANTIC_SCHOLAR_BASE_URL,
+                    cache: Optional[http_cache.ResponseCache] = None) -> Iterator[dict]:
+    """
+    Yield raw papers page by page, following continuation tokens.
+    """
+    limiter = harvester.RateLimiter(harvester.REQUESTS_PER_SECOND)
+    url = f"{base_url}/paper/search/bulk"
+    token = None
+    with harvester.make_session(1) as session:
+        while True:
+            page_params = {**params, "query": query, **({"token": token} if token else {})}
+            data = harvester.fetch_page(session, limiter, url, page_params, cache=cache)
+            yield from data.get("data", [])
+            token = data.get("token")
+            if not token:
+                return
+
+def extract(papers: Iterable[dict]) -> Iterator[dict]:
+    import A2_api_pull
+    for paper in papers:
+        details = A2_api_pull.extract_paper_details(paper, None)
+        if details is not None:
+            yield details
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _split(value) -> List[str]:
+    return [item for item in value.split(";") if item] if value else []
+
+def enrich(chunks: Iterable[List[dict]], p_approve: float, seed: int = 42,
+           reservoir_size: int = RESERVOIR_SIZE) -> Iterator[List[dict]]:
+    """
+    Add synthetic citations, reviewers and approvements to each chunk. Papers cite a
+    uniform sample of papers seen so far (including their own chunk), never themselves,
+    and reviewers never co-wrote the paper.
+    """
+    rng = np.random.default_rng(seed)
+    papers, authors = Reservoir(reservoir_size, rng), Reservoir(reservoir_size, rng)
+    for chunk in chunks:
+        for details in chunk:
+            papers.add(details["paperID"])
+            for author_id in _split(details["authorIDs"]):
+                authors.add(author_id)
+        for details in chunk:
+            author_ids = _split(details["authorIDs"])
+            details["authorIDs"] = author_ids
+            details["authorNames"] = _split(details["authorNames"])
+            details["fields"] = _split(details["fields"])
+            details["citedPaperID"] = papers.sample(int(rng.integers(0, 21)), exclude=[details["paperID"]])
+            details["reviewerIDs"] = authors.sample(3, exclude=author_ids)
+            details["reviewsApprovements"] = (rng.random(3) < p_approve).tolist()
+            details["reviewsDesc"] = ["desc"] * 3
+        yield chunk
+
+def _affiliation(author_id: str, affiliations: List[str]) -> str:
+    # Stable per author without any lookup table
+    return affiliations[zlib.crc32(author_id.encode("utf-8")) % len(affiliations)]
+
+def write_parquet(chunks: Iterable[List[dict]], path: str = PARQUET_PATH,
+                  affiliations_path: str = AFFILIATIONS_PARQUET_PATH,
+                  affiliations: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Write each chunk as one Parquet row group, plus one (authorID, affiliation) row per new
+    author. Only the set of seen author IDs is kept across chunks.
+    """
+    pa = _pyarrow()
+    import pyarrow.parquet as pq
+    schema = papers_schema()
+    aff_schema = pa.schema([("authorID", pa.string()), ("affiliation", pa.string())])
+    seen_authors = set()
+    counts = {"papers": 0, "authors": 0}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with pq.ParquetWriter(path, schema) as writer, pq.ParquetWriter(affiliations_path, aff_schema) as aff_writer:
+        for chunk in chunks:
+            rows = [{**details, "volume": int(details["volume"]) if details["volume"] else None} for details in chunk]
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            new_authors = []
+            for details in chunk:
+                for author_id in details["authorIDs"]:
+                    if author_id not in seen_authors:
+                        seen_authors.add(author_id)
+                        new_authors.append(author_id)
+            if affiliations and new_authors:
+                aff_writer.write_table(pa.Table.from_pydict({
+                    "authorID": new_authors,
+                    "affiliation": [_affiliation(author_id, affiliations) for author_id in new_authors],
+                }, schema=aff_schema))
+            counts["papers"] += len(chunk)
+            counts["authors"] += len(new_authors)
+    return counts
+
+
+# --- Readers / export ---
+
+def iter_columns(path: str, columns: Optional[List[str]] = None, batch_size: int = CHUNK_SIZE) -> Iterator[Dict[str, list]]:
+    """
+    Stream a Parquet file as column dicts, reading only `columns`.
+    """
+    _pyarrow()
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pydict()
+
+def _csv_value(column: str, value) -> str:
+    if value is None:
+        return ""
+    if column in LIST_COLUMNS:
+        return ";".join(str(item) for item in value)
+    if column == "volume":
+        return str(float(value))  # matches the pandas float formatting of the CSV export
+    return str(value)
+
+def iter_rows(path: str, columns: Optional[List[str]] = None) -> Iterator[Dict[str, str]]:
+    """
+    Rows of a Parquet file in the pipe-delimited CSV representation (lists joined by ';'),
+    so the CSV-based loaders can consume it unchanged.
+    """
+    for batch in iter_columns(path, columns):
+        names = list(batch)
+        for values in zip(*batch.values()):
+            yield {name: _csv_value(name, value) for name, value in zip(names, values)}
+
+def export_csv(parquet_path: str = PARQUET_PATH, csv_path: str = "./csv/papers_venues.csv"):
+    """
+    Write the Parquet intermediate as the legacy pipe-delimited CSV.
+    """
+    import pyarrow.parquet as pq
+    columns = [name for name in CSV_COLUMNS if name in pq.ParquetFile(parquet_path).schema_arrow.names]
+    with open(csv_path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, delimiter="|")
+        writer.writerow(columns)
+        for row in iter_rows(parquet_path, columns):
+            writer.writerow([row[column] for column in columns])
+
+
+def run_pipeline(query: str, params: dict, p_approve: float, affiliations: List[str],
+                 chunk_size: int = CHUNK_SIZE, path: str = PARQUET_PATH,
+                 affiliations_path: str = AFFILIATIONS_PARQUET_PATH,
+                 papers: Optional[Iterable[dict]] = None) -> Dict[str, int]:
+    """
+    API pages -> extract_paper_details -> enrichment -> Parquet, one chunk at a time.
+    `papers` overrides the API source (e.g. a harvester checkpoint).
+    """
+    source = papers if papers is not None else iter_api_papers(query, params, cache=http_cache.default_cache())
+    chunks = enrich(chunked(extract(source), chunk_size), p_approve)
+    return write_parquet(chunks, path, affiliations_path, affiliations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream Semantic Scholar papers into Parquet.")
+    parser.add_argument("query", nargs="?", default="machine learning")
+    parser.add_argument("--from-checkpoint", help="read pages from a harvester JSONL file instead of the API")
+    parser.add_argument("--csv", action="store_true", help="also export the pipe-delimited CSVs")
+    args = parser.parse_args()
+
+    import A2_api_pull
+    params = {"fields": harvester.DEFAULT_FIELDS, "sort": "citationCount:desc"}
+    papers = harvester.Checkpoint(args.from_checkpoint).papers() if args.from_checkpoint else None
+    counts = run_pipeline(args.query, params, A2_api_pull.PROBA_APPROVE, config.json_list("LIST_AFF"), papers=papers)
+    print(f"Wrote {counts['papers']} papers and {counts['authors']} authors to {PARQUET_PATH}")
+    if args.csv:
+        export_csv()
+        with open("./csv/authors_affiliations.csv", mode="w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file, delimiter="|")
+            writer.writerow(["authorID", "affiliation"])
+            for batch in iter_columns(AFFILIATIONS_PARQUET_PATH):
+                writer.writerows(zip(batch["authorID"], batch["affiliation"]))
+        print("Exported papers_venues.csv and authors_affiliations.csv")
+
+if __name__ == "__main__":
+    main()
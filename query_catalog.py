@@ -0,0 +1,132 @@
+import importlib
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import config
+import connection
+
+config.load_env()
+
+QUERY_WARMUP = os.getenv("QUERY_WARMUP", "1") == "1"
+
+# Modules that register queries on import; load_all() imports them so the catalog is complete
+MODULES = [
+    "A2_create_graph", "B_querying", "author_metrics", "batch_loader", "citation_metrics",
+    "delta_loader", "distance_oracle", "graph_analytics", "impact_factor", "keywords", "recommender",
+    "result_cache", "review_migration", "snapshot",
+]
+
+PARAMETER_PATTERN = re.compile(r"\$(\w+)")
+# Placeholder values used to EXPLAIN a query; the plan only depends on their types
+EXAMPLES = {str: "", int: 0, float: 0.0, bool: False, list: [], dict: {}, type(None): None}
+
+ParamType = Union[type, Tuple[type, ...]]
+
+
+class Query(NamedTuple):
+    """
+    A named Cypher statement and the type of each of its $parameters.
+    """
+    name: str
+    cypher: str
+    params: Dict[str, ParamType]
+
+    def example(self) -> dict:
+        return {key: EXAMPLES[kind[0] if isinstance(kind, tuple) else kind] for key, kind in self.params.items()}
+
+    def bind(self, params: dict) -> dict:
+        """
+        Check `params` against the schema; raises ValueError naming the query.
+        """
+        missing = self.params.keys() - params.keys()
+        unexpected = params.keys() - self.params.keys()
+        if missing or unexpected:
+            raise ValueError(f"{self.name}: missing parameters {sorted(missing)}, unexpected {sorted(unexpected)}")
+        for key, value in params.items():
+            kind = self.params[key]
+            kinds = kind if isinstance(kind, tuple) else (kind,)
+            if float in kinds:
+                kinds = kinds + (int,)
+            if not isinstance(value, kinds) or (isinstance(value, bool) and bool not in kinds):
+                raise ValueError(f"{self.name}: ${key} should be {kind}, got {type(value).__name__}")
+        return params
+
+
+CATALOG: Dict[str, Query] = {}
+
+def register(name: str, cypher: str, /, **params: ParamType) -> Query:
+    """
+    Add a statement to the catalog. Every $parameter in the text must have a type and
+    every typed parameter must be used, so the schema cannot drift from the query.
+    """
+    used = set(PARAMETER_PATTERN.findall(cypher))
+    if used != params.keys():
+        raise ValueError(f"{name}: query uses {sorted(used)} but the schema declares {sorted(params)}")
+    query = Query(name, cypher, params)
+    existing = CATALOG.get(name)
+    # A module run as __main__ is imported a second time under its own name
+    if existing is not None and existing.cypher != cypher:
+        raise ValueError(f"{name} is already registered with a different query")
+    CATALOG[name] = query
+    return query
+
+def get(name: str) -> Query:
+    if name not in CATALOG:
+        load_all()
+    return CATALOG[name]
+
+def run(tx, query: Union[Query, str], /, **params):
+    """
+    Run a catalog query (or the catalog entry called `query`) in a session or transaction.
+    The text is always identical, so every call reuses one cached plan.
+    """
+    if isinstance(query, str):
+        query = get(query)
+    return tx.run(query.cypher, query.bind(params))
+
+def load_all() -> Dict[str, Query]:
+    for module in MODULES:
+        importlib.import_module(module)
+    return CATALOG
+
+
+def warmup(session, names: Optional[Iterable[str]] = None) -> List[Tuple[str, str]]:
+    """
+    EXPLAIN every catalog entry (or just `names`) so their plans are compiled and cached
+    before the first real request. Returns (name, error) for queries that failed to plan.
+    """
+    queries = [get(name) for name in names] if names is not None else list(load_all().values())
+    failures = []
+    for query in queries:
+        try:
+            session.run("EXPLAIN " + query.cypher, query.example()).consume()
+        except Exception as error:
+            failures.append((query.name, str(error)))
+    return failures
+
+def warmup_at_start(session):
+    # Called from the entry points right after connecting, unless QUERY_WARMUP=0
+    if not QUERY_WARMUP:
+        return
+    start = time.perf_counter()
+    failures = warmup(session)
+    print(f"Warmed {len(CATALOG) - len(failures)} query plans in {time.perf_counter() - start:.2f}s")
+    for name, error in failures:
+        print(f"  {name} failed to plan: {error}")
+
+
+def main():
+    load_all()
+    if "--list" in sys.argv:
+        for query in CATALOG.values():
+            params = ", ".join(f"{key}: {getattr(kind, '__name__', kind)}" for key, kind in query.params.items())
+            print(f"{query.name}({params})")
+        return
+    with connection.Connection() as driver, driver.session(database=connection.DATABASE) as session:
+        warmup_at_start(session)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+import heapq
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+import numpy as np
+
+import config
+import connection
+import query_catalog
+
+config.load_env()
+
+DEFAULT_COMMUNITIES = {
+    "Database Community": [
+        "data management", "indexing", "data modeling", "big data",
+        "data processing", "data storage", "data querying",
+    ],
+}
+RELATED_RATIO = float(os.getenv("RECOMMENDER_RELATED_RATIO", "0.9"))
+TOP_PAPERS = int(os.getenv("RECOMMENDER_TOP_PAPERS", "100"))
+GURU_MIN_TOP_PAPERS = int(os.getenv("RECOMMENDER_GURU_MIN_TOP_PAPERS", "2"))
+
+
+def configured_communities() -> Dict[str, List[str]]:
+    """
+    Community name -> keywords from RECOMMENDER_COMMUNITIES (JSON), parsed on first use.
+    """
+    return config.json_setting("RECOMMENDER_COMMUNITIES") or DEFAULT_COMMUNITIES
+
+
+# One row per paper: its venue (conference/workshop edition or journal volume), its terms
+# (Field names via IN_FIELD and Keyword names via HAS_KEYWORD), citations and authors
+_PAPER_ROWS = """
+    OPTIONAL MATCH (p)-[:PUBLISHED_IN_VENUE]->(:Edition)-[:BELONGS_TO]->(v:PublicationVenue)
+    OPTIONAL MATCH (p)-[:PUBLISHED_IN]->(:Volume)-[:VOLUME_OF]->(j:Journal)
+    OPTIONAL MATCH (p)-[:IN_FIELD|HAS_KEYWORD]->(t)
+    WITH p, v, j, collect(DISTINCT toLower(t.name)) AS terms
+    RETURN p.paperID AS paperID, p.title AS title, coalesce(p.citationCount, 0) AS citations,
+        CASE WHEN v IS NOT NULL THEN 'PublicationVenue' WHEN j IS NOT NULL THEN 'Journal' END AS venueLabel,
+        coalesce(v.name, j.name) AS venue, terms,
+        [(p)-[:WRITTEN_BY]->(a:Author) | a.authorID] AS authorIDs
+"""
+PAPERS_QUERY = query_catalog.register("recommender.papers", "MATCH (p:Paper)" + _PAPER_ROWS)
+PAPERS_BY_ID_QUERY = query_catalog.register(
+    "recommender.papers_by_id", "UNWIND $paperIDs AS paperID MATCH (p:Paper {paperID: paperID})" + _PAPER_ROWS,
+    paperIDs=list,
+)
+
+# Write-back of one community, mirroring the report's steps. Old results are replaced.
+WRITE_COMMUNITY_QUERIES = [
+    query_catalog.register("recommender.write_community.reset", """
+        MERGE (rc:ResearchCommunity {name: $name})
+        SET rc.keywords = $keywords
+        WITH rc
+        OPTIONAL MATCH (rc)-[r:HAS_KEYWORD|HAS_TOP_PAPER]->()
+        DELETE r
+        WITH DISTINCT rc
+        OPTIONAL MATCH (rc)<-[r:RELATED_TO|POTENTIAL_REVIEWER|GURU]-()
+        DELETE r
+    """, name=str, keywords=list),
+    query_catalog.register("recommender.write_community.keywords", """
+        MATCH (rc:ResearchCommunity {name: $name})
+        MATCH (k:Keyword) WHERE k.name IN $keywords
+        MERGE (rc)-[:HAS_KEYWORD]->(k)
+    """, name=str, keywords=list),
+    query_catalog.register("recommender.write_community.venues", """
+        MATCH (rc:ResearchCommunity {name: $name})
+        UNWIND $venues AS venue
+        MATCH (v:PublicationVenue {name: venue.name})
+        CREATE (v)-[:RELATED_TO {ratio: venue.ratio}]->(rc)
+    """, name=str, venues=list),
+    query_catalog.register("recommender.write_community.journals", """
+        MATCH (rc:ResearchCommunity {name: $name})
+        UNWIND $journals AS journal
+        MATCH (j:Journal {name: journal.name})
+        CREATE (j)-[:RELATED_TO {ratio: journal.ratio}]->(rc)
+    """, name=str, journals=list),
+    query_catalog.register("recommender.write_community.top_papers", """
+        MATCH (rc:ResearchCommunity {name: $name})
+        UNWIND $papers AS paper
+        MATCH (p:Paper {paperID: paper.paperID})
+        SET p:TopPaper, p.topCitations = paper.citations
+        CREATE (rc)-[:HAS_TOP_PAPER]->(p)
+    """, name=str, papers=list),
+    query_catalog.register("recommender.write_community.reviewers", """
+        MATCH (rc:ResearchCommunity {name: $name})
+        UNWIND $reviewers AS reviewer
+        MATCH (a:Author {authorID: reviewer.authorID})
+        CREATE (a)-[:POTENTIAL_REVIEWER]->(rc)
+        FOREACH (_ IN CASE WHEN reviewer.topPapers >= $guruMin THEN [1] ELSE [] END |
+            CREATE (a)-[:GURU {topPapers: reviewer.topPapers}]->(rc))
+    """, name=str, reviewers=list, guruMin=int),
+]
+CLEAR_TOP_PAPERS_QUERY = query_catalog.register("recommender.clear_top_papers", """
+    MATCH (p:TopPaper)
+    WHERE NOT (p)<-[:HAS_TOP_PAPER]-(:ResearchCommunity)
+    REMOVE p:TopPaper, p.topCitations
+""")
+
+
+class CommunityResult(NamedTuple):
+    name: str
+    keywords: List[str]
+    venues: Dict[str, float]        # related venue key -> share of its papers on topic
+    top_papers: List[int]           # paper rows, most cited first
+    reviewers: List[tuple]          # (authorID, top paper count), most top papers first
+
+
+def _venue_key(label: Optional[str], name: Optional[str]) -> Optional[str]:
+    return f"{label}:{name}" if label and name else None
+
+
+class Recommender:
+    """
+    Batch ResearchCommunity -> related venues -> top papers -> reviewers/gurus pipeline for
+    any number of communities, plus an in-memory serving index over its results.
+
+    Papers live in column lists indexed by row; `postings` maps each lower-cased term to a
+    sorted array of rows, so "papers on topic" is a union of a community's posting lists.
+    """
+    def __init__(self, communities: Dict[str, List[str]] = None, ratio: float = RELATED_RATIO,
+                 top_k: int = TOP_PAPERS, guru_min: int = GURU_MIN_TOP_PAPERS):
+        self.communities = {name: [keyword.lower() for keyword in keywords]
+                            for name, keywords in (communities or configured_communities()).items()}
+        self.ratio = ratio
+        self.top_k = top_k
+        self.guru_min = guru_min
+        self._reset()
+
+    def _reset(self):
+        self.version: Optional[str] = None
+        self.paper_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.titles: List[Optional[str]] = []
+        self.citations: List[int] = []
+        self.venues: List[int] = []     # venue code per row, -1 for none or removed papers
+        self.terms: List[Set[str]] = []
+        self.authors: List[tuple] = []
+        self.venue_codes: Dict[str, int] = {}
+        self.postings: Dict[str, np.ndarray] = {}
+        self.results: Dict[str, CommunityResult] = {}
+        self._venue_communities: Dict[int, List[str]] = {}
+        self._reviewer_rank: Dict[str, List[tuple]] = {}
+
+    # --- Loading ---
+
+    def _venue_code(self, key: Optional[str]) -> int:
+        if key is None:
+            return -1
+        return self.venue_codes.setdefault(key, len(self.venue_codes))
+
+    def _set_row(self, record: dict) -> int:
+        row = self.rows.get(record["paperID"])
+        values = (
+            record["title"], record["citations"],
+            self._venue_code(_venue_key(record["venueLabel"], record["venue"])),
+            set(record["terms"]), tuple(record["authorIDs"]),
+        )
+        if row is None:
+            row = self.rows[record["paperID"]] = len(self.paper_ids)
+            self.paper_ids.append(record["paperID"])
+            for column, value in zip((self.titles, self.citations, self.venues, self.terms, self.authors), values):
+                column.append(value)
+        else:
+            self.titles[row], self.citations[row], self.venues[row], self.terms[row], self.authors[row] = values
+        return row
+
+    def load(self, session):
+        """
+        Full build: stream every paper once, index terms, then run all communities.
+        """
+        self._reset()
+        session.execute_read(_stream_papers, PAPERS_QUERY, self._set_row)
+        postings: Dict[str, List[int]] = {}
+        for row, terms in enumerate(self.terms):
+            for term in terms:
+                postings.setdefault(term, []).append(row)
+        self.postings = {term: np.asarray(rows, dtype=np.int64) for term, rows in postings.items()}
+        self.version = _graph_version(session)
+        self.compute()
+
+    def refresh(self, session, paper_ids: Iterable[str]):
+        """
+        Incremental update after a load: re-read only `paper_ids` (new, changed, removed or
+        with changed citation counts), patch their posting lists, and rerun the communities.
+        """
+        paper_ids = sorted(set(paper_ids))
+        old_terms = {paper_id: self.terms[self.rows[paper_id]] for paper_id in paper_ids if paper_id in self.rows}
+        seen = set()
+        def update(record):
+            seen.add(record["paperID"])
+            return self._set_row(record)
+        session.execute_read(_stream_papers, PAPERS_BY_ID_QUERY, update, paperIDs=paper_ids)
+
+        for paper_id in paper_ids:
+            row = self.rows.get(paper_id)
+            if row is None:
+                continue
+            if paper_id not in seen:
+                # Removed from the graph: keep the row slot but take it out of every result
+                self.venues[row], self.citations[row], self.terms[row], self.authors[row] = -1, 0, set(), ()
+            before, after = old_terms.get(paper_id, set()), self.terms[row]
+            for term in before - after:
+                self.postings[term] = self.postings[term][self.postings[term] != row]
+            for term in after - before:
+                self.postings[term] = np.union1d(self.postings.get(term, np.empty(0, dtype=np.int64)), [row])
+        self.version = _graph_version(session)
+        self.compute()
+
+    def refresh_if_stale(self, session, touched: Optional[Iterable[str]] = None) -> bool:
+        """
+        Catch up when the graph version moved since the last build: incrementally over the
+        `touched` paper IDs when the caller knows them (delta_loader.run_delta_load collects
+        them), otherwise with a full rebuild.
+        """
+        if _graph_version(session) == self.version and self.version is not None:
+            return False
+        if touched is not None and self.version is not None:
+            self.refresh(session, touched)
+        else:
+            self.load(session)
+        return True
+
+    # --- Batch computation ---
+
+    def compute(self):
+        venues = np.asarray(self.venues, dtype=np.int64)
+        citations = np.asarray(self.citations, dtype=np.int64)
+        has_venue = venues >= 0
+        totals = np.bincount(venues[has_venue], minlength=len(self.venue_codes))
+        names = {code: key for key, code in self.venue_codes.items()}
+
+        self.results = {}
+        for name, keywords in self.communities.items():
+            lists = [self.postings[keyword] for keyword in keywords if keyword in self.postings]
+            on_topic = np.unique(np.concatenate(lists)) if lists else np.empty(0, dtype=np.int64)
+            on_topic = on_topic[has_venue[on_topic]]
+            topical = np.bincount(venues[on_topic], minlength=len(self.venue_codes))
+            shares = np.divide(topical, totals, out=np.zeros(len(totals)), where=totals > 0)
+            related = np.flatnonzero((totals > 0) & (shares >= self.ratio))
+
+            candidates = np.flatnonzero(np.isin(venues, related))
+            # Ties keep paper order, as a stable sort would
+            top = heapq.nlargest(self.top_k, candidates.tolist(), key=citations.__getitem__)
+            counts = Counter(author for row in top for author in self.authors[row])
+            reviewers = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            self.results[name] = CommunityResult(
+                name, keywords, {names[code]: float(shares[code]) for code in related.tolist()}, top, reviewers,
+            )
+        self._build_serving_index()
+
+    def _build_serving_index(self):
+        self._venue_communities = {}
+        for name, result in self.results.items():
+            for key in result.venues:
+                self._venue_communities.setdefault(self.venue_codes[key], []).append(name)
+        self._reviewer_rank = {name: result.reviewers for name, result in self.results.items()}
+
+    # --- Serving ---
+
+    def communities_of(self, paper_id: str) -> List[str]:
+        row = self.rows.get(paper_id)
+        return self._venue_communities.get(self.venues[row], []) if row is not None else []
+
+    def recommend_papers(self, paper_id: str, k: int = 5) -> List[dict]:
+        """
+        Up to k top papers of the communities related to the paper's venue, most cited first.
+        """
+        rankings = [self.results[name].top_papers for name in self.communities_of(paper_id)]
+        merged = rankings[0] if len(rankings) == 1 else heapq.merge(*rankings, key=lambda row: -self.citations[row])
+        recommended, seen = [], {self.rows.get(paper_id)}
+        for row in merged:
+            if row not in seen:
+                seen.add(row)
+                recommended.append({"paperID": self.paper_ids[row], "title": self.titles[row],
+                                    "citations": self.citations[row]})
+                if len(recommended) == k:
+                    break
+        return recommended
+
+    def recommend_reviewers(self, paper_id: str, k: int = 5) -> List[dict]:
+        """
+        Up to k reviewers from the paper's communities, gurus first, never its own authors.
+        """
+        row = self.rows.get(paper_id)
+        excluded = set(self.authors[row]) if row is not None else set()
+        rankings = [self._reviewer_rank[name] for name in self.communities_of(paper_id)]
+        reviewers, seen = [], set()
+        for author_id, top_papers in heapq.merge(*rankings, key=lambda item: (-item[1], item[0])):
+            if author_id in excluded or author_id in seen:
+                continue
+            seen.add(author_id)
+            reviewers.append({"authorID": author_id, "topPapers": top_papers, "guru": top_papers >= self.guru_min})
+            if len(reviewers) == k:
+                break
+        return reviewers
+
+    # --- Write-back ---
+
+    def write(self, session):
+        """
+        Store every community's results in the graph as the report's model does:
+        HAS_KEYWORD, RELATED_TO {ratio}, :TopPaper + HAS_TOP_PAPER, POTENTIAL_REVIEWER, GURU.
+        """
+        for result in self.results.values():
+            related = {"PublicationVenue": [], "Journal": []}
+            for key, ratio in result.venues.items():
+                label, name = key.split(":", 1)
+                related[label].append({"name": name, "ratio": ratio})
+            params = {
+                "name": result.name,
+                "keywords": result.keywords,
+                "venues": related["PublicationVenue"],
+                "journals": related["Journal"],
+                "papers": [{"paperID": self.paper_ids[row], "citations": self.citations[row]} for row in result.top_papers],
+                "reviewers": [{"authorID": author_id, "topPapers": count} for author_id, count in result.reviewers],
+                "guruMin": self.guru_min,
+            }
+            session.execute_write(_write_community, params)
+        session.execute_write(_run, CLEAR_TOP_PAPERS_QUERY)
+
+
+def _stream_papers(tx, query: query_catalog.Query, handle, **params):
+    for record in query_catalog.run(tx, query, **params):
+        handle(record.data())
+
+def _write_community(tx, params: dict):
+    for query in WRITE_COMMUNITY_QUERIES:
+        query_catalog.run(tx, query, **{key: params[key] for key in query.params}).consume()
+
+def _run(tx, query: query_catalog.Query):
+    query_catalog.run(tx, query).consume()
+
+def _graph_version(session) -> Optional[str]:
+    import result_cache
+    record = query_catalog.run(session, result_cache.READ_VERSION_QUERY).single()
+    return record["version"] if record else None
+
+
+def main():
+    with connection.Connection() as driver:
+        print("Connection successful!")
+        with driver.session(database=connection.DATABASE) as session:
+            recommender = Recommender()
+            start = time.perf_counter()
+            recommender.load(session)
+            print(f"Built {len(recommender.results)} communities over {len(recommender.paper_ids)} papers "
+                  f"in {time.perf_counter() - start:.2f}s")
+            recommender.write(session)
+            for result in recommender.results.values():
+                gurus = sum(1 for _, count in result.reviewers if count >= recommender.guru_min)
+                print(f"{result.name}: {len(result.venues)} related venues, {len(result.top_papers)} top papers, "
+                      f"{len(result.reviewers)} potential reviewers, {gurus} gurus")
+            for paper_id in sys.argv[1:]:
+                print(f"\nRecommended papers for {paper_id}:")
+                for paper in recommender.recommend_papers(paper_id):
+                    print(f"{paper['title']} ({paper['paperID']}): {paper['citations']} citations")
+                print(f"Recommended reviewers for {paper_id}:")
+                for reviewer in recommender.recommend_reviewers(paper_id):
+                    print(f"{reviewer['authorID']}: {reviewer['topPapers']} top papers{' (guru)' if reviewer['guru'] else ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import config
+import connection
+import http_cache
+import query_catalog
+
+config.load_env()
+
+RESULT_CACHE_ENTRIES = int(os.getenv("RESULT_CACHE_ENTRIES", "256"))
+RESULT_CACHE_MAX_ROWS = int(os.getenv("RESULT_CACHE_MAX_ROWS", "1000000"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+GRAPH_VERSION_TTL = float(os.getenv("GRAPH_VERSION_TTL", "1.0"))
+
+# The epoch changes whenever the node is recreated (e.g. after DETACH DELETE of the whole
+# graph), so a reloaded graph never reuses the version numbers of the previous one
+BUMP_VERSION_QUERY = query_catalog.register("result_cache.bump_version", """
+    MERGE (g:GraphVersion {name: 'graph'})
+    ON CREATE SET g.epoch = randomUUID(), g.version = 0
+    SET g.version = g.version + 1
+    RETURN g.epoch + ':' + toString(g.version) AS version
+""")
+
+READ_VERSION_QUERY = query_catalog.register("result_cache.read_version", """
+    MATCH (g:GraphVersion {name: 'graph'})
+    RETURN g.epoch + ':' + toString(g.version) AS version
+""")
+
+
+class GraphVersion:
+    """
+    Client-side view of the graph version. A version read from the server is trusted for
+    `ttl` seconds; bumps made by this process are visible immediately.
+    """
+    def __init__(self, ttl: float = GRAPH_VERSION_TTL):
+        self.ttl = ttl
+        self._version: Optional[str] = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self, session) -> Optional[str]:
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.ttl:
+                return self._version
+        record = query_catalog.run(session, READ_VERSION_QUERY).single()
+        return self.set(record["version"] if record else None)
+
+    def set(self, version: Optional[str]) -> Optional[str]:
+        with self._lock:
+            self._version = version
+            self._checked_at = time.monotonic()
+        return version
+
+_versions: "weakref.WeakSet[GraphVersion]" = weakref.WeakSet()
+
+def _bump(tx) -> str:
+    return query_catalog.run(tx, BUMP_VERSION_QUERY).single()["version"]
+
+def bump_version(session) -> str:
+    """
+    Increment the graph version. Every write path calls this after it commits.
+    """
+    version = session.execute_write(_bump)
+    for tracker in _versions:
+        tracker.set(version)
+    return version
+
+
+class ResultCache:
+    """
+    Query results keyed by (name, parameters, graph version). An in-process LRU bounded by
+    entry and total row counts sits in front of an optional gzip disk tier (ResponseCache)
+    shared between processes. Results are lists of plain dicts; callers must not mutate them.
+
+    Without a graph version (nothing has been loaded through a versioned write path yet)
+    every lookup bypasses the cache.
+    """
+    def __init__(self, max_entries: int = RESULT_CACHE_ENTRIES, max_rows: int = RESULT_CACHE_MAX_ROWS,
+                 directory: str = RESULT_CACHE_DIR, version_ttl: float = GRAPH_VERSION_TTL,
+                 max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.version = GraphVersion(version_ttl)
+        _versions.add(self.version)
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()
+        self._rows = 0
+        self._seen_version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._disk = http_cache.ResponseCache(directory, ttl=float("inf"), max_bytes=max_bytes) if directory else None
+
+    def _store(self, key: tuple, rows: list):
+        with self._lock:
+            if key in self._entries:
+                self._rows -= len(self._entries.pop(key))
+            self._entries[key] = rows
+            self._rows += len(rows)
+            while self._entries and (len(self._entries) > self.max_entries or self._rows > self.max_rows):
+                _, evicted = self._entries.popitem(last=False)
+                self._rows -= len(evicted)
+
+    def get(self, session, name: str, params: Optional[dict], fetch: Callable[[], list]) -> list:
+        """
+        Cached rows of `name` with `params`, or `fetch()` (which must return a list of
+        JSON-serializable dicts) on a miss.
+        """
+        version = self.version.current(session)
+        if version is None:
+            self.bypassed += 1
+            return fetch()
+        key = (name, json.dumps(params or {}, sort_keys=True, default=str), version)
+        with self._lock:
+            if version != self._seen_version:
+                # Everything cached so far belongs to an older graph
+                self._entries.clear()
+                self._rows = 0
+                self._seen_version = version
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return rows
+        self.misses += 1
+        if self._disk is not None:
+            rows = self._disk.get(name, {**(params or {}), "graphVersion": version}, fetch)
+        else:
+            rows = fetch()
+        self._store(key, rows)
+        return rows
+
+    def stats(self) -> dict:
+        stats = {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed,
+                 "entries": len(self._entries), "rows": self._rows}
+        if self._disk is not None:
+            stats.update(disk_hits=self._disk.hits, disk_misses=self._disk.misses)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+        if self._disk is not None:
+            self._disk.clear()
+
+
+def main():
+    with connection.Connection() as driver:
+        with driver.session(database=connection.DATABASE) as session:
+            if "--bump" in sys.argv:
+                # e.g. after a neo4j-admin import, which bypasses the versioned write paths
+                print(f"Graph version is now {bump_version(session)}")
+            else:
+                record = query_catalog.run(session, READ_VERSION_QUERY).single()
+                print(f"Graph version: {record['version'] if record else 'none'}")
+
+if __name__ == "__main__":
+    main()
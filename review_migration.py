@@ -0,0 +1,176 @@
+import argparse
+import os
+import time
+from typing import List, Optional
+
+import config
+import connection
+import query_catalog
+import result_cache
+
+config.load_env()
+
+REVIEW_BATCH_SIZE = int(os.getenv("REVIEW_BATCH_SIZE", "2000"))
+MIGRATION_NAME = "reviews"
+
+# The checkpoint lives in the graph and is advanced in the same transaction as its batch,
+# so an interrupted run resumes exactly after the last committed batch
+CHECKPOINT_QUERY = query_catalog.register("review_migration.checkpoint", """
+    MATCH (m:Migration {name: $name})
+    RETURN m.after AS after, m.papers AS papers, m.reviews AS reviews, m.done AS done,
+           coalesce(m.dropEdges, false) AS dropEdges
+""", name=str)
+
+RESET_CHECKPOINT_QUERY = query_catalog.register("review_migration.reset_checkpoint", """
+    MERGE (m:Migration {name: $name})
+    SET m.after = '', m.papers = 0, m.reviews = 0, m.done = false, m.dropEdges = $dropEdges,
+        m.startedAt = datetime()
+""", name=str, dropEdges=bool)
+
+PAPER_PAGE_QUERY = query_catalog.register("review_migration.paper_page", """
+    MATCH (p:Paper)
+    WHERE p.paperID > $after
+    RETURN p.paperID AS paperID
+    ORDER BY p.paperID
+    LIMIT $limit
+""", after=str, limit=int)
+
+# reviewApprovement is the "True"/"False" string written by create_reviews_approvements.
+# Reviews are keyed by paper and reviewer, so replaying a batch is a no-op
+MIGRATE_REVIEWS_QUERY = query_catalog.register("review_migration.migrate_reviews", """
+    UNWIND $paperIDs AS paperID
+    MATCH (p:Paper {paperID: paperID})-[r:REVIEWED_BY]->(a:Author)
+    MERGE (review:Review {reviewID: paperID + ':' + a.authorID})
+    SET review.content = r.reviewDesc,
+        review.decision = CASE toLower(trim(toString(r.reviewApprovement)))
+            WHEN 'true' THEN true WHEN 'yes' THEN true
+            WHEN 'false' THEN false WHEN 'no' THEN false
+            ELSE null END
+    MERGE (a)-[:CREATED]->(review)
+    MERGE (review)-[:REVIEWS]->(p)
+    FOREACH (_ IN CASE WHEN $dropEdges THEN [1] ELSE [] END | DELETE r)
+    RETURN count(*) AS reviews
+""", paperIDs=list, dropEdges=bool)
+
+# A paper is accepted when a strict majority of its reviews accept it
+ACCEPTANCE_QUERY = query_catalog.register("review_migration.acceptance", """
+    UNWIND $paperIDs AS paperID
+    MATCH (p:Paper {paperID: paperID})
+    OPTIONAL MATCH (p)<-[:REVIEWS]-(review:Review)
+    WITH p, count(review) AS reviews, count(CASE WHEN review.decision THEN 1 END) AS accepts
+    SET p.reviewCount = reviews,
+        p.acceptCount = accepts,
+        p.is_accepted = accepts * 2 > reviews
+""", paperIDs=list)
+
+# Prefix seek on the reviewID constraint index; also reaches reviews of deleted papers
+DELETE_REVIEWS_QUERY = query_catalog.register("review_migration.delete_reviews", """
+    UNWIND $paperIDs AS paperID
+    MATCH (review:Review)
+    WHERE review.reviewID STARTS WITH paperID + ':'
+    DETACH DELETE review
+""", paperIDs=list)
+
+ADVANCE_CHECKPOINT_QUERY = query_catalog.register("review_migration.advance_checkpoint", """
+    MATCH (m:Migration {name: $name})
+    SET m.after = coalesce($after, m.after), m.papers = m.papers + $papers, m.reviews = m.reviews + $reviews,
+        m.done = $done, m.updatedAt = datetime()
+""", name=str, after=(str, type(None)), papers=int, reviews=int, done=bool)
+
+
+def _paper_page(tx, after: str, limit: int) -> List[str]:
+    return [record["paperID"] for record in query_catalog.run(tx, PAPER_PAGE_QUERY, after=after, limit=limit)]
+
+def _migrate_batch(tx, paper_ids: List[str], drop_edges: bool, name: Optional[str], done: bool) -> int:
+    reviews = query_catalog.run(tx, MIGRATE_REVIEWS_QUERY, paperIDs=paper_ids, dropEdges=drop_edges).single()["reviews"]
+    query_catalog.run(tx, ACCEPTANCE_QUERY, paperIDs=paper_ids).consume()
+    if name is not None:
+        query_catalog.run(tx, ADVANCE_CHECKPOINT_QUERY, name=name, after=paper_ids[-1] if paper_ids else None,
+               papers=len(paper_ids), reviews=reviews, done=done).consume()
+    return reviews
+
+def migrate_papers(session, paper_ids: List[str], drop_edges: bool = False,
+                   batch_size: int = REVIEW_BATCH_SIZE) -> int:
+    """
+    Migrate the reviews of just these papers and refresh their acceptance status,
+    e.g. after a delta load added REVIEWED_BY edges. Returns the reviews migrated.
+    """
+    paper_ids, total = sorted(set(paper_ids)), 0
+    for i in range(0, len(paper_ids), batch_size):
+        total += session.execute_write(_migrate_batch, paper_ids[i:i + batch_size], drop_edges, None, False)
+    return total
+
+def _delete_reviews(tx, paper_ids: List[str]):
+    query_catalog.run(tx, DELETE_REVIEWS_QUERY, paperIDs=paper_ids).consume()
+
+def refresh_reviews(session, changed_ids: List[str], removed_ids: List[str],
+                    batch_size: int = REVIEW_BATCH_SIZE, name: str = MIGRATION_NAME) -> int:
+    """
+    After a delta load: rebuild the Review nodes of changed papers from their new
+    REVIEWED_BY edges and drop those of removed papers. A no-op until the graph has been
+    migrated.
+    """
+    state = checkpoint(session, name)
+    if state is None:
+        return 0
+    stale = sorted(set(changed_ids) | set(removed_ids))
+    for i in range(0, len(stale), batch_size):
+        session.execute_write(_delete_reviews, stale[i:i + batch_size])
+    return migrate_papers(session, changed_ids, state["dropEdges"], batch_size)
+
+def checkpoint(session, name: str = MIGRATION_NAME) -> Optional[dict]:
+    record = query_catalog.run(session, CHECKPOINT_QUERY, name=name).single()
+    return record.data() if record else None
+
+def run_migration(session, batch_size: int = REVIEW_BATCH_SIZE, drop_edges: Optional[bool] = None,
+                  restart: bool = False, name: str = MIGRATION_NAME) -> dict:
+    """
+    Turn every (:Paper)-[:REVIEWED_BY]->(:Author) edge into
+    (:Author)-[:CREATED]->(:Review)-[:REVIEWS]->(:Paper), one committed batch of papers at
+    a time in paperID order, storing Paper.reviewCount / acceptCount / is_accepted as it goes.
+    Resumes from the checkpoint unless `restart` (or the previous run finished). A resumed
+    run keeps the checkpoint's `drop_edges` (None means "whatever it was"), so every paper
+    of one migration is treated alike.
+    """
+    state = checkpoint(session, name)
+    if restart or state is None or state["done"]:
+        query_catalog.run(session, RESET_CHECKPOINT_QUERY, name=name, dropEdges=bool(drop_edges)).consume()
+        state = checkpoint(session, name)
+    else:
+        if drop_edges is not None and drop_edges != state["dropEdges"]:
+            raise ValueError(f"Migration {name!r} was started with drop_edges={state['dropEdges']}; "
+                             f"resume it with the same setting or pass restart=True")
+        if state["after"]:
+            print(f"Resuming after paper {state['after']} ({state['papers']} papers, {state['reviews']} reviews done)")
+    drop_edges = state["dropEdges"]
+
+    after, start = state["after"], time.perf_counter()
+    papers, reviews = state["papers"], state["reviews"]
+    while True:
+        paper_ids = session.execute_read(_paper_page, after, batch_size)
+        done = len(paper_ids) < batch_size
+        reviews += session.execute_write(_migrate_batch, paper_ids, drop_edges, name, done)
+        papers += len(paper_ids)
+        if done:
+            break
+        after = paper_ids[-1]
+        print(f"{papers} papers, {reviews} reviews migrated ({time.perf_counter() - start:.1f}s)")
+    result_cache.bump_version(session)
+    return {"papers": papers, "reviews": reviews, "seconds": time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate REVIEWED_BY edges to Review nodes.")
+    parser.add_argument("--batch-size", type=int, default=REVIEW_BATCH_SIZE)
+    parser.add_argument("--drop-edges", action="store_true", default=None,
+                        help="delete each REVIEWED_BY edge once migrated (a resumed run keeps its original choice)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from the first paper")
+    args = parser.parse_args()
+
+    with connection.Connection() as driver, driver.session(database=connection.DATABASE) as session:
+        print("Connection successful!")
+        counts = run_migration(session, args.batch_size, args.drop_edges, args.restart)
+        print(f"Migrated {counts['reviews']} reviews of {counts['papers']} papers in {counts['seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
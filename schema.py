@@ -0,0 +1,170 @@
+import os
+import re
+import sys
+from typing import Dict, List, Tuple
+
+import config
+import connection
+
+config.load_env()
+
+INDEX_TIMEOUT = int(os.getenv("INDEX_TIMEOUT", "300"))
+QUERIES_PATH = os.getenv("QUERIES_PATH", "queries.txt")
+
+# Every key the loaders MATCH/MERGE on gets a uniqueness constraint (which is backed by an index)
+CONSTRAINTS: List[Tuple[str, str]] = [
+    ("Paper", "paperID"),
+    ("Author", "authorID"),
+    ("Field", "name"),
+    ("Journal", "name"),
+    ("PublicationVenue", "name"),
+    ("Volume", "volumeId"),
+    ("Edition", "editionId"),
+    ("Affiliation", "affiliation"),
+    ("GraphVersion", "name"),
+    ("ResearchCommunity", "name"),
+    ("Review", "reviewID"),
+    ("Migration", "name"),
+    ("Keyword", "name"),
+]
+
+# Non-unique properties filtered or grouped on by the analytics
+INDEXES: List[Tuple[str, str]] = [
+    ("Paper", "year"),
+    ("Paper", "citationCount"),
+    ("Author", "name"),
+    ("Author", "hIndex"),
+    ("Paper", "is_accepted"),
+    ("Paper", "reviewCount"),
+]
+
+SCAN_OPERATORS = ("NodeByLabelScan", "AllNodesScan")
+KEYED_PATTERN = re.compile(r"\((\w*):(\w+)\s*\{\s*(\w+)\s*:")
+
+
+def schema_statements() -> List[str]:
+    statements = []
+    for label, key in CONSTRAINTS:
+        statements.append(
+            f"CREATE CONSTRAINT {label.lower()}_{key.lower()}_unique IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.{key} IS UNIQUE"
+        )
+    for label, key in INDEXES:
+        statements.append(
+            f"CREATE INDEX {label.lower()}_{key.lower()}_index IF NOT EXISTS "
+            f"FOR (n:{label}) ON (n.{key})"
+        )
+    return statements
+
+def create_schema(session):
+    """
+    Create the constraints and indexes. Schema changes cannot share a transaction with
+    data writes, so each statement runs as its own auto-commit query.
+    """
+    for statement in schema_statements():
+        # IF NOT EXISTS makes every statement safe to rerun after a transient failure
+        connection.retry(_run_statement, session, statement)
+
+def _run_statement(session, statement: str):
+    session.run(statement).consume()
+
+def await_indexes(session, timeout: int = INDEX_TIMEOUT):
+    session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+    offline = [
+        record["name"] for record in session.run("SHOW INDEXES YIELD name, state")
+        if record["state"] != "ONLINE"
+    ]
+    if offline:
+        raise RuntimeError(f"Indexes not online after {timeout}s: {offline}")
+
+def bootstrap_schema(driver, database: str = connection.DATABASE):
+    with driver.session(database=database) as session:
+        create_schema(session)
+        await_indexes(session)
+
+
+# --- Plan guard ---
+
+def _script_queries(path: str) -> List[Tuple[str, str, dict]]:
+    if not os.path.exists(path):
+        return []
+    import script_runner
+    return [
+        (f"{os.path.basename(path)}#{statement.index}", statement.text, {})
+        for statement in script_runner.parse_script(path)
+        if not script_runner.SCHEMA_PATTERN.match(statement.text)
+    ]
+
+def collect_queries() -> List[Tuple[str, str, dict]]:
+    """
+    Every catalog query plus the queries.txt script, as (name, cypher, parameters).
+    """
+    import query_catalog
+
+    queries = [(query.name, query.cypher, query.example()) for query in query_catalog.load_all().values()]
+    queries.extend(_script_queries(QUERIES_PATH))
+    return queries
+
+def keyed_lookups(query: str) -> Dict[str, str]:
+    """
+    Map each variable bound with an inline key, e.g. `(p:Paper {paperID: ...})`, to its label.
+    Anonymous patterns such as `(:Journal {name: ...})` are stored under the empty variable.
+    """
+    return {variable: label for variable, label, _ in KEYED_PATTERN.findall(query)}
+
+def _operators(plan: dict):
+    yield plan
+    for child in plan.get("children", []):
+        yield from _operators(child)
+
+def find_label_scans(plan: dict, keyed: Dict[str, str]) -> List[str]:
+    """
+    Return the scan operators in `plan` that serve one of the `keyed` lookups.
+    """
+    scans = []
+    for operator in _operators(plan):
+        operator_type = operator.get("operatorType", "").split("@")[0]
+        if operator_type not in SCAN_OPERATORS:
+            continue
+        arguments = operator.get("args") or operator.get("arguments") or {}
+        details = str(arguments.get("Details", ""))
+        variable, _, label = details.partition(":")
+        variable, label = variable.strip(), label.strip()
+        anonymous = variable.startswith(("anon_", "UNNAMED")) and keyed.get("") == label
+        if (operator_type == "AllNodesScan" and keyed) or keyed.get(variable) == label or anonymous:
+            scans.append(f"{operator_type}({details})")
+    return scans
+
+def check_plans(session) -> List[Tuple[str, List[str]]]:
+    """
+    EXPLAIN every collected query (which also checks that it still compiles) and report
+    the ones whose plan scans a label instead of seeking through an index.
+    """
+    violations = []
+    for name, query, params in collect_queries():
+        keyed = keyed_lookups(query)
+        plan = session.run("EXPLAIN " + query, params).consume().plan
+        scans = find_label_scans(plan or {}, keyed)
+        if scans:
+            violations.append((name, scans))
+    return violations
+
+
+def main():
+    with connection.Connection() as driver:
+        print("Connection successful!")
+        with driver.session(database=connection.DATABASE) as session:
+            if "--check" in sys.argv:
+                violations = check_plans(session)
+                for name, scans in violations:
+                    print(f"{name}: {', '.join(scans)}")
+                if violations:
+                    sys.exit(f"{len(violations)} queries still scan labels on keyed lookups.")
+                print("All keyed lookups use indexes.")
+                return
+            create_schema(session)
+            await_indexes(session)
+            print("Constraints and indexes are online.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set
+
+import config
+import connection
+import result_cache
+
+config.load_env()
+
+QUERIES_PATH = os.getenv("QUERIES_PATH", "queries.txt")
+SCRIPT_WORKERS = int(os.getenv("SCRIPT_WORKERS", "4"))
+SCRIPT_STATE_PATH = os.getenv("SCRIPT_STATE_PATH", "./.script_state.json")
+
+CLAUSE_PATTERN = re.compile(
+    r"\b(ON\s+CREATE\s+SET|ON\s+MATCH\s+SET|OPTIONAL\s+MATCH|MATCH|MERGE|CREATE|DETACH\s+DELETE|DELETE|"
+    r"SET|REMOVE|WITH|UNWIND|RETURN|LOAD\s+CSV|WHERE|CALL|FOREACH|ORDER\s+BY|LIMIT)\b",
+    re.IGNORECASE,
+)
+NODE_PATTERN = re.compile(r"\(\s*(\w*)\s*((?::\s*\w+\s*)*)")
+RELATIONSHIP_PATTERN = re.compile(r"\[\s*(\w*)\s*(:\s*[\w|:\s]+?)?\s*[\]{*]")
+SCHEMA_PATTERN = re.compile(r"^\s*(CREATE|DROP)\s+(CONSTRAINT|INDEX|RANGE\s+INDEX|TEXT\s+INDEX)\b", re.IGNORECASE)
+ASSIGNED_PATTERN = re.compile(r"(?:^|,)\s*(\w+)\s*(?:\.|\+?=|:)")
+ADDED_LABEL_PATTERN = re.compile(r"(?:^|,)\s*\w+\s*((?::\s*\w+\s*)+)")
+WRITE_CLAUSES = ("CREATE", "MERGE")
+SET_CLAUSES = ("SET", "REMOVE", "ON CREATE SET", "ON MATCH SET")
+DELETE_CLAUSES = ("DELETE", "DETACH DELETE")
+
+
+class Statement(NamedTuple):
+    index: int
+    text: str
+    reads: FrozenSet[str]
+    writes: FrozenSet[str]
+    barrier: bool  # touches the whole graph, e.g. MATCH (n) DETACH DELETE n
+
+    @property
+    def summary(self) -> str:
+        return " ".join(self.text.split())[:60]
+
+
+def split_statements(text: str) -> List[str]:
+    """
+    Split a Cypher script on `;`, ignoring semicolons inside string literals, backtick
+    identifiers and comments. The last statement does not need a trailing `;`.
+    """
+    statements, current = [], []
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i]
+        if char in "'\"`":
+            end = i + 1
+            while end < n and text[end] != char:
+                end += 2 if text[end] == "\\" and char != "`" else 1
+            current.append(text[i:end + 1])
+            i = end + 1
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end == -1 else end
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+        elif char == ";":
+            statements.append("".join(current).strip())
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+    statements.append("".join(current).strip())
+    return [statement for statement in statements if statement]
+
+def _strip_literals(text: str) -> str:
+    text = re.sub(r"'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"", "''", text)
+    return text.replace("`", "")
+
+def _labels(group: Optional[str]) -> List[str]:
+    return re.findall(r"\w+", group or "")
+
+def analyze(index: int, text: str) -> Statement:
+    """
+    Infer which node labels and relationship types a statement reads and writes.
+    Anything it cannot attribute to a label (deleting or updating an unlabelled
+    variable) makes it a barrier that runs alone.
+    """
+    if SCHEMA_PATTERN.match(text):
+        labels = {f"node:{label}" for label in re.findall(r"FOR\s*\(\s*\w*\s*:\s*(\w+)", text, re.IGNORECASE)}
+        labels |= {f"rel:{label}" for label in re.findall(r"FOR\s*\(\)\s*-\s*\[\s*\w*\s*:\s*(\w+)", text, re.IGNORECASE)}
+        return Statement(index, text, frozenset(), frozenset(labels), not labels)
+
+    body = _strip_literals(text)
+    bound: Dict[str, Set[str]] = {}
+    for variable, labels in NODE_PATTERN.findall(body):
+        bound.setdefault(variable, set()).update(f"node:{label}" for label in _labels(labels))
+    for variable, types in RELATIONSHIP_PATTERN.findall(body):
+        bound.setdefault(variable, set()).update(f"rel:{name}" for name in _labels(types))
+
+    reads, writes, barrier = set(), set(), False
+    matches = list(CLAUSE_PATTERN.finditer(body))
+    for position, match in enumerate(matches):
+        clause = " ".join(match.group(1).upper().split())
+        end = matches[position + 1].start() if position + 1 < len(matches) else len(body)
+        segment = body[match.end():end]
+        patterns = {f"node:{label}" for _, labels in NODE_PATTERN.findall(segment) for label in _labels(labels)}
+        patterns |= {f"rel:{name}" for _, types in RELATIONSHIP_PATTERN.findall(segment) for name in _labels(types)}
+        if clause in WRITE_CLAUSES:
+            writes |= patterns
+        elif clause in SET_CLAUSES or clause in DELETE_CLAUSES:
+            targets = re.findall(r"\w+", segment) if clause in DELETE_CLAUSES else ASSIGNED_PATTERN.findall(segment)
+            for variable in targets:
+                if bound.get(variable):
+                    writes |= bound[variable]
+                else:
+                    barrier = True
+            for labels in ADDED_LABEL_PATTERN.findall(segment) if clause in SET_CLAUSES else ():
+                writes |= {f"node:{label}" for label in _labels(labels)}
+        else:
+            reads |= patterns
+    return Statement(index, text, frozenset(reads - writes), frozenset(writes), barrier)
+
+def parse_script(path: str) -> List[Statement]:
+    with open(path, "r", encoding="utf-8") as file:
+        return [analyze(i, text) for i, text in enumerate(split_statements(file.read()))]
+
+def conflicts(first: Statement, second: Statement) -> bool:
+    if first.barrier or second.barrier:
+        return True
+    return bool(first.writes & (second.reads | second.writes) or second.writes & first.reads)
+
+def build_dag(statements: List[Statement]) -> Dict[int, Set[int]]:
+    """
+    Each statement depends on every earlier statement it conflicts with, so statements
+    that touch disjoint labels/types run concurrently and the rest keep script order.
+    """
+    return {
+        statement.index: {earlier.index for earlier in statements[:position] if conflicts(earlier, statement)}
+        for position, statement in enumerate(statements)
+    }
+
+
+def _run_statement(tx, text: str):
+    return tx.run(text).consume()
+
+def execute_statement(driver, statement: Statement, database: str = connection.DATABASE) -> dict:
+    start = time.perf_counter()
+    with driver.session(database=database) as session:
+        if re.search(r"\bIN\s+TRANSACTIONS\b", statement.text, re.IGNORECASE):
+            # CALL { ... } IN TRANSACTIONS manages its own commits and needs an auto-commit query
+            summary = session.run(statement.text).consume()
+        else:
+            summary = session.execute_write(_run_statement, statement.text)
+    counters = {key: value for key, value in vars(summary.counters).items() if not key.startswith("_") and value}
+    return {"seconds": time.perf_counter() - start, "counters": counters}
+
+def run_statements(driver, statements: List[Statement], workers: int = SCRIPT_WORKERS,
+                   database: str = connection.DATABASE, done: Iterable[int] = ()) -> dict:
+    """
+    Execute the DAG on a thread pool, skipping the indices in `done`. After a failure no
+    new statements start; the ones already running are allowed to finish.
+    """
+    dependencies = build_dag(statements)
+    completed = set(done)
+    pending = [statement for statement in statements if statement.index not in completed]
+    results: Dict[int, dict] = {}
+    failed: Optional[int] = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while True:
+            if failed is None:
+                for statement in [s for s in pending if dependencies[s.index] <= completed]:
+                    pending.remove(statement)
+                    running[pool.submit(execute_statement, driver, statement, database)] = statement
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                statement = running.pop(future)
+                try:
+                    results[statement.index] = future.result()
+                    completed.add(statement.index)
+                except Exception as e:
+                    results[statement.index] = {"error": str(e)}
+                    failed = statement.index if failed is None else min(failed, statement.index)
+    return {"results": results, "completed": completed, "failed": failed}
+
+
+def _script_hash(statements: List[Statement]) -> str:
+    return hashlib.sha256("\n;\n".join(statement.text for statement in statements).encode("utf-8")).hexdigest()
+
+def load_state(path: str, statements: List[Statement]) -> Set[int]:
+    """
+    Statements completed by a previous run of this exact script; empty if the script changed.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as file:
+        state = json.load(file)
+    if state.get("script") != _script_hash(statements):
+        print(f"{path} belongs to a different version of the script, starting over.")
+        return set()
+    return set(state["completed"])
+
+def save_state(path: str, statements: List[Statement], completed: Set[int], failed: Optional[int]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"script": _script_hash(statements), "completed": sorted(completed), "failed": failed}, file)
+    os.replace(tmp_path, path)
+
+def print_report(statements: List[Statement], results: Dict[int, dict], total: float):
+    print(f"{'#':>4}  {'status':<8}{'seconds':>9}  statement")
+    for statement in statements:
+        result = results.get(statement.index)
+        if result is None:
+            status, seconds = "skipped", ""
+        elif "error" in result:
+            status, seconds = "FAILED", ""
+        else:
+            status, seconds = "ok", f"{result['seconds']:.2f}"
+        print(f"{statement.index:>4}  {status:<8}{seconds:>9}  {statement.summary}")
+        if result and "error" in result:
+            print(f"      {result['error']}")
+        elif result and result["counters"]:
+            print(f"      {result['counters']}")
+    print(f"Total wall time: {total:.2f}s")
+
+def run_script(driver, path: str = QUERIES_PATH, workers: int = SCRIPT_WORKERS, database: str = connection.DATABASE,
+               state_path: str = SCRIPT_STATE_PATH, resume: bool = False) -> dict:
+    """
+    Run a Cypher script as a dependency DAG. Progress is saved to `state_path` so that
+    `resume=True` picks up at the first failed (or never started) statement. The graph
+    version is bumped after the whole script succeeds.
+    """
+    statements = parse_script(path)
+    done = load_state(state_path, statements) if resume else set()
+    start = time.perf_counter()
+    outcome = run_statements(driver, statements, workers, database, done)
+    print_report(statements, outcome["results"], time.perf_counter() - start)
+    if outcome["failed"] is None:
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        # Only once every statement has committed: a bump inside the DAG could run
+        # alongside the loads and let readers cache partial results under the new version
+        with driver.session(database=database) as session:
+            result_cache.bump_version(session)
+    else:
+        save_state(state_path, statements, outcome["completed"], outcome["failed"])
+        print(f"Statement {outcome['failed']} failed; rerun with --resume to continue from there.")
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Cypher script with independent statements in parallel.")
+    parser.add_argument("path", nargs="?", default=QUERIES_PATH)
+    parser.add_argument("--workers", type=int, default=SCRIPT_WORKERS)
+    parser.add_argument("--resume", action="store_true", help="skip statements completed by the last failed run")
+    parser.add_argument("--plan", action="store_true", help="print the dependency DAG and exit")
+    args = parser.parse_args()
+
+    if args.plan:
+        statements = parse_script(args.path)
+        for index, dependencies in build_dag(statements).items():
+            print(f"{index:>4} <- {sorted(dependencies)}  {statements[index].summary}")
+        return
+
+    with connection.Connection(max_connection_pool_size=max(args.workers, 1) * 2) as driver:
+        driver.verify_connectivity()
+        print("Connection established.")
+        run_script(driver, args.path, args.workers, resume=args.resume)
+
+if __name__ == "__main__":
+    main()
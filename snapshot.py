@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config
+import connection
+import query_catalog
+
+config.load_env()
+
+# Written at the end of every A2_create_graph load; empty disables it
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./snapshot")
+FORMAT_VERSION = 1
+MISSING = -1  # fixed-width stand-in for null numeric properties
+
+PAPERS_QUERY = query_catalog.register("snapshot.papers", """
+    MATCH (p:Paper)
+    RETURN p.paperID AS id, coalesce(p.year, -1) AS year, coalesce(p.citationCount, -1) AS citationCount
+""")
+AUTHORS_QUERY = query_catalog.register("snapshot.authors", """
+    MATCH (a:Author)
+    RETURN a.authorID AS id
+""")
+EDGE_QUERIES = {
+    "cites": query_catalog.register("snapshot.cites_edges", """
+        MATCH (p:Paper)-[:CITES]->(c:Paper)
+        RETURN p.paperID AS source, c.paperID AS target
+    """),
+    "written_by": query_catalog.register("snapshot.written_by_edges", """
+        MATCH (p:Paper)-[:WRITTEN_BY]->(a:Author)
+        RETURN p.paperID AS source, a.authorID AS target
+    """),
+}
+# relationship -> (source node set, target node set)
+RELATIONSHIPS = {"cites": ("papers", "papers"), "written_by": ("papers", "authors")}
+
+
+def _column(tx, query: query_catalog.Query, *keys):
+    columns = tuple([] for _ in keys)
+    for record in query_catalog.run(tx, query):
+        for column, key in zip(columns, keys):
+            column.append(record[key])
+    return columns
+
+def encode_ids(ids: List[str]) -> np.ndarray:
+    """
+    Sorted fixed-width UTF-8 byte strings: the node-id dictionary. Node i is ids[i] and
+    lookups are a binary search, so the dictionary itself can stay memory-mapped.
+    """
+    return np.unique(np.asarray([node_id.encode("utf-8") for node_id in ids], dtype=np.bytes_))
+
+def lookup(ids: np.ndarray, values) -> np.ndarray:
+    """
+    Node indices of `values` (str or bytes) in an id dictionary, -1 where missing.
+    """
+    values = np.asarray([v.encode("utf-8") if isinstance(v, str) else v for v in values], dtype=np.bytes_)
+    if len(ids) == 0:
+        return np.full(len(values), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(ids, values), len(ids) - 1)
+    return np.where(ids[positions] == values, positions, -1)
+
+def csr(sources: np.ndarray, targets: np.ndarray, n: int):
+    """
+    Offsets/targets arrays with node i's neighbours at targets[offsets[i]:offsets[i + 1]],
+    deduplicated and sorted by target within each node, as graph_analytics.build_projection.
+    """
+    width = int(targets.max()) + 1 if len(targets) else 1
+    pairs = np.unique(sources.astype(np.int64) * width + targets)
+    sources, targets = pairs // width, pairs % width
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=n))]).astype(np.int64)
+    return offsets, targets.astype(np.int32 if width < 2 ** 31 else np.int64)
+
+def save_arrays(path: str, arrays: Dict[str, np.ndarray], manifest: dict):
+    """
+    Write `arrays` as <name>.npy plus manifest.json into a sibling directory and swap it in
+    for `path`, so readers never see a partial one.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), array)
+    manifest = {"format": FORMAT_VERSION, "created_at": time.time(), **manifest, "arrays": sorted(arrays)}
+    with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+    # Open memory maps keep pointing at the unlinked old files until they are closed
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def write_snapshot(session, path: str = SNAPSHOT_DIR, version: Optional[str] = None) -> Dict[str, int]:
+    """
+    Stream the graph once and write it to `path` as .npy arrays plus a manifest.
+    """
+    paper_ids, years, citation_counts = session.execute_read(_column, PAPERS_QUERY, "id", "year", "citationCount")
+    (author_ids,) = session.execute_read(_column, AUTHORS_QUERY, "id")
+    nodes = {"papers": encode_ids(paper_ids), "authors": encode_ids(author_ids)}
+
+    arrays = {"papers.ids": nodes["papers"], "authors.ids": nodes["authors"]}
+    order = lookup(nodes["papers"], paper_ids)
+    for name, values in (("papers.year", years), ("papers.citationCount", citation_counts)):
+        column = np.full(len(nodes["papers"]), MISSING, dtype=np.int32)
+        column[order] = values
+        arrays[name] = column
+
+    counts = {"papers": len(nodes["papers"]), "authors": len(nodes["authors"])}
+    for rel, (source_set, target_set) in RELATIONSHIPS.items():
+        sources, targets = session.execute_read(_column, EDGE_QUERIES[rel], "source", "target")
+        source_idx, target_idx = lookup(nodes[source_set], sources), lookup(nodes[target_set], targets)
+        valid = (source_idx >= 0) & (target_idx >= 0)
+        if source_set == target_set:
+            valid &= source_idx != target_idx
+        offsets, neighbours = csr(source_idx[valid], target_idx[valid], len(nodes[source_set]))
+        arrays[f"{rel}.offsets"], arrays[f"{rel}.targets"] = offsets, neighbours
+        # Reverse direction too, e.g. cited-by and author -> papers
+        offsets, neighbours = csr(target_idx[valid], source_idx[valid], len(nodes[target_set]))
+        arrays[f"{rel}.reverse.offsets"], arrays[f"{rel}.reverse.targets"] = offsets, neighbours
+        counts[rel] = len(arrays[f"{rel}.targets"])
+
+    save_arrays(path, arrays, {"graphVersion": version, "counts": counts, "relationships": RELATIONSHIPS})
+    return counts
+
+def write_current_snapshot(session, path: str = SNAPSHOT_DIR) -> Dict[str, int]:
+    """
+    write_snapshot tagged with the current graph version (see result_cache).
+    """
+    import result_cache
+    record = query_catalog.run(session, result_cache.READ_VERSION_QUERY).single()
+    return write_snapshot(session, path, record["version"] if record else None)
+
+
+class Snapshot:
+    """
+    Read-only view of a snapshot directory. Every array is np.load(mmap_mode="r"), so
+    opening is O(1) and processes mapping the same files share their pages.
+    """
+    def __init__(self, path: str = SNAPSHOT_DIR):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as file:
+            self.manifest = json.load(file)
+        if self.manifest["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has snapshot format {self.manifest['format']}, expected {FORMAT_VERSION}")
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def array(self, name: str) -> np.ndarray:
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.manifest["graphVersion"]
+
+    def index(self, node_set: str, node_id: str) -> int:
+        return int(lookup(self.array(f"{node_set}.ids"), [node_id])[0])
+
+    def node_id(self, node_set: str, index: int) -> str:
+        return self.array(f"{node_set}.ids")[index].decode("utf-8")
+
+    def neighbours(self, rel: str, index: int, reverse: bool = False) -> np.ndarray:
+        prefix = f"{rel}.reverse" if reverse else rel
+        offsets = self.array(f"{prefix}.offsets")
+        return self.array(f"{prefix}.targets")[offsets[index]:offsets[index + 1]]
+
+    def projection(self, graph: str = "cites"):
+        """
+        graph_analytics.Projection over the snapshot. For "cites" the CSR arrays are the
+        memory maps themselves (only the id dictionary is decoded); "authorship" has to
+        build its combined undirected CSR in memory.
+        """
+        import graph_analytics
+        papers = np.char.decode(self.array("papers.ids"), "utf-8")
+        if graph == "cites":
+            return graph_analytics.Projection(papers, np.full(len(papers), "Paper"), self.array("cites.offsets"),
+                                              self.array("cites.targets"), False)
+        authors = np.char.decode(self.array("authors.ids"), "utf-8")
+        offsets = self.array("written_by.offsets")
+        sources = np.repeat(np.arange(len(papers)), np.diff(offsets))
+        return graph_analytics.build_projection(
+            np.concatenate([papers, authors]),
+            np.concatenate([np.full(len(papers), "Paper"), np.full(len(authors), "Author")]),
+            sources, self.array("written_by.targets").astype(np.int64) + len(papers), undirected=True,
+        )
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_DIR
+
+    with connection.Connection() as driver, driver.session(database=connection.DATABASE) as session:
+        start = time.perf_counter()
+        counts = write_current_snapshot(session, path)
+        print(f"Wrote snapshot {path} in {time.perf_counter() - start:.2f}s: {counts}")
+
+if __name__ == "__main__":
+    main()
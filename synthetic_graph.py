@@ -0,0 +1,169 @@
+import csv
+import os
+import sys
+from typing import List
+
+import numpy as np
+
+PAPERS_HEADER = [
+    "paperID", "doi", "journal_name", "volume", "volume_id", "pages", "abstract",
+    "publicationVenue_name", "edition_id", "city_venue", "title",
+    "year", "authorIDs", "authorNames", "fields", "citedPaperID", "reviewerIDs",
+    "reviewsApprovements", "reviewsDesc"
+]
+
+FIELDS = [
+    "Computer Science", "Mathematics", "Medicine", "Biology", "Physics", "Engineering",
+    "Psychology", "Economics", "Chemistry", "Materials Science", "Environmental Science",
+    "Business", "Sociology", "Geography", "Political Science", "Philosophy", "Art",
+]
+CITIES = ["Paris", "London", "New York", "Tokyo", "Beijing", "Berlin", "Rome", "Madrid", "Lisbon", "Athens"]
+AFFILIATIONS = [f"Institute {i}" for i in range(200)]
+
+CHUNK_SIZE = 100_000
+MEAN_CITATIONS = 10
+MAX_AUTHORS = 40
+PROBA_APPROVE = 0.8
+REVIEWERS = 3
+REVIEW_CANDIDATES = 4 * REVIEWERS  # draws per paper before co-authors and repeats are dropped
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    """
+    Normalized rank-based power-law weights: item of rank r gets weight r^-exponent.
+    """
+    weights = np.arange(1, n + 1, dtype=np.float64) ** -exponent
+    return weights / weights.sum()
+
+def sample_cdf(rng: np.random.Generator, cdf: np.ndarray, size: int) -> np.ndarray:
+    """
+    Draw `size` indices from a cumulative distribution by inverse transform (O(log n) each).
+    """
+    return np.minimum(np.searchsorted(cdf, rng.random(size)), cdf.size - 1)
+
+
+class GraphSpec:
+    """
+    Sizes and skewed popularity distributions of a synthetic dataset with `n_papers` papers.
+    Citation in-degree, authors per paper and author productivity follow power laws;
+    venue and journal assignment is Zipf-skewed.
+    """
+    def __init__(self, n_papers: int, seed: int = 42):
+        self.n_papers = n_papers
+        self.seed = seed
+        self.n_authors = max(10, int(n_papers * 0.8))
+        self.n_journals = max(5, int(n_papers ** 0.5 / 4))
+        self.n_venues = max(5, int(n_papers ** 0.5 / 2))
+        rng = np.random.default_rng(seed)
+        # A random permutation decouples popularity from paper order (and thus from year)
+        self.citation_cdf = np.cumsum(zipf_weights(n_papers, 0.8)[rng.permutation(n_papers)])
+        self.author_cdf = np.cumsum(zipf_weights(self.n_authors, 0.9)[rng.permutation(self.n_authors)])
+        self.journal_cdf = np.cumsum(zipf_weights(self.n_journals, 1.2))
+        self.venue_cdf = np.cumsum(zipf_weights(self.n_venues, 1.2))
+
+
+def _packed(ids: np.ndarray, counts: np.ndarray, prefix: str) -> List[str]:
+    names = np.char.add(prefix, ids.astype(str)).tolist()
+    bounds = np.concatenate([[0], np.cumsum(counts)]).tolist()
+    return [";".join(dict.fromkeys(names[a:b])) for a, b in zip(bounds[:-1], bounds[1:])]
+
+def _pick_reviewers(candidates: List[int], authors: set, k: int) -> List[int]:
+    """
+    The first `k` distinct candidates who did not write the paper; fewer if the draw
+    runs out, which happens with small author pools.
+    """
+    picked = []
+    for candidate in candidates:
+        if candidate not in authors and candidate not in picked:
+            picked.append(candidate)
+            if len(picked) == k:
+                break
+    return picked
+
+def generate_chunk(spec: GraphSpec, start: int, end: int) -> List[list]:
+    rng = np.random.default_rng([spec.seed, start])
+    n = end - start
+    paper_index = np.arange(start, end)
+
+    # Discrete Pareto: mean ~3 authors with a heavy tail of large collaborations
+    author_counts = np.minimum(1 + (rng.pareto(2.0, n) * 2).astype(np.int64), MAX_AUTHORS)
+    author_ids = sample_cdf(rng, spec.author_cdf, int(author_counts.sum()))
+    citation_counts = np.minimum(rng.geometric(1 / (MEAN_CITATIONS + 1), n) - 1, spec.n_papers - 1)
+    cited = sample_cdf(rng, spec.citation_cdf, int(citation_counts.sum()))
+    citing = np.repeat(paper_index, citation_counts)
+    cited = np.where(cited == citing, (cited + 1) % spec.n_papers, cited)  # no self-citations
+    candidates = sample_cdf(rng, spec.author_cdf, REVIEW_CANDIDATES * n).reshape(n, REVIEW_CANDIDATES).tolist()
+    approvements = np.where(rng.random((n, REVIEWERS)) < PROBA_APPROVE, "True", "False").tolist()
+
+    is_journal = rng.random(n) < 1 / 3
+    journals = sample_cdf(rng, spec.journal_cdf, n)
+    volumes = rng.integers(1, 101, n)
+    venues = sample_cdf(rng, spec.venue_cdf, n)
+    workshop = rng.random(n) < 0.5
+    cities = rng.integers(0, len(CITIES), n)
+    years = rng.integers(1990, 2025, n)
+    field_counts = rng.integers(1, 4, n)
+    fields = sample_cdf(rng, np.cumsum(zipf_weights(len(FIELDS), 1.0)), int(field_counts.sum()))
+
+    authors_packed = _packed(author_ids, author_counts, "a")
+    names_packed = _packed(author_ids, author_counts, "Author ")
+    cited_packed = _packed(cited, citation_counts, "p")
+    author_list = author_ids.tolist()
+    author_bounds = np.concatenate([[0], np.cumsum(author_counts)]).tolist()
+    field_bounds = np.concatenate([[0], np.cumsum(field_counts)]).tolist()
+
+    rows = []
+    for i in range(n):
+        paper_id = f"p{start + i}"
+        year = int(years[i])
+        if is_journal[i]:
+            journal = f"Journal {journals[i]}"
+            issn = f"{journals[i]:04d}-{journals[i] % 10000:04d}"
+            venue_cols = [journal, f"{volumes[i]}.0", f"{issn}_{volumes[i]}", "", "", ""]
+        else:
+            kind = "Workshop" if workshop[i] else "Conference"
+            venue = f"{kind} {venues[i]}"
+            city = CITIES[cities[i]]
+            venue_cols = ["", "", "", venue, f"{venue.replace(' ', '_')}_{city}_{year}", city]
+        reviewers = _pick_reviewers(candidates[i], set(author_list[author_bounds[i]:author_bounds[i + 1]]), REVIEWERS)
+        field_names = ";".join(dict.fromkeys(FIELDS[f] for f in fields[field_bounds[i]:field_bounds[i + 1]]))
+        rows.append([
+            paper_id, f"10.0000/{paper_id}", *venue_cols[:3], f"{i % 300}-{i % 300 + 12}",
+            f"Synthetic abstract of paper {paper_id}.", *venue_cols[3:], f"Paper {paper_id}", year,
+            authors_packed[i], names_packed[i], field_names, cited_packed[i], ";".join(f"a{r}" for r in reviewers),
+            ";".join(approvements[i][:len(reviewers)]), ";".join(["desc"] * len(reviewers)),
+        ])
+    return rows
+
+def generate_dataset(n_papers: int, out_dir: str, seed: int = 42, chunk_size: int = CHUNK_SIZE):
+    """
+    Write papers_venues.csv and authors_affiliations.csv with the same columns as the real
+    pipeline output, chunk by chunk so memory stays bounded by `chunk_size`.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    spec = GraphSpec(n_papers, seed)
+    with open(os.path.join(out_dir, "papers_venues.csv"), "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, delimiter="|")
+        writer.writerow(PAPERS_HEADER)
+        for start in range(0, n_papers, chunk_size):
+            writer.writerows(generate_chunk(spec, start, min(n_papers, start + chunk_size)))
+
+    rng = np.random.default_rng([seed, n_papers])
+    affiliations = sample_cdf(rng, np.cumsum(zipf_weights(len(AFFILIATIONS), 1.0)), spec.n_authors)
+    with open(os.path.join(out_dir, "authors_affiliations.csv"), "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file, delimiter="|")
+        writer.writerow(["authorID", "affiliation"])
+        for start in range(0, spec.n_authors, chunk_size):
+            stop = min(spec.n_authors, start + chunk_size)
+            writer.writerows([f"a{i}", AFFILIATIONS[affiliations[i]]] for i in range(start, stop))
+    return spec
+
+
+def main():
+    n_papers = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else f"./bench/data/{n_papers}"
+    generate_dataset(n_papers, out_dir)
+    print(f"Wrote {n_papers} papers to {out_dir}")
+
+if __name__ == "__main__":
+    main()
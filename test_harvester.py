@@ -0,0 +1,132 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+import harvester
+
+PAGE_SIZE = 5
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        query, token = params["query"][0], params.get("token", [None])[0]
+        status = self.server.record(query, token)
+        if status is not None:
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        page = int(token or 0)
+        body = json.dumps({
+            "data": [{"paperId": f"{query}-{page}-{i}"} for i in range(PAGE_SIZE)],
+            "token": str(page + 1) if page + 1 < self.server.pages else None,
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubApi(ThreadingHTTPServer):
+    """
+    Local /paper/search/bulk: `pages` pages of PAGE_SIZE papers per query, chained by
+    continuation tokens. `failures` maps a 1-based request number to the status it gets.
+    """
+    def __init__(self, pages: int = 3, failures: dict = None):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.pages = pages
+        self.failures = failures or {}
+        self.requests = []  # (monotonic time, query, token)
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def record(self, query: str, token):
+        with self._lock:
+            self.requests.append((time.monotonic(), query, token))
+            return self.failures.get(len(self.requests))
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class HarvesterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.directory.name, "harvest.jsonl")
+        # No real sleeping between retries; Retry-After: 0 is still honoured
+        patcher = mock.patch.object(harvester, "BACKOFF_BASE", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def start(self, **kwargs) -> StubApi:
+        api = StubApi(**kwargs)
+        self.addCleanup(api.stop)
+        return api
+
+    def harvest(self, api: StubApi, queries, **kwargs) -> harvester.Checkpoint:
+        kwargs.setdefault("requests_per_second", 1000)
+        return harvester.harvest(queries, base_url=api.base_url, checkpoint_path=self.checkpoint_path,
+                                 workers=2, **kwargs)
+
+    def paper_ids(self, checkpoint: harvester.Checkpoint):
+        return [paper["paperId"] for paper in checkpoint.papers()]
+
+    def test_rate_limit_spaces_requests(self):
+        api = self.start(pages=6)
+        self.harvest(api, ["a", "b"], requests_per_second=20)
+        times = sorted(moment for moment, _, _ in api.requests)
+        self.assertEqual(len(times), 12)
+        # Burst of one: n requests need at least (n - 1) / rate seconds, shared by both workers
+        self.assertGreaterEqual(times[-1] - times[0], 11 / 20 * 0.9)
+
+    def test_retries_429_and_5xx(self):
+        api = self.start(pages=4, failures={2: 429, 3: 503, 5: 500})
+        checkpoint = self.harvest(api, ["q"])
+        self.assertEqual(len(api.requests), 4 + 3)
+        self.assertEqual(self.paper_ids(checkpoint), [f"q-{page}-{i}" for page in range(4) for i in range(PAGE_SIZE)])
+
+    def test_gives_up_on_client_errors(self):
+        api = self.start(failures={1: 400})
+        with self.assertRaises(requests.HTTPError):
+            self.harvest(api, ["q"])
+        self.assertEqual(len(api.requests), 1)
+
+    def test_resumes_from_checkpoint(self):
+        api = self.start(pages=4, failures={3: 400})
+        with self.assertRaises(requests.HTTPError):
+            self.harvest(api, ["q"])
+        # A crash mid-write leaves a torn line; it is dropped and that page refetched
+        with open(self.checkpoint_path, "a", encoding="utf-8") as file:
+            file.write('{"query": "q", "page": 2, "fetch')
+
+        first_run = len(api.requests)
+        checkpoint = self.harvest(api, ["q"])
+        self.assertEqual([token for _, _, token in api.requests[first_run:]], ["2", "3"])
+        self.assertEqual(self.paper_ids(checkpoint), [f"q-{page}-{i}" for page in range(4) for i in range(PAGE_SIZE)])
+
+        # A finished query is not fetched again
+        self.harvest(api, ["q"])
+        self.assertEqual(len(api.requests), first_run + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()